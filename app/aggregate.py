@@ -0,0 +1,159 @@
+"""Reductions over a sequence of operands in a single pass.
+
+Every function consumes its argument once, as an iterator, and keeps a
+fixed amount of state whatever the number of values, so a request body can
+be reduced while it is being read. Floats are summed with math.fsum, which
+is correctly rounded; ints, Decimals and Fractions are added exactly (or in
+the active decimal context). The variance uses Welford's update, which does
+not cancel catastrophically like the sum of squares formula, and the
+approximate product adds base-10 logarithms so that no partial product
+overflows.
+"""
+import math
+from decimal import Decimal
+from fractions import Fraction
+
+from app import intmath
+
+# Below this a product is returned as a float; above it, as an Approximation.
+MAX_FLOAT_EXPONENT = 300
+
+
+def summation(values):
+    """Returns (sum, count) of values.
+
+    ints that a float holds exactly are fed to fsum along with the floats, so
+    mixed sums stay correctly rounded, and are also added exactly; larger
+    ints are added apart, so one huge operand does not make every following
+    addition pay for its size. Decimals and Fractions cannot join a float
+    sum without losing exactness, so mixing them with floats is a TypeError.
+    """
+    small = 0
+    wide = 0
+    other = 0
+    count = 0
+    has_float = False
+
+    def floats():
+        nonlocal small, wide, other, count, has_float
+        for value in values:
+            count += 1
+            if type(value) is float:
+                has_float = True
+                yield value
+            elif not isinstance(value, int):
+                other += value
+            elif -intmath.FLOAT_INT_LIMIT <= value <= intmath.FLOAT_INT_LIMIT:
+                small += value
+                yield value
+            else:
+                wide += value
+
+    partial = math.fsum(floats())
+    if not has_float:
+        return small + wide + other, count
+    if not isinstance(other, int):
+        raise TypeError("Floats cannot be added to {} operands".format(type(other).__name__))
+    return (math.fsum((partial, wide)) if wide else partial), count
+
+
+def total(values):
+    return summation(values)[0]
+
+
+def mean(values):
+    value, count = summation(values)
+    if count == 0:
+        raise ValueError("Mean requires at least one value")
+    return value / count
+
+
+def variance(values, ddof=0):
+    """Population variance, or the sample variance with ddof=1."""
+    count = 0
+    average = 0
+    squares = 0
+    for value in values:
+        count += 1
+        delta = value - average
+        average += delta / count
+        squares += delta * (value - average)
+    if count <= ddof:
+        raise ValueError("Variance requires at least {} values".format(ddof + 1))
+    return squares / (count - ddof)
+
+
+def minimum(values):
+    result = min(values, default=None)
+    if result is None:
+        raise ValueError("Minimum requires at least one value")
+    return result
+
+
+def maximum(values):
+    result = max(values, default=None)
+    if result is None:
+        raise ValueError("Maximum requires at least one value")
+    return result
+
+
+def product(values, max_bits):
+    """Exact product, refusing to grow past max_bits like Calculator.power."""
+    result = 1
+    for value in values:
+        result *= value
+        if result_bits(result) > max_bits:
+            raise ValueError("Product exceeds the limit of {} bits".format(max_bits))
+    return result
+
+
+def result_bits(value):
+    if type(value) is int:
+        return value.bit_length()
+    if isinstance(value, Fraction):
+        return max(value.numerator.bit_length(), value.denominator.bit_length())
+    return 0
+
+
+def log_product(values):
+    """Product computed as 10 ** sum(log10|x|), for factors whose product does not fit a float.
+
+    Returns a float while the result is within MAX_FLOAT_EXPONENT decades,
+    an Approximation in scientific notation beyond that.
+    """
+    negative = False
+    zero = False
+
+    def logs():
+        nonlocal negative, zero
+        for value in values:
+            if value < 0:
+                negative = not negative
+                yield magnitude_log10(-value)
+            elif value > 0:
+                yield magnitude_log10(value)
+            else:
+                zero = True
+
+    exponent = math.fsum(logs())
+    if zero:
+        return 0
+    if not math.isfinite(exponent):
+        raise OverflowError("Product is not finite")
+    if abs(exponent) <= MAX_FLOAT_EXPONENT:
+        magnitude = 10 ** exponent
+        return -magnitude if negative else magnitude
+    from app.calc import Approximation
+    whole = math.floor(exponent)
+    return Approximation(negative, 10 ** (exponent - whole), whole)
+
+
+def magnitude_log10(value):
+    """log10 of a positive value of any of the calculator's number types."""
+    if type(value) is int:
+        return intmath.log10(value)
+    if isinstance(value, Fraction):
+        return intmath.log10(value.numerator) - intmath.log10(value.denominator)
+    if isinstance(value, Decimal):
+        return float(value.log10())
+    return math.log10(value)
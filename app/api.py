@@ -1,88 +1,228 @@
+import functools
 import http.client
+import io
+import os
+import time
 
-from flask import Flask
+from flask import Flask, Response, g, request, stream_with_context
 
-from app import util
+from app import encoding
+from app import etag
+from app import numeric
+from app import operations
+from app.cache import create_result_cache
 from app.calc import Calculator
-from app.calc import InvalidPermissions
+from app.executor import ExecutionLayer
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.metrics import METRICS
+from app.metrics import service_gauges
+from app.tables import create_tables
 
-CALCULATOR = Calculator()
-api_application = Flask(__name__)
+PRELOAD = os.environ.get("CALC_PRELOAD") == "1"
 HEADERS = {"Content-Type": "text/plain", "Access-Control-Allow-Origin": "*"}
+BATCH_LIMIT = 10000
+STREAM_BUFFER = 64 * 1024
+OPERAND_NAMES = ("op_1", "op_2")
+ENCODER_HEADERS = {
+    encoder: {"Content-Type": encoder.media_type, "Access-Control-Allow-Origin": "*", "Vary": "Accept"}
+    for encoder in encoding.ENCODERS
+}
+CACHEABLE_HEADERS = {encoder: dict(headers, **{"Cache-Control": etag.CACHE_CONTROL})
+                     for encoder, headers in ENCODER_HEADERS.items()}
 
 
-@api_application.route("/")
 def hello():
     return "Hello from The Calculator!\n"
 
 
-@api_application.route("/calc/add/<op_1>/<op_2>", methods=["GET"])
-def add(op_1, op_2):
-    try:
-        num_1, num_2 = util.convert_to_number(op_1), util.convert_to_number(op_2)
-        return ("{}".format(CALCULATOR.add(num_1, num_2)), http.client.OK, HEADERS)
-    except TypeError as e:
-        return (str(e), http.client.BAD_REQUEST, HEADERS)
-    except InvalidPermissions as e:
-        return (str(e), http.client.FORBIDDEN, HEADERS)
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+def record_request(response):
+    endpoint = request.endpoint or "unmatched"
+    METRICS.inc("calc_http_requests_total", (("endpoint", endpoint), ("status", str(response.status_code))))
+    METRICS.observe("calc_http_request_duration_seconds", (("endpoint", endpoint),),
+                    time.perf_counter() - g.request_start)
+    return response
+
 
+def metrics(execution):
+    gauges = service_gauges(execution.calculator.result_cache.stats(), execution.flights.stats())
+    return (METRICS.render(gauges), http.client.OK, {"Content-Type": METRICS_CONTENT_TYPE})
 
-@api_application.route("/calc/substract/<op_1>/<op_2>", methods=["GET"])
-def substract(op_1, op_2):
+
+def measured_evaluate(execution, operation, numbers):
+    timer = METRICS.timer(operation.name)
     try:
-        num_1, num_2 = util.convert_to_number(op_1), util.convert_to_number(op_2)
-        return ("{}".format(CALCULATOR.substract(num_1, num_2)), http.client.OK, HEADERS)
-    except TypeError as e:
-        return (str(e), http.client.BAD_REQUEST, HEADERS)
-    except InvalidPermissions as e:
-        return (str(e), http.client.FORBIDDEN, HEADERS)
+        result = execution.evaluate(operation, numbers)
+    except operations.HANDLED_ERRORS as e:
+        timer.error(e)
+        raise
+    timer.mark_compute()
+    return result
+
 
-@api_application.route("/calc/multiply/<op_1>/<op_2>", methods=["GET"])
-def multiply(op_1, op_2):
+def calculate(execution, operation, operands):
+    timer = METRICS.timer(operation.name)
     try:
-        num_1, num_2 = util.convert_to_number(op_1), util.convert_to_number(op_2)
-        return ("{}".format(CALCULATOR.multiply(num_1, num_2)), http.client.OK, HEADERS)
-    except TypeError as e:
-        return (str(e), http.client.BAD_REQUEST, HEADERS)
-    except InvalidPermissions as e:
-        return (str(e), http.client.FORBIDDEN, HEADERS)
+        backend, precision = numeric.select(request.args)
+        operation, operands = operations.select_variant(operation, operands, request.args)
+        numbers = operations.parse_operands(operands, backend)
+        timer.mark("parse")
+        encoder = encoding.negotiate(request.headers.get("Accept"))
+        tag = etag.entity_tag(operation, numbers, backend, precision, encoder.media_type)
+        headers = dict(CACHEABLE_HEADERS[encoder], ETag=tag)
+        if_none_match = request.headers.get("If-None-Match")
+        if etag.matches(if_none_match, tag):
+            execution.authorize(operation, numbers)
+            return ("", http.client.NOT_MODIFIED, headers)
+        result = numeric.evaluator(execution.evaluate, backend, precision)(operation, numbers)
+        timer.mark_compute()
+        if etag.matches_any(if_none_match):
+            return ("", http.client.NOT_MODIFIED, headers)
+        body = encoder.encode(result)
+        timer.mark("format")
+        return (body, http.client.OK, headers)
+    except operations.HANDLED_ERRORS as e:
+        timer.error(e)
+        return (str(e), operations.error_status(e), HEADERS)
+
 
-@api_application.route("/calc/divide/<op_1>/<op_2>", methods=["GET"])
-def divide(op_1, op_2):
+def operation_view(execution, operation):
+    names = OPERAND_NAMES[:operation.arity]
+
+    def view(**operands):
+        return calculate(execution, operation, [operands[name] for name in names])
+
+    return view
+
+
+def operation_rule(operation):
+    return "/".join(["/calc", operation.name] + ["<{}>".format(name) for name in OPERAND_NAMES[:operation.arity]])
+
+
+def register_operations(application, execution):
+    for operation in operations.OPERATIONS.values():
+        if operation.routed:
+            application.add_url_rule(
+                operation_rule(operation), endpoint=operation.name, view_func=operation_view(execution, operation),
+                methods=["GET"]
+            )
+
+
+def aggregate(execution, operation):
+    timer = METRICS.timer(operation.name)
     try:
-        num_1, num_2 = util.convert_to_number(op_1), util.convert_to_number(op_2)
-        return ("{}".format(CALCULATOR.divide(num_1, num_2)), http.client.OK, HEADERS)
-    except TypeError as e:
-        return (str(e), http.client.BAD_REQUEST, HEADERS)
-    except InvalidPermissions as e:
-        return (str(e), http.client.FORBIDDEN, HEADERS)
+        backend, precision = numeric.select(request.args)
+        operation, _ = operations.select_variant(operation, (), request.args, operations.AGGREGATES)
+        encoder = encoding.negotiate(request.headers.get("Accept"))
+        # The body is reduced while it is read, one operand per line.
+        values = execution.budgeted(operations.read_operands(body_readline(), backend))
+        evaluate = functools.partial(operations.evaluate, execution.calculator)
+        result = numeric.evaluator(evaluate, backend, precision)(operation, [values])
+        timer.mark_compute()
+        return (encoder.encode(result), http.client.OK, ENCODER_HEADERS[encoder])
+    except operations.HANDLED_ERRORS as e:
+        timer.error(e)
+        return (str(e), operations.error_status(e), HEADERS)
 
-@api_application.route("/calc/power/<op_1>/<op_2>", methods=["GET"])
-def power(op_1, op_2):
+
+def aggregate_view(execution, operation):
+    def view():
+        return aggregate(execution, operation)
+
+    return view
+
+
+def register_aggregates(application, execution):
+    for operation in operations.AGGREGATES.values():
+        if operation.routed:
+            application.add_url_rule(
+                "/calc/aggregate/" + operation.name, endpoint="aggregate_" + operation.name,
+                view_func=aggregate_view(execution, operation), methods=["POST"]
+            )
+
+
+def body_readline():
+    stream = request.stream
+    if isinstance(stream, io.RawIOBase):
+        # Werkzeug >= 2.3 hands over a raw LimitedStream, whose readline reads a few bytes at a time.
+        stream = io.BufferedReader(stream, STREAM_BUFFER)
+    return stream.readline
+
+
+def batch(execution):
     try:
-        num_1, num_2 = util.convert_to_number(op_1), util.convert_to_number(op_2)
-        return ("{}".format(CALCULATOR.power(num_1, num_2)), http.client.OK, HEADERS)
-    except TypeError as e:
-        return (str(e), http.client.BAD_REQUEST, HEADERS)
-    except InvalidPermissions as e:
-        return (str(e), http.client.FORBIDDEN, HEADERS)
+        backend, precision = numeric.select(request.args)
+        items = operations.parse_batch(request.get_data(as_text=True), request.mimetype)
+    except ValueError as e:
+        return (str(e), operations.error_status(e), HEADERS)
+    if len(items) > BATCH_LIMIT:
+        return ("Batch exceeds {} operations".format(BATCH_LIMIT), http.client.REQUEST_ENTITY_TOO_LARGE, HEADERS)
+    evaluator = numeric.evaluator(functools.partial(measured_evaluate, execution), backend, precision)
+    results = [operations.evaluate_item(evaluator, item, backend) for item in items]
+    encoder = encoding.negotiate(request.headers.get("Accept"), encoding.BATCH_ENCODERS)
+    return (encoder.encode_items(results), http.client.OK, ENCODER_HEADERS[encoder])
+
 
-@api_application.route("/calc/sqrt/<op_1>", methods=["GET"])
-def sqrt(op_1):
+def stream(execution):
     try:
-        num_1 = util.convert_to_number(op_1)
-        return ("{}".format(CALCULATOR.square_root(num_1)), http.client.OK, HEADERS)
-    except (TypeError, ValueError) as e:
+        backend, precision = numeric.select(request.args)
+    except ValueError as e:
         return (str(e), http.client.BAD_REQUEST, HEADERS)
-    except InvalidPermissions as e:
-        return (str(e), http.client.FORBIDDEN, HEADERS)
+    lines = operations.read_lines(body_readline())
+    evaluator = numeric.evaluator(functools.partial(measured_evaluate, execution), backend, precision)
+    results = operations.evaluate_stream(evaluator, lines, backend)
+    return Response(stream_with_context(results), http.client.OK, mimetype=operations.NDJSON,
+                    headers={"Access-Control-Allow-Origin": "*"})
 
-@api_application.route("/calc/log10/<op_1>", methods=["GET"])
-def log10(op_1):
+
+def evaluate_expression(execution):
     try:
-        num_1 = util.convert_to_number(op_1)
-        return ("{}".format(CALCULATOR.logarithm_base_10(num_1)), http.client.OK, HEADERS)
-    except (TypeError, ValueError) as e:
-        return (str(e), http.client.BAD_REQUEST, HEADERS)
-    except InvalidPermissions as e:
-        return (str(e), http.client.FORBIDDEN, HEADERS)
\ No newline at end of file
+        backend, precision = numeric.select(request.args)
+        from app import expression  # only /calc/eval needs the parser
+        result = expression.evaluate_body(request.get_data(as_text=True), backend,
+                                          numeric.evaluator(functools.partial(measured_evaluate, execution),
+                                                            backend, precision))
+        encoder = encoding.negotiate(request.headers.get("Accept"))
+        return (encoder.encode(result), http.client.OK, ENCODER_HEADERS[encoder])
+    except operations.HANDLED_ERRORS as e:
+        return (str(e), operations.error_status(e), HEADERS)
+
+
+def preload(calculator):
+    """Does at startup the work otherwise left to the first requests."""
+    from app import expression  # noqa: F401
+    if calculator.tables is not None:
+        for table in calculator.tables:
+            table.load()
+
+
+def create_execution():
+    return ExecutionLayer(Calculator(result_cache=create_result_cache(), tables=create_tables()))
+
+
+def create_app(preload_subsystems=PRELOAD, execution=None):
+    """Builds the application around its own calculator and execution layer.
+
+    The execution layer, reachable as application.extensions["execution"],
+    is created here unless one is passed in.
+    """
+    if execution is None:
+        execution = create_execution()
+    application = Flask(__name__)
+    application.extensions["execution"] = execution
+    application.add_url_rule("/", view_func=hello)
+    application.before_request(start_request_timer)
+    application.after_request(record_request)
+    application.add_url_rule("/metrics", "metrics", functools.partial(metrics, execution), methods=["GET"])
+    register_operations(application, execution)
+    register_aggregates(application, execution)
+    application.add_url_rule("/calc/batch", "batch", functools.partial(batch, execution), methods=["POST"])
+    application.add_url_rule("/calc/stream", "stream", functools.partial(stream, execution), methods=["POST"])
+    application.add_url_rule("/calc/eval", "evaluate_expression", functools.partial(evaluate_expression, execution),
+                             methods=["POST"])
+    if preload_subsystems:
+        preload(execution.calculator)
+    return application
@@ -0,0 +1,355 @@
+"""asyncio/ASGI entry point serving the same routes as app.api.
+
+Run it with any ASGI server, e.g. uvicorn app.asgi:asgi_application.
+Cheap arithmetic runs on the event loop. Operations whose estimated cost
+exceeds EXECUTOR_THRESHOLD_BITS go through the process-pool ExecutionLayer,
+with its time budget, and are awaited from a worker thread: big-int
+arithmetic holds the GIL, so only another process keeps the loop serving
+every other connection. Identical costly requests that arrive while one is
+running await that computation, after their own permission check, instead
+of starting another. A batch is evaluated item by item through the same
+ExecutionLayer, on a worker thread. Aggregate and stream bodies are read in
+a thread as they arrive, through ReceiveStream, so their memory stays
+constant as with the WSGI app.
+"""
+import asyncio
+import http.client
+import functools
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from app import encoding
+from app import etag
+from app import expression
+from app import numeric
+from app import operations
+from app.cache import create_result_cache
+from app.cache import make_key
+from app.calc import Calculator
+from app.executor import ExecutionLayer
+from app.executor import operation_cost
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.metrics import METRICS
+from app.metrics import service_gauges
+from app.tables import create_tables
+
+CALCULATOR = Calculator(result_cache=create_result_cache(), tables=create_tables())
+EXECUTOR_THRESHOLD_BITS = 1 << 16
+EXECUTION = ExecutionLayer(CALCULATOR, cost_threshold_bits=EXECUTOR_THRESHOLD_BITS)
+# Threads that wait on EXECUTION's processes, evaluate batches and encode large results.
+EXECUTOR = ThreadPoolExecutor(max_workers=4)
+# Threads that read aggregate and stream bodies as they arrive; apart from
+# EXECUTOR so that slow uploads do not hold up computations.
+BODY_EXECUTOR = ThreadPoolExecutor(max_workers=16)
+BATCH_LIMIT = 10000
+STREAM_BUFFER = 64 * 1024
+# Futures of the costly computations in progress, by operation and operands.
+IN_FLIGHT = {}
+TEXT_HEADERS = [(b"content-type", b"text/plain"), (b"access-control-allow-origin", b"*")]
+ENCODER_HEADERS = {
+    encoder: [(b"content-type", encoder.media_type.encode("ascii")), (b"access-control-allow-origin", b"*"),
+              (b"vary", b"Accept")]
+    for encoder in encoding.ENCODERS
+}
+NDJSON_HEADERS = [(b"content-type", operations.NDJSON.encode("ascii")), (b"access-control-allow-origin", b"*")]
+METRICS_HEADERS = [(b"content-type", METRICS_CONTENT_TYPE.encode("ascii"))]
+CACHEABLE_HEADERS = {encoder: headers + [(b"cache-control", etag.CACHE_CONTROL.encode("ascii"))]
+                     for encoder, headers in ENCODER_HEADERS.items()}
+
+
+async def calculate(operation, operands, options, encoder, if_none_match=""):
+    """Returns (status, body, headers); an If-None-Match matching the tag skips the evaluation."""
+    timer = METRICS.timer(operation.name)
+    try:
+        return await timed_calculate(timer, operation, operands, options, encoder, if_none_match)
+    except operations.HANDLED_ERRORS as e:
+        timer.error(e)
+        raise
+
+
+async def timed_calculate(timer, operation, operands, options, encoder, if_none_match):
+    backend, precision = numeric.select(options)
+    operation, operands = operations.select_variant(operation, operands, options)
+    numbers = operations.parse_operands(operands, backend)
+    timer.mark("parse")
+    tag = etag.entity_tag(operation, numbers, backend, precision, encoder.media_type)
+    headers = CACHEABLE_HEADERS[encoder] + [(b"etag", tag.encode("ascii"))]
+    if etag.matches(if_none_match, tag):
+        EXECUTION.authorize(operation, numbers)
+        return http.client.NOT_MODIFIED, b"", headers
+    if operation_cost(operation, numbers) > EXECUTOR_THRESHOLD_BITS:
+        loop = asyncio.get_event_loop()
+        key = (make_key(operation.name, numbers), backend, precision)
+        evaluate = numeric.evaluator(EXECUTION.evaluate, backend, precision)
+        result = await coalesced(loop, key, evaluate, operation, numbers)
+        timer.mark_compute()
+        if etag.matches_any(if_none_match):
+            return http.client.NOT_MODIFIED, b"", headers
+        body = await loop.run_in_executor(EXECUTOR, encoder.encode, result)
+    else:
+        evaluate = numeric.evaluator(functools.partial(operations.evaluate, CALCULATOR), backend, precision)
+        result = evaluate(operation, numbers)
+        timer.mark_compute()
+        if etag.matches_any(if_none_match):
+            return http.client.NOT_MODIFIED, b"", headers
+        body = encoder.encode(result)
+    timer.mark("format")
+    return http.client.OK, body, headers
+
+
+def measured_evaluate(operation, numbers):
+    timer = METRICS.timer(operation.name)
+    try:
+        result = EXECUTION.evaluate(operation, numbers)
+    except operations.HANDLED_ERRORS as e:
+        timer.error(e)
+        raise
+    timer.mark_compute()
+    return result
+
+
+async def coalesced(loop, key, function, operation, numbers):
+    future = IN_FLIGHT.get(key)
+    if future is None:
+        future = IN_FLIGHT[key] = loop.run_in_executor(EXECUTOR, function, operation, numbers)
+        future.add_done_callback(lambda _: IN_FLIGHT.pop(key, None))
+    else:
+        EXECUTION.authorize(operation, numbers)
+    # Shielded so a disconnecting client does not cancel the others' result.
+    return await asyncio.shield(future)
+
+
+def match_operation(path):
+    parts = path.split("/")
+    if len(parts) < 4 or parts[0] != "" or parts[1] != "calc":
+        return None, None
+    operation = operations.OPERATIONS.get(parts[2])
+    if operation is None or not operation.routed or len(parts) - 3 != operation.arity:
+        return None, None
+    return operation, parts[3:]
+
+
+async def read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body.extend(message.get("body", b""))
+        if not message.get("more_body", False):
+            return bytes(body)
+
+
+class ReceiveStream(io.RawIOBase):
+    """The request body as a blocking stream, for code running in a thread off the loop.
+
+    Each read that finds no buffered data fetches the next message from the
+    loop, so the body is read as it is consumed. before_wait is called first:
+    it lets a streaming response send what it has before blocking for input.
+    """
+
+    def __init__(self, loop, receive, before_wait=None):
+        self.loop = loop
+        self.receive = receive
+        self.before_wait = before_wait
+        self.pending = memoryview(b"")
+        self.more = True
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and self.more:
+            if self.before_wait is not None:
+                self.before_wait()
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            self.pending = memoryview(message.get("body", b""))
+            self.more = message.get("more_body", False)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def body_readline(loop, receive, before_wait=None):
+    return io.BufferedReader(ReceiveStream(loop, receive, before_wait), STREAM_BUFFER).readline
+
+
+async def send_response(send, status, body, headers=TEXT_HEADERS):
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def header(scope, name):
+    return dict(scope["headers"]).get(name, b"").decode("latin-1")
+
+
+def query(scope):
+    return dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+
+
+async def handle_hello(scope, receive, send):
+    return await send_response(send, http.client.OK, "Hello from The Calculator!\n")
+
+
+async def handle_metrics(scope, receive, send):
+    gauges = service_gauges(CALCULATOR.result_cache.stats(), EXECUTION.flights.stats())
+    return await send_response(send, http.client.OK, METRICS.render(gauges), METRICS_HEADERS)
+
+
+async def handle_operation(operation, operands, scope, receive, send):
+    encoder = encoding.negotiate(header(scope, b"accept"))
+    try:
+        status, body, headers = await calculate(operation, operands, query(scope), encoder,
+                                                header(scope, b"if-none-match"))
+    except operations.HANDLED_ERRORS as e:
+        return await send_response(send, operations.error_status(e), str(e))
+    return await send_response(send, status, body, headers)
+
+
+async def handle_batch(scope, receive, send):
+    content_type = header(scope, b"content-type").split(";")[0]
+    try:
+        backend, precision = numeric.select(query(scope))
+        items = operations.parse_batch((await read_body(receive)).decode("utf-8"), content_type)
+    except ValueError as e:
+        return await send_response(send, operations.error_status(e), str(e))
+    if len(items) > BATCH_LIMIT:
+        return await send_response(
+            send, http.client.REQUEST_ENTITY_TOO_LARGE, "Batch exceeds {} operations".format(BATCH_LIMIT))
+    evaluate = numeric.evaluator(measured_evaluate, backend, precision)
+    encoder = encoding.negotiate(header(scope, b"accept"), encoding.BATCH_ENCODERS)
+    body = await asyncio.get_event_loop().run_in_executor(EXECUTOR, evaluate_batch, evaluate, items, backend, encoder)
+    return await send_response(send, http.client.OK, body, ENCODER_HEADERS[encoder])
+
+
+def evaluate_batch(evaluate, items, backend, encoder):
+    return encoder.encode_items([operations.evaluate_item(evaluate, item, backend) for item in items])
+
+
+async def handle_stream(scope, receive, send):
+    try:
+        backend, precision = numeric.select(query(scope))
+    except ValueError as e:
+        return await send_response(send, http.client.BAD_REQUEST, str(e))
+    await send({"type": "http.response.start", "status": http.client.OK, "headers": NDJSON_HEADERS})
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(BODY_EXECUTOR, stream_results, loop, receive, send, backend, precision)
+    await send({"type": "http.response.body", "body": b""})
+
+
+def stream_results(loop, receive, send, backend, precision):
+    """Evaluates the body's lines as they arrive, sending results in chunks of up to STREAM_BUFFER bytes."""
+    output = bytearray()
+
+    def flush():
+        if output:
+            message = {"type": "http.response.body", "body": bytes(output), "more_body": True}
+            del output[:]
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    lines = operations.read_lines(body_readline(loop, receive, flush))
+    evaluate = numeric.evaluator(measured_evaluate, backend, precision)
+    for line in operations.evaluate_stream(evaluate, lines, backend):
+        output += line.encode("utf-8")
+        if len(output) >= STREAM_BUFFER:
+            flush()
+    flush()
+
+
+async def handle_aggregate(operation, scope, receive, send):
+    options = query(scope)
+    encoder = encoding.negotiate(header(scope, b"accept"))
+    try:
+        backend, precision = numeric.select(options)
+        operation, _ = operations.select_variant(operation, (), options, operations.AGGREGATES)
+        loop = asyncio.get_event_loop()
+        body = await loop.run_in_executor(BODY_EXECUTOR, reduce_body, loop, receive, operation, backend, precision,
+                                          encoder)
+    except operations.HANDLED_ERRORS as e:
+        return await send_response(send, operations.error_status(e), str(e))
+    return await send_response(send, http.client.OK, body, ENCODER_HEADERS[encoder])
+
+
+def reduce_body(loop, receive, operation, backend, precision, encoder):
+    timer = METRICS.timer(operation.name)
+    try:
+        # The body is reduced while it is read, one operand per line.
+        values = EXECUTION.budgeted(operations.read_operands(body_readline(loop, receive), backend))
+        evaluate = numeric.evaluator(functools.partial(operations.evaluate, CALCULATOR), backend, precision)
+        result = evaluate(operation, [values])
+    except operations.HANDLED_ERRORS as e:
+        timer.error(e)
+        raise
+    timer.mark_compute()
+    return encoder.encode(result)
+
+
+async def handle_eval(scope, receive, send):
+    encoder = encoding.negotiate(header(scope, b"accept"))
+    try:
+        backend, precision = numeric.select(query(scope))
+        text = (await read_body(receive)).decode("utf-8")
+        evaluate = numeric.evaluator(measured_evaluate, backend, precision)
+        body = await asyncio.get_event_loop().run_in_executor(EXECUTOR, evaluate_expression, text, backend, evaluate,
+                                                              encoder)
+    except operations.HANDLED_ERRORS as e:
+        return await send_response(send, operations.error_status(e), str(e))
+    return await send_response(send, http.client.OK, body, ENCODER_HEADERS[encoder])
+
+
+def evaluate_expression(text, backend, evaluate, encoder):
+    return encoder.encode(expression.evaluate_body(text, backend, evaluate))
+
+
+# Path -> (endpoint, methods, handler); endpoints are named as in app.api.
+ROUTES = {
+    "/": ("hello", ("GET", "HEAD"), handle_hello),
+    "/metrics": ("metrics", ("GET",), handle_metrics),
+    "/calc/batch": ("batch", ("POST",), handle_batch),
+    "/calc/stream": ("stream", ("POST",), handle_stream),
+    "/calc/eval": ("evaluate_expression", ("POST",), handle_eval),
+}
+ROUTES.update(
+    ("/calc/aggregate/" + operation.name,
+     ("aggregate_" + operation.name, ("POST",), functools.partial(handle_aggregate, operation)))
+    for operation in operations.AGGREGATES.values() if operation.routed
+)
+
+
+def route(path):
+    """Returns (endpoint, methods, handler) for path, or None."""
+    found = ROUTES.get(path)
+    if found is not None:
+        return found
+    operation, operands = match_operation(path)
+    if operation is None:
+        return None
+    return operation.name, ("GET", "HEAD"), functools.partial(handle_operation, operation, operands)
+
+
+async def asgi_application(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    start = time.perf_counter()
+    statuses = []
+
+    async def send_recorded(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+        await send(message)
+
+    found = route(scope["path"])
+    endpoint = "unmatched" if found is None else found[0]
+    try:
+        if found is None:
+            return await send_response(send_recorded, http.client.NOT_FOUND, "Not Found")
+        if scope["method"] not in found[1]:
+            return await send_response(send_recorded, http.client.METHOD_NOT_ALLOWED, "Method Not Allowed")
+        return await found[2](scope, receive, send_recorded)
+    finally:
+        status = str(statuses[0]) if statuses else "500"
+        METRICS.inc("calc_http_requests_total", (("endpoint", endpoint), ("status", status)))
+        METRICS.observe("calc_http_request_duration_seconds", (("endpoint", endpoint),), time.perf_counter() - start)
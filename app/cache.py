@@ -0,0 +1,300 @@
+import contextlib
+import decimal
+import fractions
+import hashlib
+import os
+import sqlite3
+import struct
+import sys
+import threading
+from collections import OrderedDict
+
+MISSING = object()
+FLOAT64 = struct.Struct("<d")
+# When set, every worker process shares the result cache stored in this file.
+SHARED_CACHE_PATH = os.environ.get("CALC_CACHE_PATH")
+
+
+def make_key(name, args):
+    # 1, 1.0 and True hash alike, so the operand types are part of the key.
+    key = (name,) + tuple((type(arg), arg) for arg in args)
+    for arg in args:
+        if type(arg) is decimal.Decimal:
+            # Decimal results depend on the precision they were computed at.
+            return key + ((decimal.Context, decimal.getcontext().prec),)
+    return key
+
+
+def entry_size(key, value):
+    # Operands live in the key, so a huge operand costs as much as a huge result.
+    return sys.getsizeof(value) + sum(sys.getsizeof(part[1]) for part in key[1:])
+
+
+class ResultCache:
+    """Thread-safe LRU of operation results bounded by count and total size.
+
+    Sizes come from sys.getsizeof over the result and the operands, so huge
+    integers weigh what they cost; entries above max_item_bytes are skipped.
+    """
+
+    def __init__(self, max_entries=4096, max_bytes=32 * 1024 * 1024, max_item_bytes=1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key, MISSING)
+            if entry is MISSING:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = entry_size(key, value)
+        if size > self.max_item_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+            }
+
+
+def serialize_key(key):
+    """Digest of a make_key tuple that is stable across processes."""
+    digest = hashlib.sha256(key[0].encode("utf-8"))
+    for kind, value in key[1:]:
+        digest.update(b"|" + kind.__name__.encode("ascii") + b":" + normalize(value).encode("utf-8"))
+    return digest.digest()
+
+
+def normalize(value):
+    # Hex spellings are linear in the size of the number and never hit the
+    # interpreter's limit on int to decimal string conversion.
+    if type(value) is int:
+        return format(value, "x")
+    if type(value) is float:
+        return value.hex()
+    if type(value) is fractions.Fraction:
+        return "{:x}/{:x}".format(value.numerator, value.denominator)
+    return str(value)
+
+
+def encode_value(value):
+    if type(value) is int:
+        return "i", value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+    if type(value) is float:
+        return "d", FLOAT64.pack(value)
+    return None, None
+
+
+def decode_value(kind, data):
+    if kind == "i":
+        return int.from_bytes(data, "little", signed=True)
+    return FLOAT64.unpack(data)[0]
+
+
+class SharedResultCache:
+    """Result cache persisted in SQLite and shared by every worker process.
+
+    An in-process ResultCache sits in front of the database. Integer and
+    float results are stored; other result types stay in memory only. The
+    database runs in WAL mode and every write is one transaction, so a
+    crashed worker never leaves a partial entry and a restarted one starts
+    warm. Rows are evicted oldest-written first once the store outgrows
+    max_entries or max_bytes; the check runs every EVICTION_INTERVAL writes.
+    A failing database degrades to cache misses instead of failed requests.
+
+    Connections are pooled per process and lent to one thread at a time, so
+    thread-per-request servers do not open one per thread; up to
+    max_connections idle ones are kept. The schema is set up once.
+    """
+
+    EVICTION_INTERVAL = 64
+
+    def __init__(self, path, max_entries=100000, max_bytes=256 * 1024 * 1024, max_item_bytes=1024 * 1024,
+                 memory=None, timeout=5.0, max_connections=4):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.memory = memory if memory is not None else ResultCache()
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.idle = []
+        self.pid = os.getpid()
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+        with self.connection() as connection:
+            # WAL mode is a property of the database file, set once for all.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS results "
+                               "(key BLOB PRIMARY KEY, kind TEXT NOT NULL, value BLOB NOT NULL, size INTEGER NOT NULL)")
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @contextlib.contextmanager
+    def connection(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                # sqlite3 connections must not cross a fork: the parent's are left alone.
+                self.idle, self.pid = [], os.getpid()
+            connection = self.idle.pop() if self.idle else None
+        if connection is None:
+            connection = self.connect()
+        try:
+            yield connection
+        finally:
+            with self.lock:
+                keep = len(self.idle) < self.max_connections
+                if keep:
+                    self.idle.append(connection)
+            if not keep:
+                connection.close()
+
+    def __contains__(self, key):
+        return key in self.memory or self.load(key) is not MISSING
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, MISSING)
+        if value is MISSING:
+            value = self.load(key)
+            if value is MISSING:
+                with self.lock:
+                    self.misses += 1
+                return default
+            self.memory.put(key, value)
+        with self.lock:
+            self.hits += 1
+        return value
+
+    def load(self, key):
+        try:
+            with self.connection() as connection:
+                row = connection.execute(
+                    "SELECT kind, value FROM results WHERE key = ?", (serialize_key(key),)).fetchone()
+        except sqlite3.Error:
+            row = None
+            with self.lock:
+                self.errors += 1
+        if row is None:
+            return MISSING
+        return decode_value(row[0], row[1])
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        kind, data = encode_value(value)
+        if kind is None or len(data) > self.max_item_bytes:
+            return
+        try:
+            with self.connection() as connection:
+                connection.execute("INSERT OR REPLACE INTO results (key, kind, value, size) VALUES (?, ?, ?, ?)",
+                                   (serialize_key(key), kind, data, len(data)))
+            with self.lock:
+                self.writes += 1
+                evict = self.writes % self.EVICTION_INTERVAL == 0
+            if evict:
+                self.evict()
+        except sqlite3.Error:
+            with self.lock:
+                self.errors += 1
+
+    def evict(self):
+        with self.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                entries, total = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+                removed, last = 0, None
+                for rowid, size in connection.execute("SELECT rowid, size FROM results ORDER BY rowid"):
+                    if entries - removed <= self.max_entries and total <= self.max_bytes:
+                        break
+                    removed, total, last = removed + 1, total - size, rowid
+                if last is not None:
+                    connection.execute("DELETE FROM results WHERE rowid <= ?", (last,))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        with self.lock:
+            self.evictions += removed
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        self.memory.clear()
+        with self.connection() as connection:
+            connection.execute("DELETE FROM results")
+
+    def stats(self):
+        try:
+            with self.connection() as connection:
+                entries, total = connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        except sqlite3.Error:
+            entries, total = 0, 0
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": total,
+                "errors": self.errors,
+            }
+
+
+def create_result_cache(path=SHARED_CACHE_PATH):
+    if path:
+        return SharedResultCache(path)
+    return ResultCache()
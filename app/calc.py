@@ -1,65 +1,283 @@
 import app
-import math 
+import math
+from decimal import Decimal
+from fractions import Fraction
+
+from app import aggregate
+from app import intmath
+from app.cache import make_key
+
+NUMBER_TYPES = (int, float, Decimal, Fraction)
+# Integers below 2 ** 53 convert to float exactly, so roots of squares below
+# 2 ** 106 can be returned exactly.
+EXACT_SQUARE_LIMIT = 1 << 106
+POWERS_OF_TEN = {10 ** exponent: float(exponent) for exponent in range(309)}
 
 class InvalidPermissions(Exception):
     pass
 
+
+class Operation:
+    """Describes a calculation for permission checks and audit records.
+
+    Rendering is deferred to __str__, so operands (possibly huge integers)
+    are only turned into text when an audit sink actually emits the record.
+    """
+
+    __slots__ = ("name", "template", "operands")
+    MAX_RENDERED_BITS = 8192
+
+    def __init__(self, name, template, *operands):
+        self.name = name
+        self.template = template
+        self.operands = operands
+
+    def __str__(self):
+        return self.template.format(*(self.render(operand) for operand in self.operands))
+
+    def __repr__(self):
+        return "<Operation {}>".format(self.name)
+
+    def render(self, operand):
+        if isinstance(operand, int) and operand.bit_length() > self.MAX_RENDERED_BITS:
+            return "<int of {} bits>".format(operand.bit_length())
+        return str(operand)
+
+
+class Approximation:
+    """Scientific-notation stand-in for a power too large to materialize."""
+
+    __slots__ = ("negative", "mantissa", "exponent")
+
+    def __init__(self, negative, mantissa, exponent):
+        self.negative = negative
+        self.mantissa = mantissa
+        self.exponent = exponent
+
+    def __str__(self):
+        return "{}{:.15g}e{:+d}".format("-" if self.negative else "", self.mantissa, self.exponent)
+
+
+def estimate_power_bits(x, y):
+    """Estimates the size of x ** y in bits as y * log2|x|.
+
+    Only integer bases raised to positive integer exponents can grow without
+    bound; every other combination evaluates to a float. Fractions stay exact
+    under any integral exponent, so their numerator or denominator is sized.
+    """
+    if isinstance(y, Fraction) and y.denominator == 1:
+        y = y.numerator
+    if isinstance(x, Fraction):
+        if not isinstance(y, int):
+            return 64
+        x, y = max(abs(x.numerator), x.denominator), abs(y)
+    if not isinstance(x, int) or not isinstance(y, int) or y <= 0:
+        return 64
+    magnitude = abs(x)
+    if magnitude <= 1:
+        return 1
+    try:
+        return int(y * math.log2(magnitude)) + 1
+    except OverflowError:
+        return y * magnitude.bit_length()
+
+
+def exact_square_root(x):
+    """Returns sqrt(x) for a perfect square int below EXACT_SQUARE_LIMIT, else None."""
+    if type(x) is not int or not 0 <= x < EXACT_SQUARE_LIMIT:
+        return None
+    root = int(math.sqrt(x))
+    while root * root > x:
+        root -= 1
+    while (root + 1) * (root + 1) <= x:
+        root += 1
+    return float(root) if root * root == x else None
+
+
+# Domain rules of the operations, shared by Calculator and the operation
+# registry in app.operations.
+def check_divisor(x, y):
+    if y == 0:
+        raise TypeError("Division by zero is not possible")
+
+
+def check_power_mod_domain(x, y, m):
+    if not all(isinstance(value, int) for value in (x, y, m)):
+        raise TypeError("Modular power parameters must be integers")
+    if m == 0:
+        raise ValueError("Modulus must not be zero")
+    if y < 0:
+        raise ValueError("Modular power exponent must not be negative")
+
+
+def check_square_root_domain(x):
+    if x < 0:
+        raise ValueError("No se puede calcular raíz cuadrada de números negativos")
+
+
+def check_logarithm_domain(x):
+    if x <= 0:
+        raise ValueError("No se puede calcular logaritmo de números <= 0")
+
+
 class Calculator:
+    MAX_POWER_BITS = 1 << 20
+
+    def __init__(self, max_power_bits=MAX_POWER_BITS, result_cache=None, tables=None):
+        self.max_power_bits = max_power_bits
+        self.result_cache = result_cache
+        self.tables = tables
+
     def add(self, x, y):
-        if not app.util.validate_permissions(f"{x} + {y}", "user1"):
+        if not app.util.validate_permissions(Operation("add", "{} + {}", x, y), "user1"):
             raise InvalidPermissions('User has no permissions')
         self.check_types(x, y)
         return x + y
 
     def substract(self, x, y):
-        if not app.util.validate_permissions(f"{x} - {y}", "user1"):
+        if not app.util.validate_permissions(Operation("substract", "{} - {}", x, y), "user1"):
             raise InvalidPermissions('User has no permissions')
         self.check_types(x, y)
         return x - y
 
     def multiply(self, x, y):
-        if not app.util.validate_permissions(f"{x} * {y}","user1"):
+        if not app.util.validate_permissions(Operation("multiply", "{} * {}", x, y), "user1"):
             raise InvalidPermissions('User has no permissions')
         self.check_types(x, y)
         return x * y
 
     def divide(self, x, y):
-        if not app.util.validate_permissions(f"{x} / {y}", "user1"):
+        if not app.util.validate_permissions(Operation("divide", "{} / {}", x, y), "user1"):
             raise InvalidPermissions('User has no permissions')
         self.check_types(x, y)
-        if y == 0:
-            raise TypeError("Division by zero is not possible")
+        check_divisor(x, y)
         return x / y
 
     def power(self, x, y):
-        if not app.util.validate_permissions(f"{x} ** {y}", "user1"):
+        if not app.util.validate_permissions(Operation("power", "{} ** {}", x, y), "user1"):
             raise InvalidPermissions('User has no permissions')
         self.check_types(x, y)
-        return x ** y
-    
+        self.check_power_cost(x, y)
+        return self.cached("power", lambda: x ** y, x, y)
+
+    def power_mod(self, x, y, m):
+        if not app.util.validate_permissions(Operation("power_mod", "pow({}, {}, {})", x, y, m), "user1"):
+            raise InvalidPermissions('User has no permissions')
+        check_power_mod_domain(x, y, m)
+        return pow(x, y, m)
+
+    def power_approx(self, x, y):
+        if not app.util.validate_permissions(Operation("power_approx", "{} ** {}", x, y), "user1"):
+            raise InvalidPermissions('User has no permissions')
+        self.check_types(x, y)
+        if estimate_power_bits(x, y) <= self.max_power_bits:
+            try:
+                return x ** y
+            except OverflowError:
+                pass  # a float power beyond the float range
+        exponent = float(y) * aggregate.magnitude_log10(abs(x))
+        if not math.isfinite(exponent):
+            raise OverflowError("Result is too large to approximate")
+        whole = math.floor(exponent)
+        return Approximation(x < 0 and y % 2 == 1, 10 ** (exponent - whole), whole)
+
+    def check_power_cost(self, x, y):
+        bits = estimate_power_bits(x, y)
+        if bits > self.max_power_bits:
+            # The estimate itself can be too long to print, as for 2 ** 2 ** 65536.
+            size = "about {}".format(bits) if bits.bit_length() <= 64 else "more than 2**{}".format(bits.bit_length() - 1)
+            raise ValueError("Result of {} bits exceeds the limit of {} bits".format(size, self.max_power_bits))
+
+    def cached(self, name, compute, *args):
+        if self.result_cache is None:
+            return compute()
+        return self.result_cache.get_or_compute(make_key(name, args), compute)
+
+    def sum(self, values):
+        self.check_aggregate_permissions("sum")
+        return aggregate.total(self.checked(values))
+
+    def product(self, values):
+        self.check_aggregate_permissions("product")
+        return aggregate.product(self.checked(values), self.max_power_bits)
+
+    def product_approx(self, values):
+        self.check_aggregate_permissions("product_approx")
+        return aggregate.log_product(self.checked(values))
+
+    def minimum(self, values):
+        self.check_aggregate_permissions("min")
+        return aggregate.minimum(self.checked(values))
+
+    def maximum(self, values):
+        self.check_aggregate_permissions("max")
+        return aggregate.maximum(self.checked(values))
+
+    def mean(self, values):
+        self.check_aggregate_permissions("mean")
+        return aggregate.mean(self.checked(values))
+
+    def variance(self, values):
+        self.check_aggregate_permissions("variance")
+        return aggregate.variance(self.checked(values))
+
+    def sample_variance(self, values):
+        self.check_aggregate_permissions("sample_variance")
+        return aggregate.variance(self.checked(values), ddof=1)
+
+    def check_aggregate_permissions(self, name):
+        # Checked once per reduction: the operands are still unread at this point.
+        if not app.util.validate_permissions(Operation(name, name + "(...)"), "user1"):
+            raise InvalidPermissions('User has no permissions')
+
+    def checked(self, values):
+        for value in values:
+            if not isinstance(value, NUMBER_TYPES):
+                raise TypeError("Parameters must be numbers")
+            yield value
+
     def check_types(self, x, y):
-        if not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
+        if not isinstance(x, NUMBER_TYPES) or not isinstance(y, NUMBER_TYPES):
             raise TypeError("Parameters must be numbers")
     
     def check_single_type(self, x):
-        if not isinstance(x, (int, float)):
+        if not isinstance(x, NUMBER_TYPES):
             raise TypeError("Parameter must be a number")
 
     def square_root(self, x):
-        if not app.util.validate_permissions(f"sqrt({x})", "user1"):
+        if not app.util.validate_permissions(Operation("sqrt", "sqrt({})", x), "user1"):
             raise InvalidPermissions('User has no permissions')
+        if self.tables is not None:
+            value = self.tables.sqrt.lookup(x)
+            if value is not None:
+                return value
         self.check_single_type(x)
-        if x < 0:
-            raise ValueError("No se puede calcular raíz cuadrada de números negativos")
-        return math.sqrt(x)
+        check_square_root_domain(x)
+        exact = exact_square_root(x)
+        if exact is not None:
+            return exact
+        if type(x) is int:
+            return self.cached("sqrt", lambda: intmath.square_root(x), x)
+        return self.cached("sqrt", lambda: x.sqrt() if isinstance(x, Decimal) else math.sqrt(x), x)
     
     def logarithm_base_10(self, x):
-        if not app.util.validate_permissions(f"log10({x})", "user1"):
+        if not app.util.validate_permissions(Operation("log10", "log10({})", x), "user1"):
             raise InvalidPermissions('User has no permissions')
+        if self.tables is not None:
+            value = self.tables.log10.lookup(x)
+            if value is not None:
+                return value
         self.check_single_type(x)
-        if x <= 0:
-            raise ValueError("No se puede calcular logaritmo de números <= 0")
-        return math.log10(x)
+        check_logarithm_domain(x)
+        if type(x) is int:
+            # Hashing a huge int reads all of it, so only small ones are looked up.
+            if x.bit_length() <= 1024 and x in POWERS_OF_TEN:
+                return POWERS_OF_TEN[x]
+            return self.cached("log10", lambda: intmath.log10(x), x)
+        if isinstance(x, Fraction) and max(x.numerator, x.denominator).bit_length() > 1023:
+            # Too large for float(x); the logs of both parts are still exact enough.
+            return self.cached("log10", lambda: intmath.log10(x.numerator) - intmath.log10(x.denominator), x)
+        return self.cached("log10", lambda: x.log10() if isinstance(x, Decimal) else math.log10(x), x)
 
 if __name__ == "__main__":  # pragma: no cover
     calc = Calculator()
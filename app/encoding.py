@@ -0,0 +1,167 @@
+"""Response encoders chosen through the Accept header.
+
+text/plain is the historical format and the default. application/json wraps
+a result as {"result": ...}, with infinities and NaN, which JSON has no
+literal for, as the strings "inf", "-inf" and "nan". application/octet-stream
+is a compact binary format made of tagged little-endian records:
+
+    b"q" int64                      integers that fit in 64 bits
+    b"d" float64                    floats
+    b"i" uint32 length + bytes      larger integers, signed two's complement
+    b"s" uint32 length + UTF-8      anything else, as text
+    b"e" uint16 status + uint32 length + UTF-8 message
+
+A batch is a uint32 count followed by one record per item. Big integers are
+written with int.to_bytes, so they never pay for a decimal conversion.
+"""
+import functools
+import math
+import struct
+import threading
+
+from app import util
+from app.operations import item_json
+from app.operations import item_result
+
+INT64 = struct.Struct("<cq")
+FLOAT64 = struct.Struct("<cd")
+SIZED = struct.Struct("<cI")
+ERROR = struct.Struct("<cHI")
+COUNT = struct.Struct("<I")
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+# A thread keeps its binary buffer between responses unless it grew past this.
+MAX_RETAINED_BUFFER = 1024 * 1024
+
+
+class TextEncoder:
+    media_type = "text/plain"
+
+    def encode(self, result):
+        if type(result) is int:
+            return util.integer_text(result).encode("ascii")
+        return "{}".format(result).encode("utf-8")
+
+
+class JsonEncoder:
+    media_type = "application/json"
+
+    def encode(self, result):
+        # json.dumps writes ints and finite floats with repr, without the dict.
+        if type(result) is int:
+            return '{{"result": {}}}'.format(util.integer_text(result)).encode("ascii")
+        if type(result) is float and math.isfinite(result):
+            return '{{"result": {!r}}}'.format(result).encode("utf-8")
+        return item_json({"result": item_result(result)}).encode("utf-8")
+
+    def encode_items(self, items):
+        return "[{}]".format(", ".join(item_json(item) for item in items)).encode("utf-8")
+
+
+class BinaryEncoder:
+    media_type = "application/octet-stream"
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def encode(self, result):
+        if type(result) is float:
+            return FLOAT64.pack(b"d", result)
+        if type(result) is int and INT64_MIN <= result <= INT64_MAX:
+            return INT64.pack(b"q", result)
+        buffer = self.buffer()
+        self.write(buffer, result)
+        return self.release(buffer)
+
+    def encode_items(self, items):
+        buffer = self.buffer()
+        buffer += COUNT.pack(len(items))
+        for item in items:
+            if "result" in item:
+                self.write(buffer, item["result"])
+            else:
+                message = item["error"].encode("utf-8")
+                buffer += ERROR.pack(b"e", item["status"], len(message))
+                buffer += message
+        return self.release(buffer)
+
+    def write(self, buffer, value):
+        if type(value) is int:
+            if INT64_MIN <= value <= INT64_MAX:
+                buffer += INT64.pack(b"q", value)
+                return
+            data = value.to_bytes(value.bit_length() // 8 + 1, "little", signed=True)
+            buffer += SIZED.pack(b"i", len(data))
+            buffer += data
+        elif type(value) is float:
+            buffer += FLOAT64.pack(b"d", value)
+        else:
+            text = str(value).encode("utf-8")
+            buffer += SIZED.pack(b"s", len(text))
+            buffer += text
+
+    def buffer(self):
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None:
+            buffer = self.local.buffer = bytearray()
+        return buffer
+
+    def release(self, buffer):
+        data = bytes(buffer)
+        if len(buffer) > MAX_RETAINED_BUFFER:
+            self.local.buffer = None
+        else:
+            del buffer[:]
+        return data
+
+
+TEXT = TextEncoder()
+JSON = JsonEncoder()
+BINARY = BinaryEncoder()
+ENCODERS = (TEXT, JSON, BINARY)
+BATCH_ENCODERS = (JSON, BINARY)
+
+
+@functools.lru_cache(maxsize=256)
+def negotiate(accept, encoders=ENCODERS):
+    """Returns the encoder the Accept header prefers, or the first encoder.
+
+    Each encoder takes the quality of the most specific media range that
+    matches it, so "text/plain;q=0, */*" excludes text. Higher quality wins,
+    then the more specific range, then the range listed first.
+    """
+    ranges = []
+    for media_range in (accept or "").split(","):
+        media, _, parameters = media_range.partition(";")
+        ranges.append((media.strip().lower(), parse_quality(parameters)))
+    chosen, best = encoders[0], None
+    for encoder in encoders:
+        match = None
+        for position, (media, quality) in enumerate(ranges):
+            rank = specificity(media, encoder.media_type)
+            if rank >= 0 and (match is None or rank > match[1]):
+                match = (quality, rank, -position)
+        if match is not None and match[0] > 0 and (best is None or match > best):
+            chosen, best = encoder, match
+    return chosen
+
+
+def parse_quality(parameters):
+    for parameter in parameters.split(";"):
+        name, _, value = parameter.partition("=")
+        if name.strip() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def specificity(media, media_type):
+    if media == media_type:
+        return 2
+    if media == "*/*":
+        return 0
+    if media.endswith("/*") and media_type.startswith(media[:-1]):
+        return 1
+    return -1
@@ -0,0 +1,50 @@
+"""HTTP validators for the /calc/<op>/... routes.
+
+A result is a pure function of the operation, the parsed operands, the
+numeric backend and precision, and the response media type, so the entity
+tag is a digest of exactly those. It is computed before evaluating, which
+lets a matching If-None-Match be answered with 304 without any work (only
+the permission check runs), and because it is taken over parsed numbers,
+spellings such as "0005", "+5" and " 5" share one tag. If-None-Match: *
+says nothing about the operands, so it is only honoured once the result
+has been evaluated without errors. Bump VERSION whenever a representation
+changes.
+
+Configuration: CALC_CACHE_MAX_AGE, in seconds (0 sends no-cache).
+"""
+import hashlib
+import os
+
+from app import numeric
+from app.cache import serialize_key
+
+VERSION = "1"
+MAX_AGE = int(os.environ.get("CALC_CACHE_MAX_AGE", 365 * 24 * 60 * 60))
+CACHE_CONTROL = "public, max-age={}, immutable".format(MAX_AGE) if MAX_AGE > 0 else "no-cache"
+
+
+def entity_tag(operation, numbers, backend, precision, media_type):
+    operands = serialize_key((operation.name,) + tuple((type(number), number) for number in numbers))
+    digest = hashlib.sha256(operands)
+    digest.update("|{}|{}|{}|{}".format(
+        VERSION, backend, precision if backend == numeric.DECIMAL else "", media_type).encode("ascii"))
+    return '"{}"'.format(digest.hexdigest()[:32])
+
+
+def candidates(if_none_match):
+    return [candidate.strip() for candidate in if_none_match.split(",")] if if_none_match else []
+
+
+def matches(if_none_match, tag):
+    """Weak comparison of If-None-Match against tag, as RFC 7232 asks for GET; * is left to matches_any."""
+    for candidate in candidates(if_none_match):
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+    return False
+
+
+def matches_any(if_none_match):
+    """True for If-None-Match: *, which matches any representation that exists."""
+    return "*" in candidates(if_none_match)
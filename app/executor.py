@@ -0,0 +1,312 @@
+import os
+import signal
+import threading
+import time
+
+from app import util
+from app.cache import MISSING
+from app.cache import make_key
+from app.calc import Calculator
+from app.calc import InvalidPermissions
+from app.calc import Operation
+from app.calc import estimate_power_bits
+
+WORKER_CALCULATOR = None
+# How often an idle worker checks that the process that started it still runs.
+PARENT_CHECK_INTERVAL = 1.0
+# Operations whose results Calculator.cached stores, under these same names.
+CACHED_OPERATIONS = frozenset(["power", "sqrt", "log10"])
+
+
+class ComputationTimeout(Exception):
+    pass
+
+
+def operation_cost(operation, numbers):
+    """Estimated size in bits of the result, the proxy used for CPU cost."""
+    if operation.name in ("power", "power_approx"):
+        return estimate_power_bits(numbers[0], numbers[1])
+    if operation.name == "multiply":
+        return sum(number.bit_length() if isinstance(number, int) else 64 for number in numbers)
+    if operation.name == "sqrt" and isinstance(numbers[0], int):
+        # An exact root of a huge perfect square needs a full isqrt.
+        return max(64, numbers[0].bit_length())
+    return 64
+
+
+class Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Lets concurrent callers with the same key share one computation.
+
+    The first caller for a key (the leader) computes; callers arriving while
+    it runs wait for its result, or its exception, for at most timeout
+    seconds. A follower first calls follow, if given, to run the checks the
+    leader's computation made for the leader alone. Nothing is kept once the
+    leader finishes: later callers start a new computation, and remembering
+    results is the result cache's job.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.timeouts = 0
+
+    def do(self, key, compute, timeout=None, follow=None):
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is None:
+                flight = self.flights[key] = Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                self.followers += 1
+                leader = False
+        if leader:
+            return self.lead(key, flight, compute)
+        if follow is not None:
+            follow()
+        if not flight.done.wait(timeout):
+            with self.lock:
+                self.timeouts += 1
+            raise ComputationTimeout("Computation exceeded the time budget of {} seconds".format(timeout))
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def lead(self, key, flight, compute):
+        try:
+            flight.result = compute()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            flight.error = ComputationTimeout("Computation was interrupted")
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self.lock:
+            return {"leaders": self.leaders, "followers": self.followers, "timeouts": self.timeouts,
+                    "in_flight": len(self.flights)}
+
+
+def run_in_worker(method, numbers, max_power_bits):
+    global WORKER_CALCULATOR
+    if WORKER_CALCULATOR is None or WORKER_CALCULATOR.max_power_bits != max_power_bits:
+        WORKER_CALCULATOR = Calculator(max_power_bits=max_power_bits)
+    return getattr(WORKER_CALCULATOR, method)(*numbers)
+
+
+def serve_tasks(connection):
+    """Main loop of a WorkerPool process: runs tasks until it receives None or its parent exits."""
+    # A forked worker inherits the server's handlers; uvicorn's would turn
+    # terminate() into a no-op. Interrupts are the parent's to handle.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    parent = os.getppid()
+    while True:
+        try:
+            if not connection.poll(PARENT_CHECK_INTERVAL):
+                # Other workers hold copies of the pipe, so a parent that
+                # dies without closing the pool never sends EOF.
+                if os.getppid() != parent:
+                    return
+                continue
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        function, args = task
+        try:
+            reply = (True, function(*args))
+        except Exception as e:
+            reply = (False, e)
+        connection.send(reply)
+
+
+class Worker:
+    def __init__(self):
+        # Imported on first use: multiprocessing is a noticeable share of
+        # startup time for processes that never offload.
+        import multiprocessing
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve_tasks, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def stop(self):
+        self.process.terminate()
+        self.connection.close()
+        self.process.join()
+
+    def close(self):
+        # Not just closing the pipe: forked workers hold copies of its ends.
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.connection.close()
+        self.process.join()
+
+
+class WorkerPool:
+    """Up to max_workers processes, each running one task at a time.
+
+    ProcessPoolExecutor cannot cancel a running task, and terminating its
+    workers fails every other task in progress. Here each task has a worker
+    to itself, so a task that misses its deadline is stopped by terminating
+    that worker alone; the next task starts a new one. Waiting for a free
+    worker counts against the same deadline.
+    """
+
+    def __init__(self, max_workers):
+        self.slots = threading.BoundedSemaphore(max_workers)
+        self.idle = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def run(self, function, args, timeout):
+        deadline = time.monotonic() + timeout
+        if not self.slots.acquire(timeout=timeout):
+            raise ComputationTimeout("Computation exceeded the time budget of {} seconds".format(timeout))
+        try:
+            worker = self.checkout()
+            try:
+                worker.connection.send((function, args))
+                if not worker.connection.poll(max(0.0, deadline - time.monotonic())):
+                    worker.stop()
+                    raise ComputationTimeout("Computation exceeded the time budget of {} seconds".format(timeout))
+                ok, value = worker.connection.recv()
+            except (EOFError, OSError):
+                worker.stop()
+                raise ComputationTimeout("Computation was interrupted")
+            self.checkin(worker)
+        finally:
+            self.slots.release()
+        if not ok:
+            raise value
+        return value
+
+    def checkout(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return Worker()
+
+    def checkin(self, worker):
+        with self.lock:
+            if not self.closed:
+                self.idle.append(worker)
+                return
+        worker.close()
+
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+            idle, self.idle = self.idle, []
+        for worker in idle:
+            worker.close()
+
+
+class ExecutionLayer:
+    """Runs cheap operations inline and offloads costly ones to processes.
+
+    Operations whose operation_cost exceeds cost_threshold_bits go to a
+    WorkerPool, so big-integer work no longer holds the GIL of the serving
+    process. For the operations the calculator caches itself, their results
+    are stored in its result cache and a hit is served from it after a
+    permission check in this process. A task that misses its time budget
+    is stopped with its worker alone.
+
+    Operations costlier than coalesce_threshold_bits go through a
+    SingleFlight, so identical requests arriving together are computed once.
+    Followers share the leader's result after their own permission check.
+    """
+
+    def __init__(self, calculator, cost_threshold_bits=1 << 16, timeout=5.0, max_workers=2,
+                 coalesce_threshold_bits=1 << 12):
+        self.calculator = calculator
+        self.cost_threshold_bits = cost_threshold_bits
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.coalesce_threshold_bits = coalesce_threshold_bits
+        self.flights = SingleFlight()
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def evaluate(self, operation, numbers):
+        cost = operation_cost(operation, numbers)
+        if cost <= self.coalesce_threshold_bits:
+            return self.dispatch(operation, numbers, cost)
+        return self.flights.do(make_key(operation.name, numbers), lambda: self.dispatch(operation, numbers, cost),
+                               self.timeout, lambda: self.authorize(operation, numbers))
+
+    def dispatch(self, operation, numbers, cost):
+        if cost <= self.cost_threshold_bits:
+            return getattr(self.calculator, operation.method)(*numbers)
+        cache = self.calculator.result_cache
+        if cache is None or operation.name not in CACHED_OPERATIONS:
+            return self.offload(operation, numbers)
+        key = make_key(operation.name, numbers)
+        result = cache.get(key, MISSING)
+        if result is not MISSING:
+            self.authorize(operation, numbers)
+            return result
+        result = self.offload(operation, numbers)
+        cache.put(key, result)
+        return result
+
+    def authorize(self, operation, numbers):
+        """The permission check the calculator would run, for results it does not compute."""
+        template = "{}({})".format(operation.name, ", ".join(["{}"] * len(numbers)))
+        if not util.validate_permissions(Operation(operation.name, template, *numbers), "user1"):
+            raise InvalidPermissions('User has no permissions')
+
+    def budgeted(self, values):
+        """Passes values through, raising ComputationTimeout once the time budget is spent.
+
+        For reductions over a request body, which are computed in this
+        process while the body is read and cannot be sent to a worker.
+        """
+        deadline = time.monotonic() + self.timeout
+        for value in values:
+            if time.monotonic() >= deadline:
+                raise ComputationTimeout("Computation exceeded the time budget of {} seconds".format(self.timeout))
+            yield value
+
+    def offload(self, operation, numbers):
+        validate = getattr(operation, "validate", None)
+        if validate is not None:
+            # Domain errors are answered here rather than after a round trip
+            # to a worker, once the caller is known to be allowed to ask.
+            self.authorize(operation, numbers)
+            validate(*numbers)
+        return self.get_pool().run(run_in_worker, (operation.method, numbers, self.calculator.max_power_bits),
+                                   self.timeout)
+
+    def get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = WorkerPool(self.max_workers)
+            return self.pool
+
+    def shutdown(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown()
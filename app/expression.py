@@ -0,0 +1,191 @@
+"""Safe arithmetic expressions compiled into calls to Calculator operations.
+
+Supported syntax: numbers, variables, + - * / **, unary minus, parentheses
+and the functions sqrt(...) and log10(...). Compiled expressions are kept in
+an LRU keyed by the expression text and numeric backend, so evaluating the same template with
+new variable bindings never parses it again.
+"""
+import functools
+import re
+
+from app import util
+from app.operations import OPERATIONS
+from app.operations import item_operand
+from app.operations import load_json
+
+MAX_EXPRESSION_LENGTH = 1000
+MAX_NESTING = 50
+COMPILE_CACHE_SIZE = 256
+FUNCTIONS = {"sqrt": "sqrt", "log10": "log10"}
+TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z_]\w*)|(\*\*|[-+*/()]))")
+BINARY = {"+": "add", "-": "substract", "*": "multiply", "/": "divide", "**": "power"}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class CompiledExpression:
+    __slots__ = ("text", "variables", "root")
+
+    def __init__(self, text, variables, root):
+        self.text = text
+        self.variables = variables
+        self.root = root
+
+    def evaluate(self, evaluator, bindings):
+        missing = self.variables.difference(bindings)
+        if missing:
+            raise ExpressionError("Unknown variables: {}".format(", ".join(sorted(missing))))
+        return self.root(evaluator, bindings)
+
+
+def tokenize(text):
+    tokens, position = [], 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None:
+            raise ExpressionError("Unexpected character at position {}".format(position))
+        number, name, symbol = match.groups()
+        tokens.append(("number", number) if number else ("name", name) if name else ("symbol", symbol))
+        position = match.end()
+    return tokens
+
+
+def constant(value):
+    return lambda evaluator, bindings: value
+
+
+def variable(name):
+    return lambda evaluator, bindings: bindings[name]
+
+
+def apply(operation_name, *arguments):
+    operation = OPERATIONS[operation_name]
+
+    def node(evaluator, bindings):
+        return evaluator(operation, [argument(evaluator, bindings) for argument in arguments])
+
+    return node
+
+
+def chain(first, rest):
+    """Left-associative run of binary operators, evaluated in a loop so its length adds no stack depth."""
+    if not rest:
+        return first
+    steps = [(OPERATIONS[BINARY[symbol]], operand) for symbol, operand in rest]
+
+    def node(evaluator, bindings):
+        value = first(evaluator, bindings)
+        for operation, operand in steps:
+            value = evaluator(operation, [value, operand(evaluator, bindings)])
+        return value
+
+    return node
+
+
+class Parser:
+    def __init__(self, tokens, backend=None):
+        self.tokens = tokens
+        self.backend = backend
+        self.position = 0
+        self.depth = 0
+        self.variables = set()
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self, symbol=None):
+        token = self.peek()
+        if token[0] is None or (symbol is not None and token != ("symbol", symbol)):
+            raise ExpressionError("Expected {}".format(symbol or "an operand"))
+        self.position += 1
+        return token
+
+    def parse(self):
+        root = self.expression()
+        if self.position != len(self.tokens):
+            raise ExpressionError("Unexpected token {!r}".format(self.peek()[1]))
+        return root
+
+    def expression(self):
+        node, rest = self.term(), []
+        while self.peek() in (("symbol", "+"), ("symbol", "-")):
+            rest.append((self.take()[1], self.term()))
+        return chain(node, rest)
+
+    def term(self):
+        node, rest = self.unary(), []
+        while self.peek() in (("symbol", "*"), ("symbol", "/")):
+            rest.append((self.take()[1], self.unary()))
+        return chain(node, rest)
+
+    def unary(self):
+        if self.peek() == ("symbol", "-"):
+            self.take()
+            return apply("multiply", constant(-1), self.nested(self.unary))
+        if self.peek() == ("symbol", "+"):
+            self.take()
+            return self.nested(self.unary)
+        return self.power()
+
+    def power(self):
+        node = self.atom()
+        if self.peek() == ("symbol", "**"):
+            self.take()
+            node = apply("power", node, self.nested(self.unary))
+        return node
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == "number":
+            return constant(util.convert_to_number(value, self.backend))
+        if kind == "name" and self.peek() == ("symbol", "("):
+            if value not in FUNCTIONS:
+                raise ExpressionError("Unknown function {}".format(value))
+            return apply(FUNCTIONS[value], self.parenthesized())
+        if kind == "name":
+            self.variables.add(value)
+            return variable(value)
+        if value == "(":
+            self.position -= 1
+            return self.parenthesized()
+        raise ExpressionError("Unexpected token {!r}".format(value))
+
+    def parenthesized(self):
+        self.take("(")
+        node = self.nested(self.expression)
+        self.take(")")
+        return node
+
+    def nested(self, rule):
+        self.depth += 1
+        if self.depth > MAX_NESTING:
+            raise ExpressionError("Expression is nested too deeply")
+        try:
+            return rule()
+        finally:
+            self.depth -= 1
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_expression(text, backend=None):
+    if len(text) > MAX_EXPRESSION_LENGTH:
+        raise ExpressionError("Expression is longer than {} characters".format(MAX_EXPRESSION_LENGTH))
+    parser = Parser(tokenize(text), backend)
+    root = parser.parse()
+    return CompiledExpression(text, frozenset(parser.variables), root)
+
+
+def evaluate_body(text, backend, evaluator):
+    """Evaluates a /calc/eval request body: {"expr": "...", "vars": {name: operand}}."""
+    body = load_json(text)
+    if not isinstance(body, dict) or not isinstance(body.get("expr"), str):
+        raise ValueError("Body must be an object with an expr string")
+    bindings = body.get("vars", {})
+    if not isinstance(bindings, dict):
+        raise ValueError("vars must be an object")
+    compiled = compile_expression(body["expr"], backend)
+    numbers = {name: item_operand(value, backend) for name, value in bindings.items()}
+    return compiled.evaluate(evaluator, numbers)
@@ -0,0 +1,99 @@
+"""Square roots and base-10 logarithms of ints of any size.
+
+math.sqrt and math.log10 first convert an int to float, which rounds it to
+53 bits and fails with OverflowError past about 1.8e308. These functions
+work on the int itself: a perfect square has an exact root whatever its
+size, other roots are correctly rounded floats while they fit one and a
+scientific-notation Approximation beyond that, and log10 reads the leading
+bits plus bit_length() without converting the whole number.
+"""
+import math
+from decimal import ROUND_FLOOR, Decimal, localcontext
+
+
+def newton_isqrt(n):
+    """floor(sqrt(n)), with the precision-doubling Newton iteration of CPython's math.isqrt."""
+    if n < 0:
+        raise ValueError("isqrt() argument must be nonnegative")
+    if n == 0:
+        return 0
+    c = (n.bit_length() - 1) // 2
+    a, d = 1, 0
+    for s in reversed(range(c.bit_length())):
+        e, d = d, c >> s
+        a = (a << d - e - 1) + (n >> 2 * c - e - d + 1) // a
+    return a - (a * a > n)
+
+
+# math.isqrt is new in Python 3.8.
+isqrt = getattr(math, "isqrt", newton_isqrt)
+
+# A square is a quadratic residue modulo every m; a non-square passes all of
+# these with probability about 2e-5, so isqrt only runs on likely squares.
+SQUARE_MODULI = (64, 63, 65, 11, 17, 19, 23, 29, 31, 37, 41, 43, 47)
+SQUARE_RESIDUES = tuple(frozenset(i * i % m for i in range(m)) for m in SQUARE_MODULI)
+SQUARE_MODULUS = 1
+for _modulus in SQUARE_MODULI:
+    SQUARE_MODULUS *= _modulus
+# Bits kept when rounding a root to float: enough that round-to-nearest of
+# the truncated root, with a sticky bit, is the correctly rounded result.
+ROOT_BITS = 64
+FLOAT_INT_LIMIT = 1 << 53
+LOG10_2_TEXT = "0.30102999566398119521373889472449302676818988146211"
+# log10(2) split so that shift * LOG10_2_HIGH is exact for shifts below 2 ** 27.
+LOG10_2_HIGH = math.floor(math.log10(2) * 2 ** 26) / 2 ** 26
+LOG10_2_LOW = float(Decimal(LOG10_2_TEXT) - Decimal(LOG10_2_HIGH))
+
+
+def could_be_square(n):
+    residue = n % SQUARE_MODULUS
+    return all(residue % modulus in residues for modulus, residues in zip(SQUARE_MODULI, SQUARE_RESIDUES))
+
+
+def square_root(n):
+    """sqrt of an int n >= 0.
+
+    Returns the exact root of a perfect square (a float when it is below
+    2 ** 53, an int beyond), otherwise the correctly rounded float, or an
+    Approximation when the root does not fit a float.
+    """
+    if could_be_square(n):
+        root = isqrt(n)
+        if root * root == n:
+            return float(root) if root < FLOAT_INT_LIMIT else root
+    # Scaled by 4 ** -shift to 2 * ROOT_BITS bits, so the root has ROOT_BITS.
+    shift = (n.bit_length() - 2 * ROOT_BITS) // 2
+    root = isqrt(n >> 2 * shift if shift >= 0 else n << -2 * shift)
+    # n is not a square, so the true root lies strictly between root and
+    # root + 1: setting the lowest bit keeps the float rounding correct.
+    try:
+        return math.ldexp(float(root | 1), shift)
+    except OverflowError:
+        return scientific(root, shift)
+
+
+def log10(n):
+    """log10 of an int n > 0, exact for powers of ten."""
+    bits = n.bit_length()
+    if bits <= 1023:
+        value = math.log10(n)
+        shift = 0
+    else:
+        shift = bits - ROOT_BITS
+        value = math.fsum((math.log10(n >> shift), shift * LOG10_2_HIGH, shift * LOG10_2_LOW))
+    nearest = round(value)
+    # 10 ** k ends in exactly k zero bits, which rules out near misses cheaply.
+    if abs(value - nearest) < 1e-9 and (n & -n).bit_length() - 1 == nearest and n == 10 ** nearest:
+        return float(nearest)
+    return value
+
+
+def scientific(significand, binary_exponent):
+    """Approximation of significand * 2 ** binary_exponent, with 15 correct digits."""
+    from app.calc import Approximation
+    with localcontext() as context:
+        context.prec = 40
+        exponent10 = Decimal(binary_exponent) * Decimal(LOG10_2_TEXT) + Decimal(significand).log10()
+        whole = exponent10.to_integral_value(rounding=ROUND_FLOOR)
+        mantissa = float(Decimal(10) ** (exponent10 - whole))
+    return Approximation(False, mantissa, int(whole))
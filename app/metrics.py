@@ -0,0 +1,192 @@
+"""In-process counters and latency histograms in Prometheus text format.
+
+Every thread writes to its own shard, so recording a sample takes no lock;
+shards are only summed when /metrics is scraped. Shards of finished threads
+(the dev server uses one thread per request) are folded into a retired
+total so their number stays bounded.
+"""
+import bisect
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+MAX_IDLE_SHARDS = 64
+HELP = {
+    "calc_http_requests_total": "HTTP requests by endpoint and status code.",
+    "calc_http_request_duration_seconds": "Time to produce the HTTP response by endpoint.",
+    "calc_operation_phase_seconds": "Time spent per operation in the parse, permission, compute and format phases.",
+    "calc_operation_errors_total": "Failed operations by exception type.",
+}
+
+
+class Shard:
+    __slots__ = ("counters", "histograms", "permission_seconds", "thread")
+
+    def __init__(self, thread=None):
+        self.counters = {}
+        self.histograms = {}
+        self.permission_seconds = 0.0
+        self.thread = thread
+
+    def merge(self, other):
+        for key, value in list(other.counters.items()):
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, values in list(other.histograms.items()):
+            total = self.histograms.get(key)
+            if total is None:
+                total = self.histograms[key] = [0] * (len(values) - 1) + [0.0]
+            for index, value in enumerate(values):
+                total[index] += value
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.local = threading.local()
+        self.shards = []
+        self.retired = Shard()
+        self.lock = threading.Lock()
+
+    def shard(self):
+        try:
+            return self.local.shard
+        except AttributeError:
+            shard = self.local.shard = Shard(threading.current_thread())
+            with self.lock:
+                self.shards.append(shard)
+                if len(self.shards) > MAX_IDLE_SHARDS:
+                    self.retire_finished_shards()
+            return shard
+
+    def retire_finished_shards(self):
+        alive = []
+        for shard in self.shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                self.retired.merge(shard)
+        self.shards = alive
+
+    def inc(self, name, labels, value=1):
+        counters = self.shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        histograms = self.shard().histograms
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+
+    def add_permission_time(self, seconds):
+        self.shard().permission_seconds += seconds
+
+    def take_permission_time(self):
+        shard = self.shard()
+        seconds, shard.permission_seconds = shard.permission_seconds, 0.0
+        return seconds
+
+    def timer(self, operation):
+        return PhaseTimer(self, operation)
+
+    def collect(self):
+        total = Shard()
+        with self.lock:
+            self.retire_finished_shards()
+            total.merge(self.retired)
+            shards = list(self.shards)
+        for shard in shards:
+            total.merge(shard)
+        return total.counters, total.histograms
+
+    def render(self, gauges=()):
+        counters, histograms = self.collect()
+        lines, described = [], set()
+        for (name, labels), value in sorted(counters.items()):
+            self.describe(lines, described, name, "counter")
+            lines.append("{}{} {}".format(name, format_labels(labels), value))
+        for (name, labels), values in sorted(histograms.items()):
+            self.describe(lines, described, name, "histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                bucket_labels = labels + (("le", "+Inf" if bound == float("inf") else repr(bound)),)
+                lines.append("{}_bucket{} {}".format(name, format_labels(bucket_labels), cumulative))
+            lines.append("{}_sum{} {!r}".format(name, format_labels(labels), values[-1]))
+            lines.append("{}_count{} {}".format(name, format_labels(labels), cumulative))
+        for name, kind, value in gauges:
+            lines.append("# TYPE {} {}".format(name, kind))
+            lines.append("{} {}".format(name, value))
+        return "\n".join(lines) + "\n"
+
+    def describe(self, lines, described, name, kind):
+        if name in described:
+            return
+        described.add(name)
+        if name in HELP:
+            lines.append("# HELP {} {}".format(name, HELP[name]))
+        lines.append("# TYPE {} {}".format(name, kind))
+
+
+class PhaseTimer:
+    """Splits one operation into phases; permission time is measured inside
+    validate_permissions and carved out of the compute phase."""
+
+    __slots__ = ("metrics", "operation", "last")
+
+    def __init__(self, metrics, operation):
+        self.metrics = metrics
+        self.operation = operation
+        self.last = time.perf_counter()
+        metrics.take_permission_time()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.metrics.observe("calc_operation_phase_seconds", (("operation", self.operation), ("phase", phase)),
+                             now - self.last)
+        self.last = now
+
+    def mark_compute(self):
+        now = time.perf_counter()
+        permission = self.metrics.take_permission_time()
+        self.metrics.observe("calc_operation_phase_seconds",
+                             (("operation", self.operation), ("phase", "permission")), permission)
+        self.metrics.observe("calc_operation_phase_seconds",
+                             (("operation", self.operation), ("phase", "compute")), now - self.last - permission)
+        self.last = now
+
+    def error(self, error):
+        self.metrics.inc("calc_operation_errors_total",
+                         (("operation", self.operation), ("exception", type(error).__name__)))
+
+
+def service_gauges(cache, flights):
+    """Gauges from the stats() of a result cache and of a SingleFlight."""
+    return [
+        ("calc_result_cache_hits_total", "counter", cache["hits"]),
+        ("calc_result_cache_misses_total", "counter", cache["misses"]),
+        ("calc_result_cache_evictions_total", "counter", cache["evictions"]),
+        ("calc_result_cache_entries", "gauge", cache["entries"]),
+        ("calc_result_cache_bytes", "gauge", cache["bytes"]),
+        ("calc_coalesced_computations_total", "counter", flights["leaders"]),
+        ("calc_coalesced_requests_total", "counter", flights["followers"]),
+        ("calc_coalesce_timeouts_total", "counter", flights["timeouts"]),
+    ]
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(key, escape(value)) for key, value in labels) + "}"
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+METRICS = Metrics()
@@ -0,0 +1,55 @@
+"""Numeric backends: how operands are parsed and which arithmetic applies.
+
+float is the fast path. decimal parses operands as decimal.Decimal and
+evaluates under a context of configurable precision. fraction parses them as
+fractions.Fraction, so add, substract, multiply and divide are exact. A
+backend is chosen per request with ?numeric= (plus ?precision= for decimal)
+or per deployment with CALC_NUMERIC and CALC_DECIMAL_PRECISION.
+"""
+import decimal
+import os
+
+FLOAT = "float"
+DECIMAL = "decimal"
+FRACTION = "fraction"
+BACKENDS = (FLOAT, DECIMAL, FRACTION)
+MAX_PRECISION = 1000
+DEFAULT_BACKEND = os.environ.get("CALC_NUMERIC", FLOAT)
+DEFAULT_PRECISION = int(os.environ.get("CALC_DECIMAL_PRECISION", decimal.DefaultContext.prec))
+
+if DEFAULT_BACKEND not in BACKENDS:
+    raise ValueError("CALC_NUMERIC must be one of {}".format(", ".join(BACKENDS)))
+
+
+def select(options):
+    """Returns the (backend, precision) requested by the query arguments."""
+    backend = options.get("numeric", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        raise ValueError("Numeric backend must be one of {}".format(", ".join(BACKENDS)))
+    precision = options.get("precision")
+    if precision is None:
+        return backend, DEFAULT_PRECISION
+    try:
+        precision = int(precision)
+    except ValueError:
+        raise ValueError("Precision must be an integer")
+    if not 1 <= precision <= MAX_PRECISION:
+        raise ValueError("Precision must be between 1 and {}".format(MAX_PRECISION))
+    return backend, precision
+
+
+def evaluator(evaluate, backend, precision):
+    """Wraps evaluate so decimal operations run under the given precision."""
+    if backend != DECIMAL:
+        return evaluate
+
+    def evaluate_in_context(operation, numbers):
+        with decimal.localcontext() as context:
+            context.prec = precision
+            try:
+                return evaluate(operation, numbers)
+            except decimal.DecimalException as e:
+                # Trapped signals carry their list of conditions as message.
+                raise ValueError("Decimal operation failed: {}".format(type(e).__name__))
+
+    return evaluate_in_context
@@ -0,0 +1,224 @@
+import decimal
+import http.client
+import json
+import math
+import sys
+from collections import namedtuple
+
+from app import numeric
+from app import util
+from app.calc import Calculator
+from app.calc import InvalidPermissions
+from app.calc import check_divisor
+from app.calc import check_logarithm_domain
+from app.calc import check_power_mod_domain
+from app.calc import check_square_root_domain
+from app.executor import ComputationTimeout
+
+# variants maps a query argument to the operation it switches to; a variant
+# with a higher arity receives the argument value as its extra operand.
+# validate, when set, is called with the numbers and raises on a domain error.
+OperationSpec = namedtuple("OperationSpec", ["name", "arity", "method", "routed", "variants", "validate"])
+
+
+def spec(name, arity, method, routed=True, variants=(), validate=None):
+    return OperationSpec(name, arity, method, routed, variants, validate)
+
+
+OPERATIONS = {
+    operation.name: operation
+    for operation in (
+        spec("add", 2, "add"),
+        spec("substract", 2, "substract"),
+        spec("multiply", 2, "multiply"),
+        spec("divide", 2, "divide", validate=check_divisor),
+        spec("power", 2, "power", variants=(("mod", "power_mod"), ("approx", "power_approx"))),
+        spec("power_mod", 3, "power_mod", routed=False, validate=check_power_mod_domain),
+        spec("power_approx", 2, "power_approx", routed=False),
+        spec("sqrt", 1, "square_root", validate=check_square_root_domain),
+        spec("log10", 1, "logarithm_base_10", validate=check_logarithm_domain),
+    )
+}
+
+# Reductions over any number of operands; their single argument is an
+# iterable of numbers, consumed once.
+AGGREGATES = {
+    operation.name: operation
+    for operation in (
+        spec("sum", 1, "sum"),
+        spec("product", 1, "product", variants=(("approx", "product_approx"),)),
+        spec("product_approx", 1, "product_approx", routed=False),
+        spec("min", 1, "minimum"),
+        spec("max", 1, "maximum"),
+        spec("mean", 1, "mean"),
+        spec("variance", 1, "variance", variants=(("sample", "sample_variance"),)),
+        spec("sample_variance", 1, "sample_variance", routed=False),
+    )
+}
+
+ERROR_STATUS = (
+    (InvalidPermissions, http.client.FORBIDDEN),
+    (util.OperandTooLarge, http.client.REQUEST_ENTITY_TOO_LARGE),
+    (ComputationTimeout, http.client.SERVICE_UNAVAILABLE),
+    (TypeError, http.client.BAD_REQUEST),
+    (ValueError, http.client.BAD_REQUEST),
+    (ZeroDivisionError, http.client.BAD_REQUEST),
+    (decimal.DecimalException, http.client.BAD_REQUEST),
+    (OverflowError, http.client.BAD_REQUEST),
+)
+HANDLED_ERRORS = tuple(error for error, _ in ERROR_STATUS)
+TRUE_FLAGS = ("1", "true")
+NDJSON = "application/x-ndjson"
+MAX_LINE_BYTES = 64 * 1024
+
+
+def error_status(error):
+    for errors, status in ERROR_STATUS:
+        if isinstance(error, errors):
+            return status
+    raise error
+
+
+def select_variant(operation, operands, options, registry=OPERATIONS):
+    for argument, name in operation.variants:
+        value = options.get(argument)
+        if value is None:
+            continue
+        variant = registry[name]
+        if variant.arity > operation.arity:
+            return variant, list(operands) + [value]
+        if value in TRUE_FLAGS:
+            return variant, operands
+    return operation, operands
+
+
+def evaluate(calculator, operation, numbers):
+    return getattr(calculator, operation.method)(*numbers)
+
+
+def parse_and_evaluate(calculator, operation, operands):
+    return evaluate(calculator, operation, parse_operands(operands))
+
+
+def parse_operands(operands, backend=None):
+    return [util.convert_to_number(operand, backend) for operand in operands]
+
+
+def item_operand(value, backend=None):
+    if isinstance(value, str):
+        return util.convert_to_number(value, backend)
+    if isinstance(value, bool):
+        raise TypeError("Operator cannot be converted to number")
+    if isinstance(value, (int, float)) and (backend or numeric.DEFAULT_BACKEND) != numeric.FLOAT:
+        return util.convert_to_number(repr(value), backend)
+    return value
+
+
+def item_result(value):
+    return value if isinstance(value, (int, float)) else str(value)
+
+
+def item_json(item):
+    """json.dumps(item), encoded on its own so that one item that fails to encode becomes an error."""
+    try:
+        result = item.get("result")
+        if type(result) is int:
+            return '{{"result": {}}}'.format(util.integer_text(result))
+        if type(result) is float and not math.isfinite(result):
+            # JSON has no literal for them: written as the text encoder writes them.
+            return json.dumps({"result": repr(result)})
+        return json.dumps(item, allow_nan=False)
+    except ValueError as e:
+        return json.dumps({"error": str(e), "status": error_status(e)})
+
+
+def evaluate_item(evaluator, item, backend=None):
+    name = item.get("op") if isinstance(item, dict) else None
+    operation = OPERATIONS.get(name) if isinstance(name, str) else None
+    if operation is None:
+        return {"error": "Unknown operation", "status": http.client.BAD_REQUEST}
+    args = item.get("args")
+    if not isinstance(args, list) or len(args) != operation.arity:
+        return {"error": "Operation expects {} arguments".format(operation.arity), "status": http.client.BAD_REQUEST}
+    try:
+        numbers = [item_operand(arg, backend) for arg in args]
+        return {"result": item_result(evaluator(operation, numbers))}
+    except HANDLED_ERRORS as e:
+        return {"error": str(e), "status": error_status(e)}
+
+
+def load_json(text):
+    """json.loads, with number literals held to the operand size policy.
+
+    json.loads converts integer literals with int(), in quadratic time.
+    """
+    return json.loads(text, parse_int=json_integer, parse_float=json_float)
+
+
+def json_integer(text):
+    return util.convert_to_number(text, numeric.FLOAT)
+
+
+def json_float(text):
+    util.check_operand_size(text)
+    return float(text)
+
+
+def parse_batch(text, mimetype):
+    if mimetype == NDJSON:
+        return [load_json(line) for line in text.splitlines() if line.strip()]
+    items = load_json(text)
+    if not isinstance(items, list):
+        raise ValueError("Batch body must be a list of operations")
+    return items
+
+
+def read_lines(readline, limit=MAX_LINE_BYTES):
+    """Yields the lines of a binary stream, replacing overlong ones with None."""
+    while True:
+        line = readline(limit)
+        if not line:
+            return
+        if len(line) == limit and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = readline(limit)
+            yield None
+            continue
+        if line.strip():
+            yield line
+
+
+def read_operands(readline, backend=None):
+    """Yields the numbers of a body holding one operand per line, as it is read."""
+    # Room for the longest operand the size policy accepts, plus "\r\n".
+    for line in read_lines(readline, util.MAX_OPERAND_LENGTH + 2):
+        if line is None:
+            raise util.OperandTooLarge("Operand exceeds {} characters".format(util.MAX_OPERAND_LENGTH))
+        yield util.convert_to_number(line.decode("utf-8").strip(), backend)
+
+
+def evaluate_stream(evaluator, lines, backend=None):
+    for line in lines:
+        try:
+            if line is None:
+                raise ValueError("Line exceeds {} bytes".format(MAX_LINE_BYTES))
+            result = evaluate_item(evaluator, load_json(line.decode("utf-8")), backend)
+        except ValueError as e:
+            result = {"error": str(e), "status": error_status(e)}
+        yield item_json(result) + "\n"
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in OPERATIONS or len(argv) - 2 != OPERATIONS[argv[1]].arity:
+        print("usage: python -m app.operations <{}> <operands...>".format("|".join(sorted(OPERATIONS))))
+        return 2
+    try:
+        print(parse_and_evaluate(Calculator(), OPERATIONS[argv[1]], argv[2:]))
+    except HANDLED_ERRORS as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main(sys.argv))
@@ -0,0 +1,109 @@
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+from queue import Queue
+
+AUDIT_LOGGER = logging.getLogger("app.audit")
+
+
+class StaticPermissionBackend:
+    def __init__(self, allowed_users=("user1",)):
+        self.allowed_users = frozenset(allowed_users)
+
+    def is_allowed(self, user, operation):
+        return user in self.allowed_users
+
+
+class CachedPermissionStore:
+    """Caches backend decisions per (user, operation name) for ttl seconds.
+
+    Lookups are lock-free; refreshed entries move to the back of the queue
+    and the oldest ones are evicted once the store exceeds max_entries.
+    """
+
+    def __init__(self, backend, ttl=60.0, max_entries=1024, clock=time.monotonic):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def is_allowed(self, user, operation):
+        key = (user, getattr(operation, "name", operation))
+        now = self.clock()
+        entry = self.entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        allowed = self.backend.is_allowed(user, operation)
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (allowed, now + self.ttl)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return allowed
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class AuditLog:
+    """Structured audit trail for permission checks.
+
+    Granted checks are sampled at sample_rate and only formatted when the
+    logger is enabled for INFO; denials are always logged as warnings.
+    """
+
+    def __init__(self, logger=AUDIT_LOGGER, sample_rate=1.0):
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    def record(self, user, operation, allowed):
+        if not allowed:
+            self.logger.warning("permission denied to %s for operation %s", user, operation,
+                                extra={"user": user, "operation": operation, "allowed": False})
+            return
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self.logger.info("checking permissions of %s for operation %s", user, operation,
+                         extra={"user": user, "operation": operation, "allowed": True})
+
+
+class PermissionChecker:
+    def __init__(self, store, audit):
+        self.store = store
+        self.audit = audit
+
+    def check(self, operation, user):
+        allowed = self.store.is_allowed(user, operation)
+        self.audit.record(user, operation, allowed)
+        return allowed
+
+
+CHECKER = PermissionChecker(CachedPermissionStore(StaticPermissionBackend()), AuditLog())
+
+
+def configure_permissions(backend=None, ttl=60.0, max_entries=1024, sample_rate=1.0):
+    global CHECKER
+    store = CachedPermissionStore(backend or StaticPermissionBackend(), ttl, max_entries)
+    CHECKER = PermissionChecker(store, AuditLog(sample_rate=sample_rate))
+    return CHECKER
+
+
+def start_async_audit(*handlers, logger=AUDIT_LOGGER):
+    """Moves audit output off the request thread through a queue.
+
+    Returns the running QueueListener; call stop() on it to flush on shutdown.
+    """
+    queue = Queue(-1)
+    logger.addHandler(QueueHandler(queue))
+    logger.propagate = False
+    listener = QueueListener(queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,68 @@
+"""Pre-forking HTTP server for the calculator API.
+
+    python -m app.serve [--host HOST] [--port PORT] [--workers N] [--preload]
+
+The parent imports the application once (and with --preload also builds the
+lookup tables and imports the optional subsystems), binds the socket and
+then forks. Workers start from that already-initialized memory instead of
+importing Flask again, and all of them accept connections from the shared
+listening socket with a threaded Werkzeug server.
+"""
+import argparse
+import os
+import signal
+import sys
+
+from werkzeug.serving import make_server
+
+from app.api import create_app
+
+
+def serve(host, port, workers, preload):
+    if workers > 1 and not hasattr(os, "fork"):
+        raise SystemExit("--workers needs os.fork, which this platform does not provide")
+    application = create_app(preload_subsystems=preload)
+    execution = application.extensions["execution"]
+    server = make_server(host, port, application, threaded=True)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    children = []
+    for _ in range(workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run(server, execution)
+            finally:
+                os._exit(0)
+        children.append(pid)
+    print("Serving on http://{}:{} with {} worker(s)".format(host, port, workers), flush=True)
+    try:
+        run(server, execution)
+    finally:
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+        for pid in children:
+            os.waitpid(pid, 0)
+
+
+def run(server, execution):
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Stops the process pool of offloaded computations with the worker.
+        execution.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-forking server for the calculator API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--preload", action="store_true", help="build tables and import subsystems before forking")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.preload)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,95 @@
+"""Precomputed sqrt and log10 results for the integers 0 .. size - 1.
+
+Values are the float64 that math.sqrt and math.log10 return, packed in an
+array('d'), so a table hit is indistinguishable from computing the result.
+A table is built on first use (or eagerly with preload) and, when a
+directory is configured, saved there and memory-mapped back, so restarted
+and forked workers share the same pages instead of rebuilding them. Files
+use the native byte order of the host that wrote them.
+
+Configuration for the API: CALC_TABLE_SIZE (0 disables the tables),
+CALC_TABLE_DIR and CALC_TABLE_PRELOAD.
+"""
+import math
+import mmap
+import os
+import threading
+from array import array
+from collections import namedtuple
+
+DEFAULT_SIZE = int(os.environ.get("CALC_TABLE_SIZE", 1 << 16))
+TABLE_DIR = os.environ.get("CALC_TABLE_DIR")
+PRELOAD = os.environ.get("CALC_TABLE_PRELOAD") == "1"
+ITEM_SIZE = array("d").itemsize
+
+Tables = namedtuple("Tables", ["sqrt", "log10"])
+
+
+def log10_or_nan(n):
+    return math.log10(n) if n > 0 else float("nan")
+
+
+FUNCTIONS = {"sqrt": math.sqrt, "log10": log10_or_nan}
+# Smallest integer in the domain; log10(0) is an error, not a table entry.
+DOMAIN_START = {"sqrt": 0, "log10": 1}
+
+
+class LookupTable:
+    def __init__(self, name, size, directory=None):
+        self.name = name
+        self.size = size
+        self.start = DOMAIN_START[name]
+        self.path = os.path.join(directory, "{}-{}.f64".format(name, size)) if directory else None
+        self.values = None
+        self.lock = threading.Lock()
+
+    def lookup(self, n):
+        """Returns the tabulated result for an int in range, otherwise None."""
+        if type(n) is not int or not self.start <= n < self.size:
+            return None
+        values = self.values
+        if values is None:
+            values = self.load()
+        return values[n]
+
+    def load(self):
+        with self.lock:
+            if self.values is None:
+                if self.path is None:
+                    self.values = self.build()
+                else:
+                    if not self.is_saved():
+                        self.save(self.build())
+                    self.values = self.map()
+            return self.values
+
+    def build(self):
+        return array("d", map(FUNCTIONS[self.name], range(self.size)))
+
+    def is_saved(self):
+        try:
+            return os.path.getsize(self.path) == self.size * ITEM_SIZE
+        except OSError:
+            return False
+
+    def save(self, values):
+        # Written aside and renamed, so readers never map a partial file.
+        temporary = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(temporary, "wb") as output:
+            values.tofile(output)
+        os.replace(temporary, self.path)
+
+    def map(self):
+        with open(self.path, "rb") as source:
+            mapped = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mapped).cast("d")
+
+
+def create_tables(size=DEFAULT_SIZE, directory=TABLE_DIR, preload=PRELOAD):
+    if size <= 0:
+        return None
+    tables = Tables(LookupTable("sqrt", size, directory), LookupTable("log10", size, directory))
+    if preload:
+        for table in tables:
+            table.load()
+    return tables
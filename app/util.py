@@ -1,14 +1,162 @@
 # pylint: disable=no-else-return
-def convert_to_number(operand):
+import functools
+import os
+import re
+import time
+from array import array
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+from app import numeric
+from app import permissions
+from app.metrics import METRICS
+
+PARSE_CACHE_SIZE = 4096
+MAX_CACHED_OPERAND_LENGTH = 32
+# Fraction expands "1e100000000" into an exact integer, so exponents are bounded.
+MAX_FRACTION_EXPONENT = 4300
+# Operand size policy, checked on the length alone before any parsing.
+# Decimal text costs superlinear time to convert, hexadecimal linear time.
+MAX_OPERAND_LENGTH = int(os.environ.get("CALC_MAX_OPERAND_LENGTH", 1000000))
+MAX_DECIMAL_DIGITS = int(os.environ.get("CALC_MAX_DECIMAL_DIGITS", 100000))
+# Decimal integers longer than LONG_INTEGER_LENGTH, where int() starts losing
+# to the chunked parser and nears the 4300-digit limit that Python 3.11+ puts
+# on int(str), are parsed in chunks of DIGIT_CHUNK digits.
+LONG_INTEGER_LENGTH = 4000
+DIGIT_CHUNK = 2000
+# Ints wider than this are written through Decimal: Python 3.11+ refuses
+# str() past 4300 digits, and 13000 bits is about 3900.
+LONG_INTEGER_BITS = 13000
+DECIMAL_INTEGER = re.compile(r"\s*([+-]?)([0-9]+)\s*")
+
+
+class OperandTooLarge(ValueError):
+    pass
+
+
+def check_operand_size(operand):
+    if len(operand) > MAX_OPERAND_LENGTH:
+        raise OperandTooLarge("Operand exceeds {} characters".format(MAX_OPERAND_LENGTH))
+    if len(operand) > MAX_DECIMAL_DIGITS and not is_hexadecimal(operand):
+        raise OperandTooLarge("Decimal operand exceeds {} digits".format(MAX_DECIMAL_DIGITS))
+
+
+def is_hexadecimal(operand):
+    return "x" in operand or "X" in operand
+
+
+def parse_operand(operand):
     try:
         if "." in operand:
             return float(operand)
+        elif is_hexadecimal(operand):
+            # "0x1F", "-0x1f": power-of-two bases convert in linear time.
+            return int(operand, 16)
+        elif len(operand) > LONG_INTEGER_LENGTH:
+            return parse_long_integer(operand)
         else:
             return int(operand)
 
     except ValueError:
         raise TypeError("Operator cannot be converted to number")
 
+
+def parse_long_integer(operand):
+    match = DECIMAL_INTEGER.fullmatch(operand)
+    if match is None:
+        return int(operand)
+    number = parse_digits(match.group(2))
+    return -number if match.group(1) == "-" else number
+
+
+def parse_digits(digits):
+    """int(digits) for a string of ASCII digits, in subquadratic time.
+
+    int() on decimal text is quadratic in the number of digits. Here chunks
+    of DIGIT_CHUNK digits are converted separately and then merged in pairs,
+    each round multiplying by the next power of ten, so the cost follows
+    that of big-int multiplication.
+    """
+    chunks = [int(digits[max(0, end - DIGIT_CHUNK):end]) for end in range(len(digits), 0, -DIGIT_CHUNK)]
+    level = 0
+    while len(chunks) > 1:
+        power = chunk_power(level)
+        merged = [low + high * power for low, high in zip(chunks[0::2], chunks[1::2])]
+        if len(chunks) % 2:
+            merged.append(chunks[-1])
+        chunks = merged
+        level += 1
+    return chunks[0]
+
+
+@functools.lru_cache(maxsize=32)
+def chunk_power(level):
+    return 10 ** (DIGIT_CHUNK << level)
+
+
+def integer_text(number):
+    """str(number) for an int of any size; Decimal's conversion has no digit limit."""
+    if number.bit_length() <= LONG_INTEGER_BITS:
+        return str(number)
+    return str(Decimal(number))
+
+
+parse_cached_operand = functools.lru_cache(maxsize=PARSE_CACHE_SIZE)(parse_operand)
+
+
+def parse_decimal(operand):
+    try:
+        number = Decimal(operand)
+    except InvalidOperation:
+        raise TypeError("Operator cannot be converted to number")
+    if not number.is_finite():
+        raise TypeError("Operator cannot be converted to number")
+    return number
+
+
+def parse_fraction(operand):
+    number = parse_decimal(operand)
+    if abs(number.as_tuple().exponent) > max(MAX_FRACTION_EXPONENT, len(operand)):
+        raise TypeError("Operator cannot be converted to number")
+    return Fraction(number)
+
+
+PARSERS = {numeric.DECIMAL: parse_decimal, numeric.FRACTION: parse_fraction}
+
+
+def convert_to_number(operand, backend=None):
+    backend = backend or numeric.DEFAULT_BACKEND
+    # The hot path: short float operands, well within the size limits, go
+    # straight to the LRU, as in convert_many.
+    if backend == numeric.FLOAT and type(operand) is str and len(operand) <= MAX_CACHED_OPERAND_LENGTH:
+        return parse_cached_operand(operand)
+    if not isinstance(operand, str):
+        raise TypeError("Operator cannot be converted to number")
+    check_operand_size(operand)
+    if backend != numeric.FLOAT:
+        return PARSERS[backend](operand)
+    return parse_operand(operand)
+
+
+def convert_many(operands, typecode=None):
+    """Parses a sequence of operands in one pass.
+
+    With a typecode such as "d" the numbers are packed into an array, which
+    NumPy can wrap without copying through numpy.frombuffer.
+    """
+    parse = parse_cached_operand
+    numbers = [
+        parse(operand) if isinstance(operand, str) and len(operand) <= MAX_CACHED_OPERAND_LENGTH
+        else convert_to_number(operand)
+        for operand in operands
+    ]
+    if typecode is None:
+        return numbers
+    return array(typecode, numbers)
+
+
 def validate_permissions(operation, user):
-    print(f"checking permissions of {user} for operation {operation}")
-    return user == "user1"
\ No newline at end of file
+    start = time.perf_counter()
+    allowed = permissions.CHECKER.check(operation, user)
+    METRICS.add_permission_time(time.perf_counter() - start)
+    return allowed
@@ -0,0 +1,160 @@
+import math
+from array import array
+from collections import namedtuple
+
+import app.util
+from app.calc import InvalidPermissions
+from app.calc import Operation
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# values holds float64 results (nan where the element is invalid) and
+# invalid is a boolean mask that marks every element breaking a domain rule.
+# Overflows and inf or nan operands are not domain errors: as in Calculator,
+# they give inf or nan.
+VectorResult = namedtuple("VectorResult", ["values", "invalid"])
+
+
+class VectorCalculator:
+    """Element-wise version of Calculator over NumPy arrays or Python buffers.
+
+    Operands are evaluated as float64 in a single pass. Domain errors do not
+    raise; the offending elements are reported through VectorResult.invalid.
+    Without NumPy the same rules are applied over array('d') buffers.
+    """
+
+    def add(self, x, y):
+        self.check_permissions("add", x, y)
+        return self.binary(x, y, lambda a, b: (a + b, False), lambda a, b: (a + b, False))
+
+    def substract(self, x, y):
+        self.check_permissions("substract", x, y)
+        return self.binary(x, y, lambda a, b: (a - b, False), lambda a, b: (a - b, False))
+
+    def multiply(self, x, y):
+        self.check_permissions("multiply", x, y)
+        return self.binary(x, y, lambda a, b: (a * b, False), lambda a, b: (a * b, False))
+
+    def divide(self, x, y):
+        self.check_permissions("divide", x, y)
+        return self.binary(x, y, numpy_divide, scalar_divide)
+
+    def power(self, x, y):
+        self.check_permissions("power", x, y)
+        return self.binary(x, y, numpy_power, scalar_power)
+
+    def square_root(self, x):
+        self.check_permissions("sqrt", x)
+        return self.unary(x, numpy_sqrt, scalar_sqrt)
+
+    def logarithm_base_10(self, x):
+        self.check_permissions("log10", x)
+        return self.unary(x, numpy_log10, scalar_log10)
+
+    def check_permissions(self, name, *operands):
+        template = "vector {}({})".format(name, ", ".join(["{}"] * len(operands)))
+        if not app.util.validate_permissions(Operation("vector " + name, template, *operands), "user1"):
+            raise InvalidPermissions('User has no permissions')
+
+    def binary(self, x, y, vectorized, scalar):
+        if numpy is not None:
+            a, b = to_ndarray(x), to_ndarray(y)
+            try:
+                numpy.broadcast(a, b)
+            except ValueError:
+                raise TypeError("Parameters must have the same length")
+            with numpy.errstate(all="ignore"):
+                return mask_result(*vectorized(a, b))
+        a, b = to_buffer(x), to_buffer(y)
+        if len(a) == 1:
+            a = a * len(b)
+        if len(b) == 1:
+            b = b * len(a)
+        if len(a) != len(b):
+            raise TypeError("Parameters must have the same length")
+        return buffer_result(scalar(i, j) for i, j in zip(a, b))
+
+    def unary(self, x, vectorized, scalar):
+        if numpy is not None:
+            with numpy.errstate(all="ignore"):
+                return mask_result(*vectorized(to_ndarray(x)))
+        return buffer_result(scalar(i) for i in to_buffer(x))
+
+
+def to_ndarray(values):
+    values = numpy.asarray(values)
+    if values.dtype.kind not in "biuf":
+        raise TypeError("Parameters must be numbers")
+    return values.astype(numpy.float64, copy=False)
+
+
+def to_buffer(values):
+    if isinstance(values, (int, float)):
+        return array("d", [values])
+    if isinstance(values, array) and values.typecode == "d":
+        return values
+    if isinstance(values, (str, bytes, bytearray)):
+        raise TypeError("Parameters must be numbers")
+    try:
+        return array("d", values)
+    except (TypeError, ValueError):
+        raise TypeError("Parameters must be numbers")
+
+
+def mask_result(values, invalid):
+    values = numpy.atleast_1d(values)
+    invalid = numpy.array(numpy.broadcast_to(invalid, values.shape))
+    values[invalid] = numpy.nan
+    return VectorResult(values, invalid)
+
+
+def buffer_result(results):
+    values, invalid = array("d"), []
+    for value, error in results:
+        values.append(value)
+        invalid.append(error)
+    return VectorResult(values, invalid)
+
+
+def numpy_divide(a, b):
+    invalid = b == 0
+    return a / numpy.where(invalid, 1, b), invalid
+
+
+def numpy_power(a, b):
+    # 0 ** negative divides by zero; a negative base needs an integral exponent.
+    invalid = ((a == 0) & (b < 0)) | ((a < 0) & numpy.isfinite(b) & (b != numpy.floor(b)))
+    return numpy.power(a, b), invalid
+
+
+def numpy_sqrt(a):
+    return numpy.sqrt(a), a < 0
+
+
+def numpy_log10(a):
+    invalid = a <= 0
+    return numpy.log10(numpy.where(invalid, 1, a)), invalid
+
+
+def scalar_divide(a, b):
+    return (a / b, False) if b != 0 else (math.nan, True)
+
+
+def scalar_power(a, b):
+    if (a == 0 and b < 0) or (a < 0 and math.isfinite(b) and b != math.floor(b)):
+        return math.nan, True
+    try:
+        return a ** b, False
+    except OverflowError:
+        return (-math.inf if a < 0 and b % 2 == 1 else math.inf), False
+
+
+def scalar_sqrt(a):
+    return (math.nan, True) if a < 0 else (math.sqrt(a), False)
+
+
+def scalar_log10(a):
+    return (math.nan, True) if a <= 0 else (math.log10(a), False)
@@ -0,0 +1,4 @@
+"""WSGI entry point: FLASK_APP=app/wsgi.py, or app.wsgi:api_application for a WSGI server."""
+from app.api import create_app
+
+api_application = create_app()
@@ -0,0 +1,84 @@
+"""Agregados n-arios frente a encadenar operaciones binarias.
+
+Suma 100000 valores de tres formas: 100000 llamadas a Calculator.add que
+arrastran el total, una llamada a Calculator.sum y una sola petición POST a
+/calc/aggregate/sum, frente a las peticiones GET /calc/add/<total>/<x> que
+haría un cliente hoy (extrapoladas desde una muestra). También compara el
+error de la suma encadenada con el de fsum y mide la memoria pico de sum y
+variance para tamaños crecientes, que debe mantenerse constante.
+
+Uso: PYTHONPATH=. python test/benchmark/aggregate_bench.py
+"""
+import math
+import random
+import time
+import tracemalloc
+from fractions import Fraction
+
+from app.api import create_app
+from app.calc import Calculator
+
+COUNT = 100000
+HTTP_SAMPLE = 2000
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def chained_add(calculator, values):
+    result = 0
+    for value in values:
+        result = calculator.add(result, value)
+    return result
+
+
+def values_stream(count, seed=25):
+    rng = random.Random(seed)
+    return (rng.uniform(-1e6, 1e6) for _ in range(count))
+
+
+def peak_memory(function, count):
+    tracemalloc.start()
+    function(values_stream(count))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    calculator = Calculator()
+    values = list(values_stream(COUNT))
+    chained, chained_total = timed(lambda: chained_add(calculator, values))
+    aggregated, aggregated_total = timed(lambda: calculator.sum(iter(values)))
+    print(f"{COUNT} valores:")
+    print(f"  Calculator.add encadenado: {chained * 1e3:8.1f} ms")
+    print(f"  Calculator.sum:            {aggregated * 1e3:8.1f} ms ({chained / aggregated:.1f}x)")
+
+    client = create_app().test_client()
+    sample, _ = timed(lambda: [client.get(f"/calc/add/{value!r}/1.5") for value in values[:HTTP_SAMPLE]])
+    body = "".join(f"{value!r}\n" for value in values).encode("utf-8")
+    posted, response = timed(lambda: client.post("/calc/aggregate/sum", data=body))
+    assert float(response.data) == aggregated_total
+    print(f"  GET /calc/add x {COUNT}:     {sample * COUNT / HTTP_SAMPLE:8.2f} s (extrapolado)")
+    print(f"  POST /calc/aggregate/sum:  {posted * 1e3:8.1f} ms")
+
+    exact = Fraction(0)
+    for value in values:
+        exact += Fraction(value)
+    for label, result in (("encadenada", chained_total), ("fsum", aggregated_total)):
+        print(f"  error de la suma {label:<10} {float(abs(Fraction(result) - exact) / abs(exact)):.2e} relativo")
+
+    print("memoria pico (bytes) según el número de valores:")
+    for count in (10000, 100000, 1000000):
+        sums = peak_memory(calculator.sum, count)
+        variances = peak_memory(calculator.variance, count)
+        print(f"  {count:>8}: sum {sums:>7}  variance {variances:>7}")
+    print(f"  una lista de 1000000 floats ocuparía {8 * 1000000 + 24 * 1000000:>9}")
+    assert math.isfinite(aggregated_total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Prueba de carga comparativa entre la app Flask (WSGI) y la variante ASGI.
+
+Arranca cada servidor en localhost, lanza clientes concurrentes con conexiones
+keep-alive contra /calc/add mientras otro cliente pide potencias grandes, y
+muestra el rendimiento y la latencia de las operaciones baratas.
+
+Uso: PYTHONPATH=. python test/benchmark/asgi_bench.py [segundos] [clientes]
+Requiere flask y uvicorn instalados.
+"""
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+
+DURATION = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+CLIENTS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+HEAVY_URL = "/calc/power/7/{}"
+SERVERS = {
+    "flask": ["flask", "run", "--port", "{port}"],
+    "asgi": ["uvicorn", "app.asgi:asgi_application", "--port", "{port}", "--log-level", "warning"],
+}
+
+
+def wait_until_ready(port):
+    for _ in range(100):
+        try:
+            connection = http.client.HTTPConnection("localhost", port, timeout=1)
+            connection.request("GET", "/")
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def client(port, url, deadline, latencies):
+    connection = http.client.HTTPConnection("localhost", port, timeout=30)
+    count = 0
+    while time.monotonic() < deadline:
+        count += 1
+        start = time.perf_counter()
+        # el exponente cambia en cada petición para que la caché de resultados no intervenga
+        connection.request("GET", url.format(300000 + count))
+        connection.getresponse().read()
+        latencies.append(time.perf_counter() - start)
+
+
+def load(port):
+    deadline = time.monotonic() + DURATION
+    latencies, heavy = [], []
+    threads = [threading.Thread(target=client, args=(port, f"/calc/add/{i}/1", deadline, latencies))
+               for i in range(CLIENTS)]
+    threads.append(threading.Thread(target=client, args=(port, HEAVY_URL, deadline, heavy)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        "rps": len(latencies) / DURATION,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+        "heavy": len(heavy),
+    }
+
+
+def main():
+    env = dict(os.environ, FLASK_APP="app/wsgi.py", PYTHONPATH=os.getcwd())
+    for port, (name, command) in enumerate(SERVERS.items(), start=5081):
+        server = subprocess.Popen([part.format(port=port) for part in command], env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_until_ready(port)
+            result = load(port)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{name:<6} {result['rps']:8.0f} req/s  p50 {result['p50']:7.2f} ms  "
+              f"p99 {result['p99']:7.2f} ms  potencias grandes: {result['heavy']}")
+
+
+if __name__ == "__main__":
+    main()
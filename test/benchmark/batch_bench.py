@@ -0,0 +1,36 @@
+"""Compara la tasa de operaciones de /calc/batch frente a las rutas individuales.
+
+Uso: PYTHONPATH=. python test/benchmark/batch_bench.py [operaciones]
+"""
+import json
+import sys
+import timeit
+from unittest.mock import patch
+
+from app.api import create_app
+
+OPERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+
+def single_requests(client):
+    for i in range(OPERATIONS):
+        client.get(f"/calc/add/{i}/{i}")
+
+
+def batch_request(client, body):
+    client.post("/calc/batch", data=body, content_type="application/json")
+
+
+def main():
+    client = create_app().test_client()
+    body = json.dumps([{"op": "add", "args": [i, i]} for i in range(OPERATIONS)])
+    with patch("app.util.validate_permissions", new=lambda operation, user: True):
+        single = min(timeit.repeat(lambda: single_requests(client), number=1, repeat=3))
+        batched = min(timeit.repeat(lambda: batch_request(client, body), number=1, repeat=3))
+    print(f"rutas individuales: {OPERATIONS / single:12.0f} ops/s")
+    print(f"/calc/batch:        {OPERATIONS / batched:12.0f} ops/s")
+    print(f"mejora:             {single / batched:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import os
+import subprocess
+import sys
+import timeit
+import unittest
+from decimal import Decimal, localcontext
+from fractions import Fraction
+import pytest
+
+from app import util
+from app.api import create_app
+from app.calc import Calculator
+from app.tables import create_tables
+
+RESULTS_DIR = "results"
+RESULT_FILE = os.path.join(RESULTS_DIR, "benchmark_result.json")
+BASELINE_FILE = os.environ.get("BENCHMARK_BASELINE", os.path.join(RESULTS_DIR, "benchmark_baseline.json"))
+# Un benchmark falla si tarda más que la línea base multiplicada por este factor.
+THRESHOLD = float(os.environ.get("BENCHMARK_THRESHOLD", "1.5"))
+UPDATE_BASELINE = os.environ.get("BENCHMARK_UPDATE_BASELINE") == "1"
+BIG = 10 ** 1000 + 7
+SQUARE = (10 ** 5000 + 7) ** 2
+HUGE = 3 ** 210000
+# Presupuesto absoluto para importar la API y responder la primera petición.
+STARTUP_BUDGET = float(os.environ.get("STARTUP_BUDGET_MS", "1000")) / 1000
+STARTUP_PROBE = """
+import time
+start = time.perf_counter()
+from app.api import create_app
+client = create_app().test_client()
+client.get("/calc/sqrt/2")
+print(time.perf_counter() - start)
+"""
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_FILE) as baseline:
+            return json.load(baseline)
+    except (OSError, ValueError):
+        return {}
+
+
+@pytest.mark.benchmark
+class TestBenchmark(unittest.TestCase):
+    results = {}
+    baseline = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.baseline = load_baseline()
+        cls.calc = Calculator()
+        cls.client = create_app().test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        report = {
+            name: dict(seconds=seconds, baseline=cls.baseline.get(name),
+                       ratio=seconds / cls.baseline[name] if cls.baseline.get(name) else None)
+            for name, seconds in sorted(cls.results.items())
+        }
+        with open(RESULT_FILE, "w") as result_file:
+            json.dump({"threshold": THRESHOLD, "benchmarks": report}, result_file, indent=2)
+        if UPDATE_BASELINE:
+            with open(BASELINE_FILE, "w") as baseline_file:
+                json.dump(dict(sorted(cls.results.items())), baseline_file, indent=2)
+
+    def measure(self, name, func, number=2000):
+        self.record(name, min(timeit.repeat(func, number=number, repeat=5)) / number)
+
+    def record(self, name, seconds):
+        self.results[name] = seconds
+        expected = self.baseline.get(name)
+        if expected and not UPDATE_BASELINE:
+            self.assertLessEqual(
+                seconds, expected * THRESHOLD,
+                f"{name}: {seconds * 1e6:.2f} us supera la línea base de {expected * 1e6:.2f} us x{THRESHOLD}"
+            )
+
+    def test_convert_to_number(self):
+        self.measure("util.convert_to_number.int", lambda: util.convert_to_number("12345"))
+        self.measure("util.convert_to_number.float", lambda: util.convert_to_number("3.14159"))
+        operand = str(BIG)
+        self.measure("util.convert_to_number.1000_digits", lambda: util.convert_to_number(operand), number=200)
+        long_operand = "7" * 10000
+        self.measure("util.convert_to_number.10000_digits", lambda: util.convert_to_number(long_operand), number=50)
+
+    def test_validate_permissions(self):
+        self.measure("util.validate_permissions", lambda: util.validate_permissions("2 + 3", "user1"))
+
+    def test_calculator_scalar(self):
+        calc = self.calc
+        self.measure("calc.add", lambda: calc.add(2, 3))
+        self.measure("calc.substract", lambda: calc.substract(5, 3))
+        self.measure("calc.multiply", lambda: calc.multiply(4, 3))
+        self.measure("calc.divide", lambda: calc.divide(10, 4))
+        self.measure("calc.power", lambda: calc.power(2, 10))
+        self.measure("calc.square_root", lambda: calc.square_root(16))
+        self.measure("calc.logarithm_base_10", lambda: calc.logarithm_base_10(1000))
+
+    def test_calculator_large_integers(self):
+        calc = self.calc
+        self.measure("calc.add.1000_digits", lambda: calc.add(BIG, BIG))
+        self.measure("calc.multiply.1000_digits", lambda: calc.multiply(BIG, BIG), number=500)
+        self.measure("calc.power.3_10000", lambda: calc.power(3, 10000), number=200)
+        self.measure("calc.square_root.300_digits", lambda: calc.square_root(10 ** 300 + 1))
+        self.measure("calc.logarithm_base_10.1000_digits", lambda: calc.logarithm_base_10(BIG))
+        self.measure("calc.square_root.10000_digits_square", lambda: calc.square_root(SQUARE), number=50)
+        self.measure("calc.logarithm_base_10.100000_digits", lambda: calc.logarithm_base_10(HUGE), number=200)
+
+    def test_lookup_tables(self):
+        calc = Calculator(tables=create_tables(size=1 << 16, directory=None, preload=True))
+        self.measure("calc.square_root.table", lambda: calc.square_root(12345))
+        self.measure("calc.logarithm_base_10.table", lambda: calc.logarithm_base_10(12345))
+
+    def test_numeric_backends(self):
+        calc = self.calc
+        self.measure("calc.divide.float", lambda: calc.divide(1.0, 3.0))
+        self.measure("calc.divide.fraction", lambda: calc.divide(Fraction(1), Fraction(3)))
+        with localcontext() as context:
+            for precision in (28, 100):
+                context.prec = precision
+                self.measure("calc.divide.decimal_{}".format(precision), lambda: calc.divide(Decimal(1), Decimal(3)))
+                self.measure("calc.square_root.decimal_{}".format(precision), lambda: calc.square_root(Decimal(2)))
+
+    def test_aggregates(self):
+        calc = self.calc
+        values = [i + 0.5 for i in range(10000)]
+        self.measure("calc.sum.10000_floats", lambda: calc.sum(iter(values)), number=50)
+        self.measure("calc.variance.10000_floats", lambda: calc.variance(iter(values)), number=50)
+        body = "".join("{!r}\n".format(value) for value in values).encode("utf-8")
+        client = self.client
+        self.measure("http.aggregate_sum.10000_lines", lambda: client.post("/calc/aggregate/sum", data=body),
+                     number=20)
+
+    def test_startup_time(self):
+        env = dict(os.environ, PYTHONPATH=os.getcwd())
+        seconds = min(
+            float(subprocess.run([sys.executable, "-c", STARTUP_PROBE], stdout=subprocess.PIPE, env=env,
+                                 check=True).stdout)
+            for _ in range(3)
+        )
+        self.record("startup.first_request", seconds)
+        self.assertLessEqual(seconds, STARTUP_BUDGET,
+                             f"el arranque tarda {seconds * 1e3:.0f} ms, presupuesto {STARTUP_BUDGET * 1e3:.0f} ms")
+
+    def test_http_end_to_end(self):
+        client = self.client
+        for url in ["/calc/add/2/3", "/calc/divide/10/4", "/calc/power/2/10", "/calc/sqrt/16", "/calc/add/abc/2"]:
+            self.measure("http." + url.replace("/calc/", "").replace("/", "_"), lambda: client.get(url), number=300)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,66 @@
+"""CPU ahorrada al agrupar peticiones idénticas en curso (single-flight).
+
+Ráfagas de hilos piden a la vez la misma potencia costosa a través de
+ExecutionLayer, sin caché de resultados para que el ahorro venga solo de la
+agrupación. Se compara con la agrupación desactivada: tiempo real, tiempo de
+CPU del proceso y número de cálculos ejecutados.
+
+Uso: PYTHONPATH=. python test/benchmark/coalescing_bench.py
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import operations
+from app.calc import Calculator
+from app.executor import ExecutionLayer
+
+THREADS = 16
+BURSTS = 10
+POWER = operations.OPERATIONS["power"]
+
+
+def run(coalesce):
+    calculator = Calculator()
+    # Todo se calcula en el propio proceso para que time.process_time lo cuente.
+    layer = ExecutionLayer(calculator, cost_threshold_bits=1 << 30,
+                           coalesce_threshold_bits=1 << 12 if coalesce else 1 << 30)
+    computations = []
+    original = calculator.power
+
+    def counted_power(x, y):
+        computations.append(y)
+        return original(x, y)
+
+    calculator.power = counted_power
+    barrier = threading.Barrier(THREADS)
+
+    def request(exponent):
+        barrier.wait()
+        return layer.evaluate(POWER, [7, exponent])
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        for burst in range(BURSTS):
+            exponent = 300000 + burst
+            results = list(pool.map(request, [exponent] * THREADS))
+            assert all(result == results[0] for result in results)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    return wall, cpu, len(computations), layer.flights.stats()
+
+
+def main():
+    print(f"{BURSTS} ráfagas de {THREADS} peticiones idénticas de 7 ** 300000+i")
+    baseline = None
+    for label, coalesce in (("sin agrupar", False), ("con single-flight", True)):
+        wall, cpu, computed, stats = run(coalesce)
+        line = f"{label:<18} {wall:6.2f} s reales, {cpu:6.2f} s de CPU, {computed:4d} cálculos"
+        if coalesce:
+            line += f", {stats['followers']} peticiones agrupadas; CPU ahorrada {1 - cpu / baseline:.0%}"
+        else:
+            baseline = cpu
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
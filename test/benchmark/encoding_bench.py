@@ -0,0 +1,49 @@
+"""Coste de codificación por tipo de resultado y formato de respuesta.
+
+Uso: PYTHONPATH=. python test/benchmark/encoding_bench.py
+"""
+import sys
+import timeit
+from decimal import Decimal
+from fractions import Fraction
+
+from app import encoding
+
+if hasattr(sys, "set_int_max_str_digits"):
+    sys.set_int_max_str_digits(0)
+
+RESULTS = [
+    ("int pequeño", 12345),
+    ("int64", 2 ** 62 + 1),
+    ("float", 1 / 3),
+    ("int 1000 dígitos", 7 ** 1183),
+    ("int 100000 dígitos", 7 ** 118300),
+    ("Decimal", Decimal(1) / Decimal(7)),
+    ("Fraction", Fraction(1, 3)),
+]
+BATCH = [{"result": index * 1.5} for index in range(1000)] + [{"error": "Division by zero is not possible",
+                                                              "status": 400}]
+
+
+def per_call(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    encoders = encoding.ENCODERS
+    print("{:<20}".format("resultado") + "".join("{:>26}".format(encoder.media_type) for encoder in encoders))
+    for name, value in RESULTS:
+        number = 20 if "100000" in name else 20000
+        row = "{:<20}".format(name)
+        for encoder in encoders:
+            seconds = per_call(lambda: encoder.encode(value), number)
+            row += "{:>16.0f} ns {:>5} B".format(seconds * 1e9, len(encoder.encode(value)))
+        print(row)
+    for encoder in encoding.BATCH_ENCODERS:
+        seconds = per_call(lambda: encoder.encode_items(BATCH), 200)
+        print("lote de {} {:<26} {:8.1f} us {:>7} B".format(
+            len(BATCH), encoder.media_type, seconds * 1e6, len(encoder.encode_items(BATCH))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Tasa de aciertos de una caché HTTP delante de la API.
+
+Arranca app.serve en un proceso aparte y pone delante un proxy de caché
+simulado que se comporta como una caché compartida (nginx proxy_cache, una
+CDN): guarda las respuestas según Cache-Control, indexa por URL y Accept, y
+cuando una entrada caduca la revalida con If-None-Match. El tráfico sigue una
+distribución Zipf sobre un conjunto de peticiones distintas y una parte se
+escribe con grafías equivalentes de los operandos (0005, +5, %205).
+
+Se ejecutan dos escenarios: max-age largo (lo que envía la API por defecto) y
+CALC_CACHE_MAX_AGE=0 (no-cache), en el que cada petición repetida se revalida
+y el servidor contesta 304 sin recalcular.
+
+Uso: PYTHONPATH=. python test/benchmark/http_cache_bench.py [--requests 10000]
+"""
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "load"))
+from load_generator import DEFAULT_MIX, TrafficModel, parse_mix  # noqa: E402
+
+PORT = 5073
+
+
+class CachingProxy:
+    """Caché compartida mínima: frescura por max-age y revalidación por ETag."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.entries = {}
+        self.counts = {"fresh": 0, "revalidated": 0, "miss": 0, "uncacheable": 0}
+        self.origin_bytes = 0
+        self.origin_seconds = 0.0
+
+    def get(self, url, accept="*/*"):
+        key = (url, accept)
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry["expires"] > now:
+            self.counts["fresh"] += 1
+            return 200, entry["body"]
+        headers = {"Accept": accept}
+        if entry is not None:
+            headers["If-None-Match"] = entry["etag"]
+        status, response_headers, body = self.fetch(url, headers)
+        if status == 304 and entry is not None:
+            self.counts["revalidated"] += 1
+            entry["expires"] = now + max_age(response_headers)
+            return 200, entry["body"]
+        lifetime = max_age(response_headers)
+        if status == 200 and response_headers.get("etag") and lifetime is not None:
+            self.counts["miss"] += 1
+            self.entries[key] = {"etag": response_headers["etag"], "body": body, "expires": now + lifetime}
+        else:
+            self.counts["uncacheable"] += 1
+        return status, body
+
+    def fetch(self, url, headers):
+        start = time.perf_counter()
+        self.connection.request("GET", url, headers=headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        self.origin_seconds += time.perf_counter() - start
+        self.origin_bytes += len(body)
+        return response.status, {name.lower(): value for name, value in response.getheaders()}, body
+
+
+def max_age(headers):
+    """Segundos de frescura; None si la respuesta no se puede guardar."""
+    directives = [part.strip() for part in headers.get("cache-control", "").split(",")]
+    if "no-store" in directives or "private" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for directive in directives:
+        if directive.startswith("max-age="):
+            return int(directive[len("max-age="):])
+    return None
+
+
+def respell(url, rng):
+    """Reescribe un operando entero con una grafía equivalente."""
+    parts = url.split("/")
+    positions = [i for i in range(3, len(parts)) if parts[i].lstrip("-").isdigit()]
+    if not positions:
+        return url
+    i = rng.choice(positions)
+    spelling = rng.choice(("000{}", "+{}", "%20{}"))
+    if parts[i].startswith("-"):
+        spelling = rng.choice(("-000{}", "%20-{}"))
+        parts[i] = parts[i][1:]
+    parts[i] = spelling.format(parts[i])
+    return "/".join(parts)
+
+
+def traffic(requests, distinct, respelled, seed):
+    model = TrafficModel(parse_mix(DEFAULT_MIX), "small", 0.0, seed)
+    pool = sorted({model.next_url()[1] for _ in range(distinct * 2)})[:distinct]
+    rng = random.Random(seed)
+    rng.shuffle(pool)
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(pool))]
+    for url in rng.choices(pool, weights, k=requests):
+        yield (respell(url, rng), True) if rng.random() < respelled else (url, False)
+
+
+def start_server(max_age_seconds):
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), CALC_CACHE_MAX_AGE=str(max_age_seconds))
+    server = subprocess.Popen([sys.executable, "-m", "app.serve", "--port", str(PORT)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", PORT), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.01)
+    server.terminate()
+    raise RuntimeError("el servidor no arrancó")
+
+
+def scenario(label, max_age_seconds, arguments):
+    server = start_server(max_age_seconds)
+    try:
+        proxy = CachingProxy(http.client.HTTPConnection("127.0.0.1", PORT, timeout=30))
+        respelled_misses = 0
+        canonical_seen = set()
+        start = time.perf_counter()
+        for url, is_respelled in traffic(arguments.requests, arguments.distinct, arguments.respelled, arguments.seed):
+            before = proxy.counts["miss"]
+            proxy.get(url)
+            if is_respelled and proxy.counts["miss"] > before and url not in canonical_seen:
+                respelled_misses += 1
+            canonical_seen.add(url)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    counts, total = proxy.counts, arguments.requests
+    print(f"{label}")
+    print(f"  aciertos frescos  {counts['fresh']:7d}  ({counts['fresh'] / total:6.1%})")
+    print(f"  revalidados (304) {counts['revalidated']:7d}  ({counts['revalidated'] / total:6.1%})")
+    print(f"  fallos            {counts['miss']:7d}  ({counts['miss'] / total:6.1%}), "
+          f"{respelled_misses} por grafías alternativas")
+    print(f"  no cacheables     {counts['uncacheable']:7d}")
+    print(f"  origen: {proxy.origin_bytes} bytes de cuerpo, {proxy.origin_seconds:.2f} s; "
+          f"total {elapsed:.2f} s ({total / elapsed:.0f} peticiones/s)")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--distinct", type=int, default=2000)
+    parser.add_argument("--respelled", type=float, default=0.1, help="fracción con grafías equivalentes")
+    parser.add_argument("--seed", type=int, default=1)
+    arguments = parser.parse_args()
+    scenario("max-age largo", 365 * 24 * 60 * 60, arguments)
+    scenario("no-cache (revalidación con If-None-Match)", 0, arguments)
+
+
+if __name__ == "__main__":
+    main()
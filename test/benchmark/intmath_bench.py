@@ -0,0 +1,70 @@
+"""Raíz cuadrada y log10 de enteros grandes: app.intmath frente a math.
+
+Para cada tamaño (en dígitos decimales) se mide la raíz de un cuadrado
+perfecto (exacta, con isqrt), la de un número que no lo es (descartado por
+residuos y redondeado desde los bits altos) y log10, junto a lo que hacen
+math.sqrt y math.log10 con el mismo operando. También se mide la isqrt de
+Newton que se usa en Python < 3.8.
+
+Uso: PYTHONPATH=. python test/benchmark/intmath_bench.py [--max-digits 1000000]
+"""
+import argparse
+import math
+import time
+
+from app import intmath
+
+
+def timed(function, *args):
+    """Mejor de varias ejecuciones, con menos repeticiones cuanto más tarda."""
+    best, total, runs = float("inf"), 0.0, 0
+    while runs < 3 or (total < 0.2 and runs < 1000):
+        start = time.perf_counter()
+        try:
+            function(*args)
+        except OverflowError:
+            return None
+        elapsed = time.perf_counter() - start
+        best, total, runs = min(best, elapsed), total + elapsed, runs + 1
+        if elapsed > 1.0:
+            break
+    return best
+
+
+def show(seconds):
+    if seconds is None:
+        return "OverflowError".rjust(13)
+    if seconds >= 1:
+        return f"{seconds:11.2f} s "
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:11.2f} ms"
+    return f"{seconds * 1e6:11.2f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-digits", type=int, default=1000000)
+    arguments = parser.parse_args()
+    sizes = [digits for digits in (10, 100, 1000, 10000, 100000, 1000000, 3000000) if digits <= arguments.max_digits]
+    print(f"{'dígitos':>8} {'operación':<22} {'intmath':>13} {'math':>13}")
+    for digits in sizes:
+        # 7 ** (2k) es un cuadrado perfecto; sumarle 2 deja de serlo.
+        root = 7 ** int(digits / (2 * math.log10(7)))
+        square = root * root
+        other = square + 2
+        rows = [
+            ("sqrt cuadrado perfecto", timed(intmath.square_root, square), timed(math.sqrt, square)),
+            ("sqrt no cuadrado", timed(intmath.square_root, other), timed(math.sqrt, other)),
+            ("log10", timed(intmath.log10, other), timed(math.log10, other)),
+        ]
+        if digits <= 100000:
+            # Frente a math.isqrt, que solo existe desde Python 3.8.
+            rows.append(("isqrt de Newton (3.6)", timed(intmath.newton_isqrt, square), timed(intmath.isqrt, square)))
+        for label, ours, theirs in rows:
+            print(f"{digits:>8} {label:<22} {show(ours)} {show(theirs)}")
+    print("math.sqrt convierte el entero a float: OverflowError por encima de ~1.8e308 y")
+    print("pérdida de precisión por encima de 2**53; intmath devuelve la raíz exacta.")
+
+
+if __name__ == "__main__":
+    main()
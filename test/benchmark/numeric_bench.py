@@ -0,0 +1,38 @@
+"""Mide el coste de la precisión: rendimiento de cada backend numérico.
+
+Uso: PYTHONPATH=. python test/benchmark/numeric_bench.py
+"""
+import functools
+import timeit
+from unittest.mock import patch
+
+from app import numeric
+from app import operations
+from app.calc import Calculator
+
+CASES = [("add", ["0.1", "0.2"]), ("multiply", ["123.456", "789.012"]), ("divide", ["1", "3"]),
+         ("power", ["1.5", "20"]), ("sqrt", ["2"]), ("log10", ["12345.678"])]
+BACKENDS = [("float", numeric.DEFAULT_PRECISION), ("decimal", 28), ("decimal", 100), ("fraction", 28)]
+
+
+def per_call(func, number=20000):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    calculator = Calculator()
+    print("{:<10}".format("operación") + "".join("{:>16}".format("{}/{}".format(*b)[:15]) for b in BACKENDS))
+    with patch("app.util.validate_permissions", new=lambda operation, user: True):
+        for name, operands in CASES:
+            operation = operations.OPERATIONS[name]
+            row = "{:<10}".format(name)
+            for backend, precision in BACKENDS:
+                numbers = operations.parse_operands(operands, backend)
+                evaluate = numeric.evaluator(functools.partial(operations.evaluate, calculator), backend, precision)
+                seconds = per_call(lambda: evaluate(operation, numbers))
+                row += "{:>12.0f} op/s".format(1 / seconds)
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Coste de analizar operandos enteros según su número de dígitos.
+
+Compara int() sobre texto decimal (cuadrático; en Python 3.11+ se desactiva
+el límite de 4300 dígitos solo para medirlo), el analizador por trozos de
+util.parse_digits, el mismo número en hexadecimal y convert_to_number de
+principio a fin, que por encima de la política de tamaño rechaza el operando
+solo por su longitud. La última columna es el exponente empírico del coste,
+log(t2 / t1) / log(n2 / n1), entre cada tamaño y el anterior.
+
+Uso: PYTHONPATH=. python test/benchmark/operand_size_bench.py [--max-digits 1000000]
+"""
+import argparse
+import math
+import random
+import sys
+import time
+
+from app import util
+
+SIZES = (1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+
+
+def timed(function, argument):
+    best, total, runs = float("inf"), 0.0, 0
+    while runs < 3 or (total < 0.2 and runs < 1000):
+        start = time.perf_counter()
+        try:
+            function(argument)
+        except (TypeError, ValueError):
+            pass
+        elapsed = time.perf_counter() - start
+        best, total, runs = min(best, elapsed), total + elapsed, runs + 1
+        if elapsed > 1.0:
+            break
+    return best
+
+
+def show(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:10.2f} ms"
+    return f"{seconds * 1e6:10.2f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-digits", type=int, default=1000000)
+    arguments = parser.parse_args()
+    if hasattr(sys, "set_int_max_str_digits"):
+        sys.set_int_max_str_digits(0)
+    rng = random.Random(24)
+    print(f"política: {util.MAX_DECIMAL_DIGITS} dígitos decimales, {util.MAX_OPERAND_LENGTH} caracteres en total")
+    print(f"{'dígitos':>8} {'int()':>13} {'parse_digits':>13} {'exp':>5} {'hex':>13} {'convert_to_number':>18}")
+    previous = None
+    for digits in (size for size in SIZES if size <= arguments.max_digits):
+        text = str(rng.randint(1, 9)) + "".join(rng.choice("0123456789") for _ in range(digits - 1))
+        hexadecimal = "0x" + format(util.parse_digits(text), "x")
+        builtin = timed(int, text) if digits <= 300000 else None
+        chunked = timed(util.parse_digits, text)
+        exponent = "" if previous is None else f"{math.log(chunked / previous[1]) / math.log(digits / previous[0]):5.2f}"
+        converted = timed(util.convert_to_number, text)
+        rejected = " (rechazado)" if digits > util.MAX_DECIMAL_DIGITS else ""
+        print(f"{digits:>8} {show(builtin) if builtin else 'omitido'.rjust(13)} {show(chunked)} {exponent:>5} "
+              f"{show(timed(util.convert_to_number, hexadecimal))} {show(converted)}{rejected}")
+        previous = (digits, chunked)
+
+
+if __name__ == "__main__":
+    main()
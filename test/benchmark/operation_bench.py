@@ -0,0 +1,23 @@
+"""Compara el coste de construir la descripción de la operación con operandos enteros grandes.
+
+Uso: PYTHONPATH=. python test/benchmark/operation_bench.py
+"""
+import timeit
+
+from app.calc import Operation
+
+DIGITS = [10, 1000, 4000]
+NUMBER = 1000
+
+
+def main():
+    print(f"{'dígitos':>8} {'f-string':>14} {'Operation':>14}")
+    for digits in DIGITS:
+        x = 10 ** digits - 1
+        eager = min(timeit.repeat(lambda: f"{x} ** {x}", number=NUMBER, repeat=3)) / NUMBER
+        lazy = min(timeit.repeat(lambda: Operation("power", "{} ** {}", x, x), number=NUMBER, repeat=3)) / NUMBER
+        print(f"{digits:>8} {eager * 1e6:>11.2f} us {lazy * 1e6:>11.2f} us")
+
+
+if __name__ == "__main__":
+    main()
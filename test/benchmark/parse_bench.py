@@ -0,0 +1,39 @@
+"""Compara convert_to_number con el parser original sobre operandos repetidos.
+
+Uso: PYTHONPATH=. python test/benchmark/parse_bench.py
+"""
+import random
+import timeit
+
+from app import util
+
+OPERANDS = [str(random.choice([1, 2, 10, 100, 2.5, 0.1, -3, 1000000])) for _ in range(10000)]
+
+
+def legacy_convert_to_number(operand):
+    try:
+        if "." in operand:
+            return float(operand)
+        else:
+            return int(operand)
+    except ValueError:
+        raise TypeError("Operator cannot be converted to number")
+
+
+def per_operand(func):
+    return min(timeit.repeat(lambda: func(OPERANDS), number=10, repeat=3)) / (10 * len(OPERANDS))
+
+
+def main():
+    legacy = per_operand(lambda ops: [legacy_convert_to_number(op) for op in ops])
+    cached = per_operand(lambda ops: [util.convert_to_number(op) for op in ops])
+    bulk = per_operand(util.convert_many)
+    packed = per_operand(lambda ops: util.convert_many(ops, typecode="d"))
+    print(f"parser original:         {legacy * 1e9:8.0f} ns/operando")
+    print(f"convert_to_number (LRU): {cached * 1e9:8.0f} ns/operando")
+    print(f"convert_many:            {bulk * 1e9:8.0f} ns/operando")
+    print(f"convert_many('d'):       {packed * 1e9:8.0f} ns/operando")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Mide el coste por llamada de validate_permissions antes y después del subsistema de permisos.
+
+Uso: PYTHONPATH=. python test/benchmark/permissions_bench.py [llamadas]
+"""
+import sys
+import tempfile
+import timeit
+
+from app import util
+
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+
+def legacy_validate_permissions(operation, user):
+    print(f"checking permissions of {user} for operation {operation}")
+    return user == "user1"
+
+
+def per_call(func):
+    return min(timeit.repeat(lambda: func("2 + 3", "user1"), number=CALLS, repeat=3)) / CALLS
+
+
+def main():
+    real_stdout = sys.stdout
+    # stdout con buffer de línea, como en un contenedor con TTY o con logs capturados
+    with tempfile.TemporaryFile("w", buffering=1) as sink:
+        sys.stdout = sink
+        try:
+            legacy = per_call(legacy_validate_permissions)
+        finally:
+            sys.stdout = real_stdout
+    current = per_call(util.validate_permissions)
+    print(f"print por llamada:          {legacy * 1e9:10.0f} ns")
+    print(f"subsistema de permisos:     {current * 1e9:10.0f} ns")
+    print(f"mejora:                     {legacy / current:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Mide la latencia por ruta de /calc/<operación> frente a las vistas originales.
+
+Las vistas originales, una función por operación, se registran en una
+aplicación Flask propia y se miden con el mismo cliente de pruebas.
+
+Uso: PYTHONPATH=. python test/benchmark/routing_bench.py [peticiones]
+"""
+import http.client
+import sys
+import timeit
+from unittest.mock import patch
+
+from flask import Flask
+
+from app import util
+from app.api import create_app
+from app.calc import Calculator
+from app.calc import InvalidPermissions
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+ROUTES = [
+    "/calc/add/2/3",
+    "/calc/substract/5/3",
+    "/calc/multiply/4/3",
+    "/calc/divide/10/4",
+    "/calc/power/2/10",
+    "/calc/sqrt/16",
+    "/calc/log10/1000",
+    "/calc/add/abc/2",
+]
+LEGACY_CALCULATOR = Calculator()
+HEADERS = {"Content-Type": "text/plain", "Access-Control-Allow-Origin": "*"}
+
+
+def legacy_convert_to_number(operand):
+    try:
+        if "." in operand:
+            return float(operand)
+        else:
+            return int(operand)
+    except ValueError:
+        raise TypeError("Operator cannot be converted to number")
+
+
+def legacy_binary_view(method):
+    def view(op_1, op_2):
+        try:
+            num_1, num_2 = legacy_convert_to_number(op_1), legacy_convert_to_number(op_2)
+            return ("{}".format(getattr(LEGACY_CALCULATOR, method)(num_1, num_2)), http.client.OK, HEADERS)
+        except TypeError as e:
+            return (str(e), http.client.BAD_REQUEST, HEADERS)
+        except InvalidPermissions as e:
+            return (str(e), http.client.FORBIDDEN, HEADERS)
+
+    return view
+
+
+def legacy_unary_view(method):
+    def view(op_1):
+        try:
+            num_1 = legacy_convert_to_number(op_1)
+            return ("{}".format(getattr(LEGACY_CALCULATOR, method)(num_1)), http.client.OK, HEADERS)
+        except (TypeError, ValueError) as e:
+            return (str(e), http.client.BAD_REQUEST, HEADERS)
+        except InvalidPermissions as e:
+            return (str(e), http.client.FORBIDDEN, HEADERS)
+
+    return view
+
+
+def create_legacy_app():
+    """Las siete vistas de app/api.py antes del registro de operaciones."""
+    application = Flask(__name__)
+    for name in ("add", "substract", "multiply", "divide", "power"):
+        application.add_url_rule("/calc/{}/<op_1>/<op_2>".format(name), name, legacy_binary_view(name),
+                                 methods=["GET"])
+    for name, method in (("sqrt", "square_root"), ("log10", "logarithm_base_10")):
+        application.add_url_rule("/calc/{}/<op_1>".format(name), name, legacy_unary_view(method), methods=["GET"])
+    return application
+
+
+def per_request(client, url):
+    return min(timeit.repeat(lambda: client.get(url), number=REQUESTS, repeat=3)) / REQUESTS
+
+
+def main():
+    legacy = create_legacy_app().test_client()
+    client = create_app().test_client()
+    with patch.object(util, "validate_permissions", new=lambda operation, user: True):
+        print(f"{'ruta':<22} {'original':>10} {'registro':>10}")
+        for url in ROUTES:
+            before, after = per_request(legacy, url), per_request(client, url)
+            print(f"{url:<22} {before * 1e6:7.1f} us {after * 1e6:7.1f} us  x{before / after:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Mide la caché compartida en disco: coste de acierto y arranque en caliente.
+
+Varios procesos recorren las mismas potencias costosas, cada uno empezando
+por un punto distinto, con y sin la caché SQLite compartida; con ella cada
+potencia se calcula en un solo proceso y los demás la leen del disco.
+
+Uso: PYTHONPATH=. python test/benchmark/shared_cache_bench.py
+"""
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+
+from app.cache import ResultCache
+from app.cache import SharedResultCache
+from app.cache import make_key
+
+WORK = [(7, 200000 + exponent) for exponent in range(40)]
+PROCESSES = 4
+
+
+def run_worker(path, offset=0):
+    cache = SharedResultCache(path) if path else ResultCache()
+    start = time.perf_counter()
+    for base, exponent in WORK[offset:] + WORK[:offset]:
+        cache.get_or_compute(make_key("power", (base, exponent)), lambda: base ** exponent)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.db")
+        cache = SharedResultCache(path)
+        key = make_key("power", WORK[0])
+        start = time.perf_counter()
+        cache.get_or_compute(key, lambda: WORK[0][0] ** WORK[0][1])
+        computed = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.memory.clear()
+            cache.get(key)
+        disk = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        for _ in range(100):
+            cache.get(key)
+        memory = (time.perf_counter() - start) / 100
+        print(f"7 ** 200000 calculado:          {computed * 1e3:8.2f} ms")
+        print(f"acierto en disco:               {disk * 1e3:8.3f} ms")
+        print(f"acierto en memoria:             {memory * 1e3:8.4f} ms")
+
+        for label, shared in (("sin caché compartida", None), ("con caché compartida", path)):
+            with Pool(PROCESSES) as pool:
+                start = time.perf_counter()
+                offsets = [index * len(WORK) // PROCESSES for index in range(PROCESSES)]
+                busy = pool.starmap(run_worker, [(shared, offset) for offset in offsets])
+                wall = time.perf_counter() - start
+            print(f"{PROCESSES} procesos {label}: {wall:6.2f} s reales, {sum(busy):6.2f} s de CPU")
+        warm = run_worker(path)
+        print(f"proceso reiniciado en caliente:   {warm:6.3f} s para {len(WORK)} potencias")
+
+
+if __name__ == "__main__":
+    main()
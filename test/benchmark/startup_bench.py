@@ -0,0 +1,86 @@
+"""Tiempo de arranque en frío: importación, creación de la app y primera respuesta.
+
+Cada medición usa un intérprete nuevo. Se compara la primera respuesta con un
+presupuesto (STARTUP_BUDGET_MS, 1000 ms por defecto) y el script termina con
+error si se supera.
+
+Uso: PYTHONPATH=. python test/benchmark/startup_bench.py
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+PORT = 5071
+BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", "1000"))
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from app.api import create_app
+imported = time.perf_counter()
+application = create_app(preload_subsystems=sys.argv[1] == "1")
+created = time.perf_counter()
+application.test_client().get("/calc/sqrt/2")
+answered = time.perf_counter()
+print(json.dumps([imported - start, created - imported, answered - created]))
+"""
+
+
+def probe(preload):
+    output = subprocess.run([sys.executable, "-c", PROBE, "1" if preload else "0"], stdout=subprocess.PIPE,
+                            check=True, env=dict(os.environ, PYTHONPATH=os.getcwd())).stdout
+    return json.loads(output.decode())
+
+
+def first_response(arguments):
+    """Milisegundos desde lanzar el servidor hasta recibir la primera respuesta."""
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "app.serve", "--port", str(PORT)] + arguments,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              env=dict(os.environ, PYTHONPATH=os.getcwd()))
+    try:
+        while True:
+            try:
+                connection = socket.create_connection(("127.0.0.1", PORT), timeout=1)
+            except OSError:
+                time.sleep(0.005)
+                continue
+            connection.sendall(b"GET /calc/sqrt/2 HTTP/1.0\r\n\r\n")
+            if connection.recv(64):
+                connection.close()
+                return (time.perf_counter() - start) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def empty_interpreter():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], check=True)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    interpreter = min(empty_interpreter() for _ in range(RUNS))
+    print(f"intérprete vacío:                   {interpreter:7.1f} ms")
+    for preload in (False, True):
+        samples = [probe(preload) for _ in range(RUNS)]
+        imported, created, answered = (statistics.median(column) * 1000 for column in zip(*samples))
+        label = "con precarga" if preload else "sin precarga"
+        print(f"{label}: importar {imported:6.1f} ms, create_app {created:6.1f} ms, "
+              f"primera petición {answered:6.1f} ms")
+    results = {}
+    for label, arguments in (("1 proceso", []), ("4 procesos + precarga", ["--workers", "4", "--preload"])):
+        results[label] = statistics.median(first_response(arguments) for _ in range(RUNS))
+        print(f"primera respuesta HTTP, {label:<22} {results[label]:7.1f} ms (presupuesto {BUDGET_MS:.0f} ms)")
+    if max(results.values()) > BUDGET_MS:
+        print("presupuesto de arranque superado")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
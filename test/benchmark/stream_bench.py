@@ -0,0 +1,67 @@
+"""Comprueba que /calc/stream usa memoria constante sea cual sea el tamaño de la entrada.
+
+Genera la entrada NDJSON bajo demanda, consume la respuesta por trozos y mide
+el pico de memoria con tracemalloc para varios tamaños.
+
+Uso: PYTHONPATH=. python test/benchmark/stream_bench.py [líneas...]
+"""
+import io
+import sys
+import time
+import tracemalloc
+
+from werkzeug.test import EnvironBuilder
+
+from app.api import create_app
+
+SIZES = [int(size) for size in sys.argv[1:]] or [1000, 10000, 100000]
+APPLICATION = create_app()
+
+
+class GeneratedInput(io.RawIOBase):
+    def __init__(self, lines):
+        self.remaining = lines
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and self.remaining:
+            self.remaining -= 1
+            self.pending = b'{"op": "multiply", "args": [%d, 3]}\n' % self.remaining
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+def chunked_environ(lines):
+    environ = EnvironBuilder("/calc/stream", method="POST", content_type="application/x-ndjson").get_environ()
+    environ.pop("CONTENT_LENGTH", None)
+    environ["HTTP_TRANSFER_ENCODING"] = "chunked"
+    environ["wsgi.input"] = io.BufferedReader(GeneratedInput(lines))
+    environ["wsgi.input_terminated"] = True
+    return environ
+
+
+def run(lines):
+    tracemalloc.start()
+    start = time.perf_counter()
+    body = APPLICATION.wsgi_app(chunked_environ(lines), lambda status, headers: None)
+    results = sum(chunk.count(b"\n") for chunk in body)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, elapsed, peak
+
+
+def main():
+    for lines in SIZES:
+        results, elapsed, peak = run(lines)
+        print(f"{lines:>9} líneas  {results:>9} resultados  {lines / elapsed:9.0f} ops/s  "
+              f"pico {peak / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
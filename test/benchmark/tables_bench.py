@@ -0,0 +1,47 @@
+"""Compara sqrt y log10 con y sin tablas precalculadas sobre enteros pequeños.
+
+Uso: PYTHONPATH=. python test/benchmark/tables_bench.py
+"""
+import random
+import tempfile
+import timeit
+from unittest.mock import patch
+
+from app.cache import ResultCache
+from app.calc import Calculator
+from app.tables import create_tables
+
+SIZE = 1 << 16
+OPERANDS = [random.randrange(1, SIZE) for _ in range(10000)]
+
+
+def per_call(calculator, method):
+    func = getattr(calculator, method)
+    return min(timeit.repeat(lambda: [func(n) for n in OPERANDS], number=10, repeat=3)) / (10 * len(OPERANDS))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        start = timeit.default_timer()
+        tables = create_tables(size=SIZE, directory=directory, preload=True)
+        built = timeit.default_timer() - start
+        start = timeit.default_timer()
+        create_tables(size=SIZE, directory=directory, preload=True)
+        mapped = timeit.default_timer() - start
+        calculators = [
+            ("math", Calculator()),
+            ("math + caché", Calculator(result_cache=ResultCache())),
+            ("tabla", Calculator(tables=tables)),
+        ]
+        print(f"construir y guardar tablas de {SIZE} entradas: {built * 1e3:.1f} ms")
+        print(f"mapear tablas existentes:                   {mapped * 1e3:.2f} ms")
+        with patch("app.util.validate_permissions", new=lambda operation, user: True):
+            for method in ("square_root", "logarithm_base_10"):
+                for name, calculator in calculators:
+                    print(f"{method:<18} {name:<14} {per_call(calculator, method) * 1e9:8.0f} ns/llamada")
+        for table in tables:
+            table.values.release()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Generador de carga que reproduce tráfico realista contra la API de la calculadora.
+
+Ejecuta un pool de hilos, cada uno con su propia conexión keep-alive, contra un
+servidor en ejecución (--base-url) o contra el cliente de pruebas de Flask en el
+mismo proceso (sin --base-url). La mezcla de operaciones y la distribución de
+operandos son configurables, incluida una fracción de potencias patológicas.
+Escribe latencias p50/p95/p99, rendimiento y tasa de errores en results/.
+
+Uso:
+  PYTHONPATH=. python test/load/load_generator.py --duration 10 --concurrency 16
+  PYTHONPATH=. python test/load/load_generator.py --base-url http://localhost:5000 \\
+      --mix add=40,divide=20,power=20,sqrt=10,log10=10 --pathological 0.02
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = "add=30,substract=10,multiply=20,divide=15,power=10,sqrt=10,log10=5"
+UNARY = ("sqrt", "log10")
+DISTRIBUTIONS = {
+    "small": lambda rng: str(rng.randint(-100, 100)),
+    "positive": lambda rng: str(rng.randint(1, 10 ** 6)),
+    "float": lambda rng: "{:.3f}".format(rng.uniform(-1000, 1000)),
+    "large": lambda rng: str(rng.randint(10 ** 30, 10 ** 40)),
+}
+PATHOLOGICAL_POWERS = ["/calc/power/7/{}".format(exponent) for exponent in (200000, 300000, 370000)] + [
+    "/calc/power/10/100000000",
+    "/calc/power/2/-1075",
+    "/calc/power/-8/0.5",
+]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class TrafficModel:
+    def __init__(self, mix, distribution, pathological, seed):
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.operand = DISTRIBUTIONS[distribution]
+        self.pathological = pathological
+        self.rng = random.Random(seed)
+
+    def fork(self, seed):
+        """Copia con su propio generador aleatorio, una por hilo."""
+        model = TrafficModel.__new__(TrafficModel)
+        model.__dict__.update(self.__dict__)
+        model.rng = random.Random(seed)
+        return model
+
+    def next_url(self):
+        if self.rng.random() < self.pathological:
+            return "power!", self.rng.choice(PATHOLOGICAL_POWERS)
+        name = self.rng.choices(self.operations, self.weights)[0]
+        operands = [self.operand(self.rng)] if name in UNARY else [self.operand(self.rng), self.operand(self.rng)]
+        return name, "/calc/{}/{}".format(name, "/".join(operands))
+
+
+class HttpTarget:
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host, self.port, self.timeout = parts.hostname, parts.port or 80, timeout
+        self.local = threading.local()
+
+    def get(self, url):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request("GET", url)
+            response = connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self.local.connection = None
+            return 0
+
+
+class ClientTarget:
+    def __init__(self):
+        from app.api import create_app
+        self.application = create_app()
+        self.local = threading.local()
+
+    def get(self, url):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.application.test_client()
+        return client.get(url).status_code
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(target, model, concurrency, duration, requests):
+    latencies, statuses, lock = defaultdict(list), defaultdict(lambda: defaultdict(int)), threading.Lock()
+    deadline = time.monotonic() + duration
+    remaining = [requests]
+
+    def worker(seed):
+        traffic = model.fork(seed)
+        local = []
+        while time.monotonic() < deadline:
+            with lock:
+                if remaining[0] is not None:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+            name, url = traffic.next_url()
+            start = time.perf_counter()
+            status = target.get(url)
+            local.append((name, status, time.perf_counter() - start))
+        with lock:
+            for name, status, elapsed in local:
+                latencies[name].append(elapsed)
+                statuses[name][status] += 1
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker, model.rng.random())
+    return latencies, statuses, time.monotonic() - started
+
+
+def summarize(latencies, statuses, elapsed):
+    report, every = {}, []
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        every.extend(values)
+        errors = sum(count for status, count in statuses[name].items() if status >= 500 or status == 0)
+        report[name] = {
+            "requests": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "error_rate": errors / len(values),
+            "statuses": {str(status): count for status, count in sorted(statuses[name].items())},
+        }
+    every.sort()
+    total_errors = sum(entry["error_rate"] * entry["requests"] for entry in report.values())
+    return {
+        "elapsed_s": elapsed,
+        "requests": len(every),
+        "throughput_rps": len(every) / elapsed if elapsed else 0,
+        "p50_ms": percentile(every, 0.50) * 1000 if every else None,
+        "p95_ms": percentile(every, 0.95) * 1000 if every else None,
+        "p99_ms": percentile(every, 0.99) * 1000 if every else None,
+        "error_rate": total_errors / len(every) if every else 0,
+        "operations": report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para la API de la calculadora")
+    parser.add_argument("--base-url", help="servidor en ejecución; sin él se usa el cliente de pruebas de Flask")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos de prueba")
+    parser.add_argument("--requests", type=int, help="número máximo de peticiones")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="pesos por operación, p. ej. add=50,power=10")
+    parser.add_argument("--distribution", choices=sorted(DISTRIBUTIONS), default="small")
+    parser.add_argument("--pathological", type=float, default=0.0, help="fracción de potencias patológicas")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=os.path.join("results", "load_result.json"))
+    args = parser.parse_args()
+
+    target = HttpTarget(args.base_url, args.timeout) if args.base_url else ClientTarget()
+    model = TrafficModel(parse_mix(args.mix), args.distribution, args.pathological, args.seed)
+    summary = summarize(*run(target, model, args.concurrency, args.duration, args.requests))
+    summary["config"] = vars(args)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as output:
+        json.dump(summary, output, indent=2)
+    print("{requests} peticiones en {elapsed_s:.1f} s: {throughput_rps:.0f} req/s, p50 {p50_ms:.2f} ms, "
+          "p95 {p95_ms:.2f} ms, p99 {p99_ms:.2f} ms, errores {error_rate:.2%}".format(**summary))
+    for name, entry in summary["operations"].items():
+        print("  {:<10} {requests:>7}  p50 {p50_ms:8.2f} ms  p99 {p99_ms:8.2f} ms  estados {statuses}".format(
+            name, **entry))
+
+
+if __name__ == "__main__":
+    main()
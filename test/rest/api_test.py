@@ -1,5 +1,7 @@
 import http.client
+import json
 import os
+import struct
 import unittest
 from urllib.request import urlopen, Request
 from urllib.error import HTTPError
@@ -92,6 +94,36 @@ class TestApi(unittest.TestCase):
         result = response.read().decode('utf-8')
         self.assertEqual(result, "1000000")
 
+    def test_api_add_long_operands(self):
+        """Prueba operandos de miles de dígitos y en hexadecimal"""
+        url = f"{BASE_URL}/calc/add/1{'0' * 5000}/0x10"
+        response = urlopen(Request(url, headers={'Accept': 'application/octet-stream'}), timeout=DEFAULT_TIMEOUT)
+        body = response.read()
+        self.assertEqual(int.from_bytes(body[5:], "little", signed=True), 10 ** 5000 + 16)
+        # Texto y JSON también escriben resultados de más de 4300 dígitos.
+        url = f"{BASE_URL}/calc/add/{'9' * 5000}/1"
+        response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.status, http.client.OK)
+        self.assertEqual(response.read().decode('utf-8'), "1" + "0" * 5000)
+        response = urlopen(Request(url, headers={'Accept': 'application/json'}), timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.read().decode('utf-8'), '{"result": 1' + "0" * 5000 + "}")
+
+    def test_api_batch_operand_too_large(self):
+        """Prueba que un operando demasiado largo se rechace con 413 sin analizarlo"""
+        url = f"{BASE_URL}/calc/batch"
+        body = [{"op": "add", "args": ["9" * 100001, "1"]}, {"op": "add", "args": ["2", "2"]}]
+        request = Request(url, data=json.dumps(body).encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'application/json'})
+        result = json.loads(urlopen(request, timeout=DEFAULT_TIMEOUT).read().decode())
+        self.assertEqual(result[0]["status"], http.client.REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(result[1], {"result": 4})
+        # Un literal numérico del JSON también pasa por la política de tamaño
+        request = Request(url, data=('[{"op": "add", "args": [%s, 1]}]' % ("9" * 100001)).encode('utf-8'),
+                          method='POST', headers={'Content-Type': 'application/json'})
+        with self.assertRaises(HTTPError) as context:
+            urlopen(request, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(context.exception.code, http.client.REQUEST_ENTITY_TOO_LARGE)
+
     def test_api_add_response_headers(self):
         """Prueba que los headers de respuesta sean correctos"""
         url = f"{BASE_URL}/calc/add/3/4"
@@ -458,6 +490,32 @@ class TestApi(unittest.TestCase):
         result = response.read().decode('utf-8')
         self.assertEqual(result, "1000000")
 
+    def test_api_power_exceeds_cost_limit(self):
+        """Prueba que una potencia demasiado grande se rechace sin calcularla"""
+        url = f"{BASE_URL}/calc/power/10/100000000"
+        try:
+            urlopen(url, timeout=DEFAULT_TIMEOUT)
+            self.fail("Debería haber lanzado HTTPError")
+        except HTTPError as e:
+            self.assertEqual(
+                e.code, http.client.BAD_REQUEST,
+                f"Debería ser 400 Bad Request para {url}"
+            )
+
+    def test_api_power_modular_and_approximate_modes(self):
+        """Prueba los modos modular y aproximado de la potencia"""
+        url = f"{BASE_URL}/calc/power/10/100000000?mod=7"
+        response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.read().decode('utf-8'), str(pow(10, 100000000, 7)))
+
+        url = f"{BASE_URL}/calc/power/10/100000000?approx=1"
+        response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.read().decode('utf-8'), "1e+100000000")
+
+        url = f"{BASE_URL}/calc/power/10/400.0?approx=1"
+        response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.read().decode('utf-8'), "1e+400")
+
     def test_api_power_response_headers(self):
         """Prueba headers de respuesta para potencia"""
         url = f"{BASE_URL}/calc/power/3/4"
@@ -537,6 +595,15 @@ class TestApi(unittest.TestCase):
                 f"Debería ser 400 Bad Request para {url}"
             )
 
+    def test_api_sqrt_large_integers(self):
+        """Prueba raíces de enteros mayores que el rango de float"""
+        url = f"{BASE_URL}/calc/sqrt/1{'0' * 600}"
+        response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.read().decode(), "1" + "0" * 300)
+        url = f"{BASE_URL}/calc/sqrt/2{'0' * 1000}"
+        response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.read().decode(), "1.4142135623731e+500")
+
     def test_api_sqrt_response_headers(self):
         """Prueba headers de respuesta para raíz cuadrada"""
         url = f"{BASE_URL}/calc/sqrt/16"
@@ -652,3 +719,337 @@ class TestApi(unittest.TestCase):
                 e.code, http.client.METHOD_NOT_ALLOWED, 
                 f"Debería ser 405 Method Not Allowed para {url}"
             )
+
+    # ========== PRUEBAS PARA LOTES ==========
+    def test_api_batch_success(self):
+        """Prueba evaluación de un lote JSON con resultados en orden"""
+        url = f"{BASE_URL}/calc/batch"
+        body = [
+            {"op": "add", "args": [2, 2]},
+            {"op": "divide", "args": ["5", "2"]},
+            {"op": "sqrt", "args": [9]},
+        ]
+        request = Request(url, data=json.dumps(body).encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'application/json'})
+        response = urlopen(request, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(
+            response.status, http.client.OK, f"Error en la petición API a {url}"
+        )
+        self.assertEqual(response.headers.get('Content-Type'), 'application/json')
+        result = json.loads(response.read().decode('utf-8'))
+        self.assertEqual(result, [{"result": 4}, {"result": 2.5}, {"result": 3.0}])
+
+    def test_api_batch_ndjson_item_errors(self):
+        """Prueba lote NDJSON con errores por elemento"""
+        url = f"{BASE_URL}/calc/batch"
+        body = "\n".join([
+            '{"op": "divide", "args": [1, 0]}',
+            '{"op": "add", "args": ["abc", 2]}',
+            '{"op": "modulo", "args": [1, 2]}',
+            '{"op": "log10", "args": [1, 2]}',
+            '{"op": "multiply", "args": [3, 4]}',
+        ])
+        request = Request(url, data=body.encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'application/x-ndjson'})
+        response = urlopen(request, timeout=DEFAULT_TIMEOUT)
+        result = json.loads(response.read().decode('utf-8'))
+        self.assertEqual(len(result), 5)
+        for item in result[:4]:
+            self.assertEqual(item["status"], http.client.BAD_REQUEST)
+        self.assertEqual(result[4], {"result": 12})
+
+    def test_api_batch_results_past_the_digit_limit(self):
+        """Prueba que un resultado de más de 4300 dígitos no convierta el lote ni el stream en un error"""
+        items = ['{"op": "power", "args": [10, 5000]}', '{"op": "add", "args": [1, 2]}']
+        requests = [
+            Request(f"{BASE_URL}/calc/batch", data=f"[{', '.join(items)}]".encode('utf-8'), method='POST',
+                    headers={'Content-Type': 'application/json'}),
+            Request(f"{BASE_URL}/calc/stream", data="\n".join(items).encode('utf-8'), method='POST',
+                    headers={'Content-Type': 'application/x-ndjson'}),
+        ]
+        for request in requests:
+            response = urlopen(request, timeout=DEFAULT_TIMEOUT)
+            self.assertEqual(response.status, http.client.OK, f"Error en la petición API a {request.full_url}")
+            text = response.read().decode('utf-8')
+            self.assertIn('{"result": 1' + "0" * 5000 + "}", text)
+            self.assertIn('{"result": 3}', text)
+
+    def test_api_json_non_finite_results(self):
+        """Prueba que los resultados infinitos se escriban como cadenas en JSON válido"""
+        request = Request(f"{BASE_URL}/calc/multiply/1.e308/10.0", headers={'Accept': 'application/json'})
+        response = urlopen(request, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(json.loads(response.read().decode('utf-8'), parse_constant=self.fail), {"result": "inf"})
+        body = json.dumps([{"op": "add", "args": [1e308, 1e308]}, {"op": "add", "args": [1, 2]}])
+        request = Request(f"{BASE_URL}/calc/batch", data=body.encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'application/json'})
+        response = urlopen(request, timeout=DEFAULT_TIMEOUT)
+        result = json.loads(response.read().decode('utf-8'), parse_constant=self.fail)
+        self.assertEqual(result, [{"result": "inf"}, {"result": 3}])
+
+    def test_api_batch_invalid_body(self):
+        """Prueba cuerpo de lote que no es una lista"""
+        url = f"{BASE_URL}/calc/batch"
+        for body in ['{"op": "add"}', 'no es json']:
+            try:
+                request = Request(url, data=body.encode('utf-8'), method='POST',
+                                  headers={'Content-Type': 'application/json'})
+                urlopen(request, timeout=DEFAULT_TIMEOUT)
+                self.fail("Debería haber lanzado HTTPError")
+            except HTTPError as e:
+                self.assertEqual(
+                    e.code, http.client.BAD_REQUEST,
+                    f"Debería ser 400 Bad Request para {body}"
+                )
+
+    def test_api_batch_method_not_allowed(self):
+        """Prueba que el lote solo acepte POST"""
+        url = f"{BASE_URL}/calc/batch"
+        try:
+            urlopen(url, timeout=DEFAULT_TIMEOUT)
+            self.fail("Debería haber lanzado HTTPError")
+        except HTTPError as e:
+            self.assertEqual(
+                e.code, http.client.METHOD_NOT_ALLOWED,
+                f"Debería ser 405 Method Not Allowed para {url}"
+            )
+
+    # ========== PRUEBAS PARA EXPRESIONES ==========
+    def test_api_eval_success(self):
+        """Prueba evaluación de una expresión con variables"""
+        url = f"{BASE_URL}/calc/eval"
+        body = {"expr": "sqrt(a*b + c**2)", "vars": {"a": 4, "b": "4", "c": 3}}
+        request = Request(url, data=json.dumps(body).encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'application/json'})
+        response = urlopen(request, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(
+            response.status, http.client.OK, f"Error en la petición API a {url}"
+        )
+        self.assertEqual(response.read().decode('utf-8'), "5.0")
+
+    def test_api_eval_long_chain(self):
+        """Prueba una cadena plana de 499 sumas, que antes desbordaba la pila con un 500"""
+        url = f"{BASE_URL}/calc/eval"
+        body = {"expr": "+".join(["1"] * 499)}
+        request = Request(url, data=json.dumps(body).encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'application/json'})
+        response = urlopen(request, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(
+            response.status, http.client.OK, f"Error en la petición API a {url}"
+        )
+        self.assertEqual(response.read().decode('utf-8'), "499")
+
+    def test_api_eval_invalid_expression(self):
+        """Prueba expresiones inválidas que deben retornar 400 Bad Request"""
+        url = f"{BASE_URL}/calc/eval"
+        for body in [{"expr": "1 +"}, {"expr": "a + 1"}, {"expr": "1 / 0"}, {"vars": {}}]:
+            try:
+                request = Request(url, data=json.dumps(body).encode('utf-8'), method='POST',
+                                  headers={'Content-Type': 'application/json'})
+                urlopen(request, timeout=DEFAULT_TIMEOUT)
+                self.fail("Debería haber lanzado HTTPError")
+            except HTTPError as e:
+                self.assertEqual(
+                    e.code, http.client.BAD_REQUEST,
+                    f"Debería ser 400 Bad Request para {body}"
+                )
+
+    # ========== PRUEBAS PARA STREAMING ==========
+    def test_api_stream_ndjson(self):
+        """Prueba evaluación en streaming de operaciones NDJSON"""
+        url = f"{BASE_URL}/calc/stream"
+        body = '{"op": "add", "args": [1, 2]}\n{"op": "divide", "args": [1, 0]}\n{"op": "sqrt", "args": ["16"]}\n'
+        request = Request(url, data=body.encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'application/x-ndjson'})
+        response = urlopen(request, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(
+            response.status, http.client.OK, f"Error en la petición API a {url}"
+        )
+        self.assertEqual(response.headers.get('Content-Type'), 'application/x-ndjson')
+        results = [json.loads(line) for line in response.read().decode('utf-8').splitlines()]
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0], {"result": 3})
+        self.assertEqual(results[1]["status"], http.client.BAD_REQUEST)
+        self.assertEqual(results[2], {"result": 4.0})
+
+    # ========== PRUEBAS PARA AGREGADOS ==========
+    def post_aggregate(self, path, body):
+        request = Request(f"{BASE_URL}{path}", data=body.encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'text/plain'})
+        return urlopen(request, timeout=DEFAULT_TIMEOUT)
+
+    def test_api_aggregate_success(self):
+        """Prueba las reducciones con un operando por línea"""
+        cases = [
+            ("/calc/aggregate/sum", "0.1\n" * 10, "1.0"),
+            ("/calc/aggregate/sum", "1\n2\n3\n", "6"),
+            ("/calc/aggregate/product", "2\n" * 70, str(2 ** 70)),
+            ("/calc/aggregate/product?approx=1", ("1" + "0" * 200 + "\n") * 5, "1e+1000"),
+            ("/calc/aggregate/min", "3\n-1\n2.5\n", "-1"),
+            ("/calc/aggregate/max", "3\n-1\n2.5\n", "3"),
+            ("/calc/aggregate/mean", "1\n2\n3\n4\n", "2.5"),
+            ("/calc/aggregate/variance", "1\n2\n3\n4\n", "1.25"),
+            ("/calc/aggregate/variance?sample=1", "1\n2\n3\n4\n", "1.6666666666666667"),
+            ("/calc/aggregate/sum?numeric=fraction", "0.1\n0.2\n", "3/10"),
+        ]
+        for path, body, expected in cases:
+            response = self.post_aggregate(path, body)
+            self.assertEqual(
+                response.status, http.client.OK, f"Error en la petición API a {path}"
+            )
+            self.assertEqual(response.read().decode('utf-8'), expected, path)
+
+    def test_api_aggregate_large_body(self):
+        """Prueba la suma de 100000 operandos en una sola petición"""
+        body = "".join(f"{i}.5\n" for i in range(100000))
+        request = Request(f"{BASE_URL}/calc/aggregate/sum", data=body.encode('utf-8'), method='POST',
+                          headers={'Content-Type': 'text/plain', 'Accept': 'application/json'})
+        response = urlopen(request, timeout=DEFAULT_TIMEOUT * 5)
+        self.assertEqual(json.loads(response.read().decode('utf-8')), {"result": 5000000000.0})
+
+    def test_api_aggregate_errors(self):
+        """Prueba cuerpos vacíos, operandos inválidos y operaciones desconocidas"""
+        cases = [
+            ("/calc/aggregate/mean", "", http.client.BAD_REQUEST),
+            ("/calc/aggregate/sum", "1\nabc\n", http.client.BAD_REQUEST),
+            ("/calc/aggregate/variance?sample=1", "1\n", http.client.BAD_REQUEST),
+            ("/calc/aggregate/median", "1\n", http.client.NOT_FOUND),
+        ]
+        for path, body, status in cases:
+            try:
+                self.post_aggregate(path, body)
+                self.fail("Debería haber lanzado HTTPError")
+            except HTTPError as e:
+                self.assertEqual(e.code, status, f"Debería ser {status} para {path}")
+
+    def test_api_aggregate_method_not_allowed(self):
+        """Prueba que los agregados solo acepten POST"""
+        url = f"{BASE_URL}/calc/aggregate/sum"
+        try:
+            urlopen(url, timeout=DEFAULT_TIMEOUT)
+            self.fail("Debería haber lanzado HTTPError")
+        except HTTPError as e:
+            self.assertEqual(
+                e.code, http.client.METHOD_NOT_ALLOWED,
+                f"Debería ser 405 Method Not Allowed para {url}"
+            )
+
+    # ========== PRUEBAS PARA BACKENDS NUMÉRICOS ==========
+    def test_api_numeric_backends(self):
+        """Prueba la división exacta con Decimal y Fraction"""
+        cases = [
+            ("/calc/divide/1/3?numeric=decimal&precision=40", "0." + "3" * 40),
+            ("/calc/add/0.1/0.2?numeric=decimal", "0.3"),
+            ("/calc/divide/1/3?numeric=fraction", "1/3"),
+            ("/calc/add/0.1/0.2?numeric=fraction", "3/10"),
+        ]
+        for path, expected in cases:
+            url = f"{BASE_URL}{path}"
+            response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+            self.assertEqual(
+                response.status, http.client.OK, f"Error en la petición API a {url}"
+            )
+            self.assertEqual(response.read().decode(), expected, f"Resultado incorrecto para {path}")
+
+    def test_api_numeric_backend_invalid(self):
+        """Prueba que un backend o precisión inválidos devuelvan 400"""
+        for query in ["numeric=complex", "numeric=decimal&precision=0", "numeric=decimal&precision=abc"]:
+            url = f"{BASE_URL}/calc/add/1/2?{query}"
+            try:
+                urlopen(url, timeout=DEFAULT_TIMEOUT)
+                self.fail("Debería haber lanzado HTTPError")
+            except HTTPError as e:
+                self.assertEqual(
+                    e.code, http.client.BAD_REQUEST, f"Debería ser 400 Bad Request para {query}"
+                )
+
+    # ========== PRUEBAS PARA NEGOCIACIÓN DE CONTENIDO ==========
+    def test_api_accept_json(self):
+        """Prueba que Accept: application/json devuelva el resultado en JSON"""
+        url = f"{BASE_URL}/calc/divide/5/2"
+        response = urlopen(Request(url, headers={'Accept': 'application/json'}), timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(
+            response.status, http.client.OK, f"Error en la petición API a {url}"
+        )
+        self.assertEqual(response.headers.get('Content-Type'), 'application/json')
+        self.assertEqual(json.loads(response.read().decode()), {"result": 2.5})
+
+    def test_api_accept_binary(self):
+        """Prueba el formato binario con enteros de 64 bits y enteros grandes"""
+        url = f"{BASE_URL}/calc/add/2/2"
+        response = urlopen(Request(url, headers={'Accept': 'application/octet-stream'}), timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.headers.get('Content-Type'), 'application/octet-stream')
+        self.assertEqual(response.read(), struct.pack("<cq", b"q", 4))
+        url = f"{BASE_URL}/calc/power/2/100"
+        response = urlopen(Request(url, headers={'Accept': 'application/octet-stream'}), timeout=DEFAULT_TIMEOUT)
+        body = response.read()
+        self.assertEqual(body[:1], b"i")
+        self.assertEqual(int.from_bytes(body[5:], "little", signed=True), 2 ** 100)
+
+    def test_api_accept_default_text(self):
+        """Prueba que sin preferencia se mantenga text/plain"""
+        url = f"{BASE_URL}/calc/add/2/2"
+        response = urlopen(Request(url, headers={'Accept': '*/*'}), timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.headers.get('Content-Type'), 'text/plain')
+        self.assertEqual(response.read().decode(), "4")
+
+    # ========== PRUEBAS PARA CACHÉ HTTP ==========
+    def test_api_cache_headers(self):
+        """Prueba que los resultados lleven ETag fuerte y Cache-Control de larga duración"""
+        url = f"{BASE_URL}/calc/add/5/2"
+        response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.read().decode(), "7")
+        self.assertIn("max-age=", response.headers.get('Cache-Control'))
+        self.assertTrue(response.headers.get('ETag').startswith('"'))
+
+    def test_api_conditional_request_not_modified(self):
+        """Prueba que If-None-Match con el ETag vigente devuelva 304 sin cuerpo"""
+        url = f"{BASE_URL}/calc/multiply/6/7"
+        tag = urlopen(url, timeout=DEFAULT_TIMEOUT).headers.get('ETag')
+        try:
+            urlopen(Request(url, headers={'If-None-Match': tag}), timeout=DEFAULT_TIMEOUT)
+            self.fail("Debería responder 304 Not Modified")
+        except HTTPError as e:
+            self.assertEqual(e.code, http.client.NOT_MODIFIED)
+            self.assertEqual(e.headers.get('ETag'), tag)
+        response = urlopen(Request(url, headers={'If-None-Match': '"otro"'}), timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(response.read().decode(), "42")
+
+    def test_api_wildcard_condition_does_not_hide_errors(self):
+        """Prueba que If-None-Match: * no convierta en 304 una operación inválida"""
+        for path in ("/calc/sqrt/-1", "/calc/divide/1/0", "/calc/power/10/100000000"):
+            try:
+                urlopen(Request(f"{BASE_URL}{path}", headers={'If-None-Match': '*'}), timeout=DEFAULT_TIMEOUT)
+                self.fail("Debería haber lanzado HTTPError")
+            except HTTPError as e:
+                self.assertEqual(e.code, http.client.BAD_REQUEST, f"Debería ser 400 Bad Request para {path}")
+
+    def test_api_equivalent_operands_share_etag(self):
+        """Prueba que 0005, +5 y 5 compartan la misma clave de caché"""
+        tags = {
+            urlopen(f"{BASE_URL}/calc/add/{operand}/2", timeout=DEFAULT_TIMEOUT).headers.get('ETag')
+            for operand in ("5", "0005", "+5", "%205")
+        }
+        self.assertEqual(len(tags), 1)
+
+    def test_api_errors_not_cacheable(self):
+        """Prueba que las respuestas de error no se marquen como cacheables"""
+        try:
+            urlopen(f"{BASE_URL}/calc/add/abc/2", timeout=DEFAULT_TIMEOUT)
+            self.fail("Debería responder 400 Bad Request")
+        except HTTPError as e:
+            self.assertIsNone(e.headers.get('ETag'))
+            self.assertIsNone(e.headers.get('Cache-Control'))
+
+    # ========== PRUEBAS PARA MÉTRICAS ==========
+    def test_api_metrics_prometheus_format(self):
+        """Prueba que /metrics exponga contadores en formato Prometheus"""
+        urlopen(f"{BASE_URL}/calc/add/2/2", timeout=DEFAULT_TIMEOUT)
+        url = f"{BASE_URL}/metrics"
+        response = urlopen(url, timeout=DEFAULT_TIMEOUT)
+        self.assertEqual(
+            response.status, http.client.OK, f"Error en la petición API a {url}"
+        )
+        self.assertTrue(response.headers.get('Content-Type').startswith('text/plain; version=0.0.4'))
+        text = response.read().decode('utf-8')
+        self.assertIn('calc_http_requests_total{endpoint="add",status="200"}', text)
+        self.assertIn('calc_operation_phase_seconds_count{operation="add",phase="compute"}', text)
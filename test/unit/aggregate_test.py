@@ -0,0 +1,123 @@
+import math
+import random
+import statistics
+import unittest
+from decimal import Decimal, localcontext
+from fractions import Fraction
+import pytest
+
+from app import aggregate
+from app.calc import Approximation
+
+
+def one_shot(values):
+    """Iterador de un solo uso, como las líneas de un cuerpo en streaming."""
+    return iter(list(values))
+
+
+@pytest.mark.unit
+class TestSummation(unittest.TestCase):
+    def test_float_sums_are_correctly_rounded(self):
+        self.assertEqual(1.0, aggregate.total(one_shot([0.1] * 10)))
+        self.assertEqual(1e-16, aggregate.total(one_shot([1e16, 1e-16, -1e16])))
+        rng = random.Random(25)
+        values = [rng.uniform(-1e6, 1e6) for _ in range(10000)]
+        self.assertEqual(math.fsum(values), aggregate.total(one_shot(values)))
+
+    def test_integer_sums_are_exact(self):
+        self.assertEqual(6, aggregate.total(one_shot([1, 2, 3])))
+        self.assertEqual(10 ** 400 + 1, aggregate.total(one_shot([10 ** 400, 1])))
+        self.assertEqual(0, aggregate.total(one_shot([])))
+
+    def test_mixed_sums(self):
+        # Los enteros representables entran en fsum junto a los floats.
+        self.assertEqual(0.5, aggregate.total(one_shot([2 ** 53, 0.5, -(2 ** 53)])))
+        self.assertEqual(float(2 ** 60) + 0.5 + 2 ** 10, aggregate.total(one_shot([2 ** 60, 0.5, 2 ** 10])))
+        self.assertRaises(OverflowError, aggregate.total, one_shot([10 ** 400, 0.5]))
+
+    def test_exact_backends(self):
+        self.assertEqual(Fraction(3, 10), aggregate.total(one_shot([Fraction(1, 10), Fraction(2, 10)])))
+        with localcontext() as context:
+            context.prec = 50
+            self.assertEqual(Decimal("0.3"), aggregate.total(one_shot([Decimal("0.1"), Decimal("0.2")])))
+
+    def test_mixing_floats_with_exact_types_is_an_error(self):
+        self.assertRaises(TypeError, aggregate.total, one_shot([1.5, Decimal("2")]))
+        self.assertRaises(TypeError, aggregate.total, one_shot([Fraction(1, 2), 1.5]))
+        self.assertRaises(TypeError, aggregate.mean, one_shot([1.5, Fraction(1, 2)]))
+        self.assertRaises(TypeError, aggregate.total, one_shot([Decimal("1"), Fraction(1, 2)]))
+        self.assertEqual(Fraction(7, 2), aggregate.total(one_shot([Fraction(1, 2), 3])))
+
+    def test_huge_operand_does_not_slow_later_additions(self):
+        # Cada 1 se suma aparte del entero de 99000 dígitos, no sobre él.
+        values = [10 ** 99000] + [1] * 200000
+        self.assertEqual(10 ** 99000 + 200000, aggregate.total(one_shot(values)))
+
+    def test_summation_counts_values(self):
+        self.assertEqual((6.5, 3), aggregate.summation(one_shot([1, 2, 3.5])))
+
+
+@pytest.mark.unit
+class TestStatistics(unittest.TestCase):
+    def test_mean(self):
+        self.assertEqual(2.5, aggregate.mean(one_shot([1, 2, 3, 4])))
+        self.assertEqual(Fraction(1, 3), aggregate.mean(one_shot([Fraction(1), Fraction(0), Fraction(0)])))
+        self.assertEqual(1e100, aggregate.mean(one_shot([10 ** 100, 10 ** 100])))
+        self.assertRaises(ValueError, aggregate.mean, one_shot([]))
+
+    def test_variance_matches_statistics(self):
+        rng = random.Random(3)
+        values = [rng.gauss(10, 2) for _ in range(5000)]
+        self.assertAlmostEqual(statistics.pvariance(values), aggregate.variance(one_shot(values)), places=9)
+        self.assertAlmostEqual(statistics.variance(values), aggregate.variance(one_shot(values), ddof=1), places=9)
+
+    def test_variance_is_stable_with_a_large_offset(self):
+        # La fórmula de la suma de cuadrados pierde todos los dígitos aquí.
+        values = [1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16]
+        self.assertEqual(22.5, aggregate.variance(one_shot(values)))
+
+    def test_variance_exact_with_fractions(self):
+        values = [Fraction(1), Fraction(2), Fraction(4)]
+        self.assertEqual(Fraction(14, 9), aggregate.variance(one_shot(values)))
+        self.assertEqual(Fraction(7, 3), aggregate.variance(one_shot(values), ddof=1))
+
+    def test_variance_needs_enough_values(self):
+        self.assertEqual(0, aggregate.variance(one_shot([5])))
+        self.assertRaises(ValueError, aggregate.variance, one_shot([]))
+        self.assertRaises(ValueError, aggregate.variance, one_shot([5]), ddof=1)
+
+    def test_minimum_and_maximum(self):
+        self.assertEqual(-1, aggregate.minimum(one_shot([3, -1, 2.5])))
+        self.assertEqual(3, aggregate.maximum(one_shot([3, -1, 2.5])))
+        self.assertRaises(ValueError, aggregate.minimum, one_shot([]))
+        self.assertRaises(ValueError, aggregate.maximum, one_shot([]))
+
+
+@pytest.mark.unit
+class TestProduct(unittest.TestCase):
+    def test_exact_product(self):
+        self.assertEqual(2 ** 100, aggregate.product(one_shot([2] * 100), 1000))
+        self.assertEqual(1, aggregate.product(one_shot([]), 1000))
+        self.assertEqual(Fraction(1, 8), aggregate.product(one_shot([Fraction(1, 2)] * 3), 1000))
+        self.assertRaises(ValueError, aggregate.product, one_shot([2] * 2000), 1000)
+        self.assertRaises(ValueError, aggregate.product, one_shot([Fraction(1, 2)] * 2000), 1000)
+
+    def test_log_product_fits_a_float(self):
+        self.assertAlmostEqual(1024.0, aggregate.log_product(one_shot([2] * 10)), places=9)
+        self.assertAlmostEqual(-6.0, aggregate.log_product(one_shot([-2, 3, 1.0])), places=12)
+        self.assertEqual(0, aggregate.log_product(one_shot([5, 0, -3])))
+
+    def test_log_product_beyond_the_float_range(self):
+        result = aggregate.log_product(one_shot([1e300] * 1000))
+        self.assertIsInstance(result, Approximation)
+        self.assertEqual(300000, result.exponent)
+        self.assertAlmostEqual(1.0, result.mantissa, places=9)
+        result = aggregate.log_product(one_shot([-(10 ** 500), 2, Fraction(1, 4), Decimal("3")]))
+        self.assertTrue(result.negative)
+        self.assertEqual(500, result.exponent)
+        self.assertAlmostEqual(1.5, result.mantissa, places=9)
+        self.assertRaises(OverflowError, aggregate.log_product, one_shot([float("inf")]))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
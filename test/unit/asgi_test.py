@@ -0,0 +1,313 @@
+import asyncio
+import http.client
+import json
+import threading
+import unittest
+from unittest.mock import patch
+import pytest
+
+from app import asgi
+from app import encoding
+from app import operations
+from app.calc import InvalidPermissions
+from app.executor import ComputationTimeout
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+def call_chunked(method, path, chunks, query=b"", accept=b"*/*"):
+    """Como call, pero el cuerpo llega en varios mensajes y se devuelven todos los trozos de la respuesta."""
+    messages = []
+    pending = list(chunks)
+
+    async def receive():
+        body = pending.pop(0) if pending else b""
+        return {"type": "http.request", "body": body, "more_body": bool(pending)}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(b"content-type", b"application/x-ndjson"), (b"accept", accept)]}
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(asgi.asgi_application(scope, receive, send))
+    finally:
+        loop.close()
+    return messages[0]["status"], [message["body"] for message in messages[1:]]
+
+
+def call(method, path, query=b"", body=b"", content_type=b"application/json", accept=b"*/*", if_none_match=b""):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(b"content-type", content_type), (b"accept", accept), (b"if-none-match", if_none_match)]}
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(asgi.asgi_application(scope, receive, send))
+    finally:
+        loop.close()
+    return messages[0]["status"], messages[1]["body"].decode("utf-8")
+
+
+@pytest.mark.unit
+@patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+class TestAsgi(unittest.TestCase):
+    def test_operations_return_text_results(self, _validate_permissions):
+        self.assertEqual((http.client.OK, "4"), call("GET", "/calc/add/2/2"))
+        self.assertEqual((http.client.OK, "2.5"), call("GET", "/calc/divide/5/2"))
+        self.assertEqual((http.client.OK, "3.0"), call("GET", "/calc/sqrt/9"))
+        self.assertEqual((http.client.OK, "1e+100000000"), call("GET", "/calc/power/10/100000000", b"approx=1"))
+
+    def test_accept_header_selects_encoder(self, _validate_permissions):
+        self.assertEqual((http.client.OK, '{"result": 4}'), call("GET", "/calc/add/2/2", accept=b"application/json"))
+        self.assertEqual((http.client.OK, "4"), call("GET", "/calc/add/2/2", accept=b"text/plain"))
+
+    def test_conditional_requests_skip_evaluation(self, _validate_permissions):
+        loop = asyncio.new_event_loop()
+        try:
+            status, body, headers = loop.run_until_complete(
+                asgi.calculate(operations.OPERATIONS["add"], ["0005", "2"], {}, encoding.TEXT))
+        finally:
+            loop.close()
+        headers = dict(headers)
+        self.assertEqual((http.client.OK, b"7"), (status, body))
+        self.assertIn(b"max-age", headers[b"cache-control"])
+        tag = headers[b"etag"]
+        with patch.object(asgi.CALCULATOR, "add") as add:
+            self.assertEqual((http.client.NOT_MODIFIED, ""), call("GET", "/calc/add/+5/2", if_none_match=tag))
+            add.assert_not_called()
+        self.assertEqual((http.client.OK, "7"), call("GET", "/calc/add/5/2", if_none_match=b'"otro"'))
+        with patch('app.util.validate_permissions', return_value=False, create=True):
+            self.assertEqual(http.client.FORBIDDEN, call("GET", "/calc/add/5/2", if_none_match=tag)[0])
+
+    def test_wildcard_condition_needs_a_valid_result(self, _validate_permissions):
+        self.assertEqual(http.client.BAD_REQUEST, call("GET", "/calc/sqrt/-1", if_none_match=b"*")[0])
+        self.assertEqual(http.client.BAD_REQUEST, call("GET", "/calc/divide/1/0", if_none_match=b"*")[0])
+        self.assertEqual((http.client.NOT_MODIFIED, ""), call("GET", "/calc/add/5/2", if_none_match=b"*"))
+
+    def test_errors_map_to_status_codes(self, _validate_permissions):
+        self.assertEqual(http.client.BAD_REQUEST, call("GET", "/calc/add/abc/2")[0])
+        self.assertEqual(http.client.BAD_REQUEST, call("GET", "/calc/divide/1/0")[0])
+        self.assertEqual(http.client.NOT_FOUND, call("GET", "/calc/sqrt/1/2")[0])
+        self.assertEqual(http.client.NOT_FOUND, call("GET", "/calc/modulo/1/2")[0])
+        self.assertEqual(http.client.METHOD_NOT_ALLOWED, call("POST", "/calc/add/2/2")[0])
+
+    def test_heavy_power_runs_in_process_pool(self, _validate_permissions):
+        with patch.object(asgi.EXECUTION, "offload", wraps=asgi.EXECUTION.offload) as offload:
+            self.assertEqual(http.client.OK, call("GET", "/calc/power/2/70001", accept=b"application/octet-stream")[0])
+            self.assertTrue(offload.called)
+            offload.reset_mock()
+            call("GET", "/calc/power/2/10")
+            self.assertFalse(offload.called)
+
+    def test_heavy_power_respects_time_budget(self, _validate_permissions):
+        with patch.object(asgi.EXECUTION, "offload", side_effect=ComputationTimeout("budget")):
+            self.assertEqual((http.client.SERVICE_UNAVAILABLE, "budget"), call("GET", "/calc/power/3/70003"))
+
+    def test_heavy_power_does_not_block_the_loop(self, _validate_permissions):
+        release = threading.Event()
+
+        def slow_offload(operation, numbers):
+            release.wait(5)
+            return 0
+
+        async def scenario():
+            heavy = asyncio.ensure_future(asgi.calculate(operations.OPERATIONS["power"], ["5", "70005"], {},
+                                                         encoding.TEXT))
+            await asyncio.sleep(0.01)
+            # La potencia sigue en curso y el bucle atiende otra petición.
+            cheap = await asgi.calculate(operations.OPERATIONS["add"], ["2", "2"], {}, encoding.TEXT)
+            self.assertFalse(heavy.done())
+            release.set()
+            return cheap, await heavy
+
+        loop = asyncio.new_event_loop()
+        try:
+            with patch.object(asgi.EXECUTION, "offload", side_effect=slow_offload):
+                cheap, heavy = loop.run_until_complete(scenario())
+        finally:
+            release.set()
+            loop.close()
+        self.assertEqual(b"4", cheap[1])
+        self.assertEqual(b"0", heavy[1])
+
+    def test_identical_heavy_requests_share_one_computation(self, _validate_permissions):
+        def scope():
+            return {"type": "http", "method": "GET", "path": "/calc/power/3/70000", "query_string": b"",
+                    "headers": []}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        bodies = []
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                bodies.append(message["body"])
+
+        async def burst():
+            await asyncio.gather(*(asgi.asgi_application(scope(), receive, send) for _ in range(4)))
+
+        loop = asyncio.new_event_loop()
+        try:
+            with patch.object(asgi.EXECUTION, "offload", wraps=asgi.EXECUTION.offload) as offload:
+                loop.run_until_complete(burst())
+        finally:
+            loop.close()
+        self.assertEqual(1, offload.call_count)
+        self.assertEqual(4, len(bodies))
+        self.assertEqual(1, len(set(bodies)))
+        self.assertEqual({}, asgi.IN_FLIGHT)
+
+    def test_coalesced_followers_check_permissions(self, _validate_permissions):
+        power = operations.OPERATIONS["power"]
+        loop = asyncio.new_event_loop()
+        try:
+            asgi.IN_FLIGHT["clave"] = loop.create_future()
+            with patch('app.util.validate_permissions', return_value=False, create=True):
+                self.assertRaises(InvalidPermissions, loop.run_until_complete,
+                                  asgi.coalesced(loop, "clave", None, power, [3, 70000]))
+        finally:
+            asgi.IN_FLIGHT.pop("clave", None)
+            loop.close()
+
+    def test_batch(self, _validate_permissions):
+        body = json.dumps([{"op": "add", "args": [1, 2]}, {"op": "sqrt", "args": [-1]}]).encode("utf-8")
+        status, result = call("POST", "/calc/batch", body=body)
+        self.assertEqual(http.client.OK, status)
+        result = json.loads(result)
+        self.assertEqual({"result": 3}, result[0])
+        self.assertEqual(http.client.BAD_REQUEST, result[1]["status"])
+
+
+    def test_batch_uses_the_numeric_backend(self, _validate_permissions):
+        body = json.dumps([{"op": "divide", "args": [1, 3]}]).encode("utf-8")
+        status, result = call("POST", "/calc/batch", query=b"numeric=fraction", body=body)
+        self.assertEqual((http.client.OK, [{"result": "1/3"}]), (status, json.loads(result)))
+        self.assertEqual(http.client.BAD_REQUEST, call("POST", "/calc/batch", query=b"numeric=otro", body=body)[0])
+
+    def test_batch_items_go_through_the_execution_layer(self, _validate_permissions):
+        body = json.dumps([{"op": "multiply", "args": [hex(2 ** 70000), 3]}]).encode("utf-8")
+        with patch.object(asgi.EXECUTION, "offload", wraps=asgi.EXECUTION.offload) as offload:
+            self.assertEqual(http.client.OK, call("POST", "/calc/batch", body=body,
+                                                  accept=b"application/octet-stream")[0])
+            self.assertTrue(offload.called)
+        with patch.object(asgi.EXECUTION, "offload", side_effect=ComputationTimeout("budget")):
+            status, result = call("POST", "/calc/batch", body=body)
+        self.assertEqual([{"error": "budget", "status": http.client.SERVICE_UNAVAILABLE}], json.loads(result))
+
+    def test_batch_does_not_block_the_loop(self, _validate_permissions):
+        release = threading.Event()
+        messages = []
+
+        def slow_offload(operation, numbers):
+            release.wait(5)
+            return 0
+
+        async def receive():
+            body = json.dumps([{"op": "multiply", "args": [hex(2 ** 70000), 3]}]).encode("utf-8")
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        async def scenario():
+            scope = {"type": "http", "method": "POST", "path": "/calc/batch", "query_string": b"",
+                     "headers": [(b"content-type", b"application/json")]}
+            batch = asyncio.ensure_future(asgi.asgi_application(scope, receive, send))
+            await asyncio.sleep(0.01)
+            # El lote sigue en curso y el bucle atiende otra petición.
+            cheap = await asgi.calculate(operations.OPERATIONS["add"], ["2", "2"], {}, encoding.TEXT)
+            self.assertFalse(batch.done())
+            release.set()
+            await batch
+            return cheap
+
+        loop = asyncio.new_event_loop()
+        try:
+            with patch.object(asgi.EXECUTION, "offload", side_effect=slow_offload):
+                cheap = loop.run_until_complete(scenario())
+        finally:
+            release.set()
+            loop.close()
+        self.assertEqual(b"4", cheap[1])
+        self.assertEqual(b'[{"result": 0}]', messages[1]["body"])
+
+
+    def test_stream(self, _validate_permissions):
+        chunks = [b'{"op": "add", "args": [1, ', b'2]}\n{"op": "divide", "args": [1, 0]}', b'\n{"op": "sqrt", "args": ["16"]}\n']
+        status, parts = call_chunked("POST", "/calc/stream", chunks)
+        self.assertEqual(http.client.OK, status)
+        results = [json.loads(line) for line in b"".join(parts).decode("utf-8").splitlines()]
+        self.assertEqual({"result": 3}, results[0])
+        self.assertEqual(http.client.BAD_REQUEST, results[1]["status"])
+        self.assertEqual({"result": 4.0}, results[2])
+        self.assertEqual(b"", parts[-1])
+        self.assertEqual(http.client.BAD_REQUEST, call_chunked("POST", "/calc/stream", [b""], query=b"numeric=x")[0])
+        self.assertEqual(http.client.METHOD_NOT_ALLOWED, call("GET", "/calc/stream")[0])
+
+    def test_stream_sends_results_before_reading_more_input(self, _validate_permissions):
+        # Antes de esperar el segundo trozo ya se ha enviado el resultado del primero.
+        sent_before_second_chunk = []
+        messages = []
+        pending = [b'{"op": "add", "args": [1, 2]}\n', b'{"op": "add", "args": [3, 4]}\n']
+
+        async def receive():
+            if len(pending) == 1:
+                sent_before_second_chunk.append(b"".join(m.get("body", b"") for m in messages))
+            return {"type": "http.request", "body": pending.pop(0), "more_body": bool(pending)}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/calc/stream", "query_string": b"", "headers": []}
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(asgi.asgi_application(scope, receive, send))
+        finally:
+            loop.close()
+        self.assertEqual([b'{"result": 3}\n'], sent_before_second_chunk)
+
+    def test_aggregate(self, _validate_permissions):
+        status, parts = call_chunked("POST", "/calc/aggregate/sum", [b"0.1\n" * 5, b"0.1\n" * 5])
+        self.assertEqual((http.client.OK, b"1.0"), (status, parts[0]))
+        self.assertEqual(http.client.BAD_REQUEST, call_chunked("POST", "/calc/aggregate/mean", [b""])[0])
+        self.assertEqual(http.client.BAD_REQUEST, call_chunked("POST", "/calc/aggregate/sum", [b"1\nabc\n"])[0])
+        status, parts = call_chunked("POST", "/calc/aggregate/sum", [b"1\n2\n"], query=b"numeric=fraction")
+        self.assertEqual((http.client.OK, b"3"), (status, parts[0]))
+        with patch.object(asgi.EXECUTION, "timeout", 0.0):
+            self.assertEqual(http.client.SERVICE_UNAVAILABLE,
+                             call_chunked("POST", "/calc/aggregate/sum", [b"1\n2\n"])[0])
+        self.assertEqual(http.client.METHOD_NOT_ALLOWED, call("GET", "/calc/aggregate/sum")[0])
+        self.assertEqual(http.client.NOT_FOUND, call("POST", "/calc/aggregate/median")[0])
+
+    def test_eval(self, _validate_permissions):
+        body = json.dumps({"expr": "sqrt(a*b + c**2)", "vars": {"a": 4, "b": "4", "c": 3}}).encode("utf-8")
+        self.assertEqual((http.client.OK, "5.0"), call("POST", "/calc/eval", body=body))
+        body = json.dumps({"expr": "1/3"}).encode("utf-8")
+        self.assertEqual((http.client.OK, "1/3"), call("POST", "/calc/eval", query=b"numeric=fraction", body=body))
+        for body in (b"no es json", b'{"expr": 1}', b'{"expr": "a + 1"}'):
+            self.assertEqual(http.client.BAD_REQUEST, call("POST", "/calc/eval", body=body)[0])
+
+    def test_metrics(self, _validate_permissions):
+        call("GET", "/calc/add/2/2")
+        status, text = call("GET", "/metrics")
+        self.assertEqual(http.client.OK, status)
+        self.assertIn('calc_http_requests_total{endpoint="add",status="200"}', text)
+        self.assertIn('calc_operation_phase_seconds_count{operation="add",phase="compute"}', text)
+        self.assertIn("calc_result_cache_hits_total", text)
+        call("GET", "/no/existe")
+        self.assertIn('calc_http_requests_total{endpoint="unmatched",status="404"}', call("GET", "/metrics")[1])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
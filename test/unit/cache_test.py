@@ -0,0 +1,179 @@
+import decimal
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock, patch
+import pytest
+
+from app.cache import ResultCache
+from app.cache import SharedResultCache
+from app.cache import make_key
+from app.cache import serialize_key
+from app.calc import Calculator
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+@pytest.mark.unit
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResultCache(max_entries=2)
+
+    def test_get_or_compute_counts_hits_and_misses(self):
+        compute = Mock(return_value=8)
+        self.assertEqual(8, self.cache.get_or_compute(make_key("power", (2, 3)), compute))
+        self.assertEqual(8, self.cache.get_or_compute(make_key("power", (2, 3)), compute))
+        compute.assert_called_once()
+        stats = self.cache.stats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["misses"])
+
+    def test_keys_distinguish_operand_types(self):
+        self.assertNotEqual(make_key("sqrt", (4,)), make_key("sqrt", (4.0,)))
+        self.assertNotEqual(make_key("sqrt", (1,)), make_key("sqrt", (True,)))
+        self.assertNotEqual(make_key("sqrt", (4,)), make_key("log10", (4,)))
+
+    def test_decimal_keys_include_context_precision(self):
+        key = make_key("sqrt", (decimal.Decimal(2),))
+        with decimal.localcontext() as context:
+            context.prec = 50
+            self.assertNotEqual(key, make_key("sqrt", (decimal.Decimal(2),)))
+
+    def test_evicts_least_recently_used_entries(self):
+        self.cache.put(make_key("sqrt", (1,)), 1.0)
+        self.cache.put(make_key("sqrt", (4,)), 2.0)
+        self.cache.get(make_key("sqrt", (1,)))
+        self.cache.put(make_key("sqrt", (9,)), 3.0)
+        self.assertIsNone(self.cache.get(make_key("sqrt", (4,))))
+        self.assertEqual(1.0, self.cache.get(make_key("sqrt", (1,))))
+        self.assertEqual(1, self.cache.stats()["evictions"])
+
+    def test_size_accounts_for_large_integers(self):
+        cache = ResultCache(max_bytes=4096, max_item_bytes=2048)
+        cache.put(make_key("power", (2, 20000)), 2 ** 20000)
+        self.assertEqual(0, cache.stats()["entries"])
+        for exponent in range(8000, 8010):
+            cache.put(make_key("power", (2, exponent)), 2 ** exponent)
+        self.assertLessEqual(cache.stats()["bytes"], 4096)
+        self.assertGreater(cache.stats()["evictions"], 0)
+
+    def test_concurrent_access_keeps_counters_consistent(self):
+        cache = ResultCache(max_entries=16)
+
+        def worker():
+            for i in range(1000):
+                cache.get_or_compute(make_key("sqrt", (i % 32,)), lambda: i)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats()
+        self.assertEqual(4000, stats["hits"] + stats["misses"])
+        self.assertLessEqual(stats["entries"], 16)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_calculator_caches_results_after_validation(self, _validate_permissions):
+        calc = Calculator(result_cache=self.cache)
+        self.assertEqual(8, calc.power(2, 3))
+        self.assertEqual(8, calc.power(2, 3))
+        self.assertEqual(1, self.cache.stats()["hits"])
+        self.assertEqual(2, _validate_permissions.call_count)
+        self.assertRaises(ValueError, calc.square_root, -4)
+        self.assertRaises(TypeError, calc.power, "2", 3)
+
+
+
+@pytest.mark.unit
+class TestSharedResultCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "results.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_restarted_cache_is_warm(self):
+        cache = SharedResultCache(self.path)
+        cache.put(make_key("power", (7, 20000)), 7 ** 20000)
+        cache.put(make_key("log10", (2,)), 0.30102999566398120)
+        cache.put(make_key("power", (-3, 3)), -27)
+        restarted = SharedResultCache(self.path)
+        compute = Mock(side_effect=AssertionError("no debe recalcularse"))
+        self.assertEqual(7 ** 20000, restarted.get_or_compute(make_key("power", (7, 20000)), compute))
+        self.assertEqual(0.30102999566398120, restarted.get(make_key("log10", (2,))))
+        self.assertEqual(-27, restarted.get(make_key("power", (-3, 3))))
+        self.assertIn(make_key("power", (-3, 3)), restarted)
+        self.assertNotIn(make_key("power", (-3, 4)), restarted)
+        self.assertEqual(3, restarted.stats()["hits"])
+
+    def test_keys_are_normalized_by_type_and_value(self):
+        self.assertEqual(serialize_key(make_key("power", (2, 10))), serialize_key(make_key("power", (2, 10))))
+        self.assertNotEqual(serialize_key(make_key("power", (2, 10))), serialize_key(make_key("power", (2.0, 10))))
+        self.assertNotEqual(serialize_key(make_key("power", (2, 10))), serialize_key(make_key("power", (10, 2))))
+        self.assertEqual(32, len(serialize_key(make_key("sqrt", (10 ** 10000,)))))
+
+    def test_only_numbers_are_persisted(self):
+        cache = SharedResultCache(self.path)
+        cache.put(make_key("sqrt", (decimal.Decimal(2),)), decimal.Decimal(2).sqrt())
+        self.assertEqual(decimal.Decimal(2).sqrt(), cache.get(make_key("sqrt", (decimal.Decimal(2),))))
+        self.assertEqual(0, cache.stats()["entries"])
+
+    def test_evicts_oldest_entries_beyond_limits(self):
+        cache = SharedResultCache(self.path, max_entries=10, max_item_bytes=64)
+        cache.EVICTION_INTERVAL = 5
+        cache.put(make_key("power", (2, 1000)), 2 ** 1000)
+        for exponent in range(40):
+            cache.put(make_key("power", (3, exponent)), 3 ** exponent)
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"], 10)
+        self.assertEqual(30, stats["evictions"])
+        cache.memory.clear()
+        self.assertIsNone(cache.get(make_key("power", (3, 0))))
+        self.assertEqual(3 ** 39, cache.get(make_key("power", (3, 39))))
+        self.assertIsNone(cache.get(make_key("power", (2, 1000))))
+
+    def test_concurrent_writers_share_the_store(self):
+        caches = [SharedResultCache(self.path) for _ in range(2)]
+
+        def worker(cache, offset):
+            for i in range(100):
+                cache.put(make_key("power", (5, offset + i)), 5 ** (offset + i))
+
+        threads = [threading.Thread(target=worker, args=(cache, index * 100)) for index, cache in enumerate(caches)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(200, caches[0].stats()["entries"])
+        self.assertEqual(0, caches[0].stats()["errors"] + caches[1].stats()["errors"])
+        self.assertEqual(5 ** 150, caches[0].get(make_key("power", (5, 150))))
+
+    def test_connections_are_pooled_across_threads(self):
+        """Prueba que los hilos reutilizan las conexiones del proceso en lugar de abrir una cada uno"""
+        cache = SharedResultCache(self.path, max_connections=2)
+        with patch("app.cache.sqlite3.connect", wraps=sqlite3.connect) as connect:
+            for exponent in range(10):
+                thread = threading.Thread(target=cache.get, args=(make_key("power", (2, exponent)),))
+                thread.start()
+                thread.join()
+            self.assertEqual(0, connect.call_count)
+            with cache.connection(), cache.connection(), cache.connection():
+                pass
+            self.assertEqual(2, connect.call_count)
+        self.assertEqual(2, len(cache.idle))
+        # Tras un fork las conexiones del padre no se reutilizan
+        inherited = list(cache.idle)
+        with patch("app.cache.os.getpid", return_value=-1):
+            with cache.connection() as connection:
+                self.assertNotIn(connection, inherited)
+        self.assertEqual(0, cache.stats()["errors"])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -1,9 +1,15 @@
 import unittest
 import math
+from decimal import Decimal, localcontext
+from fractions import Fraction
 from unittest.mock import patch
 import pytest
 
 from app.calc import Calculator
+from app.calc import InvalidPermissions
+from app.calc import Operation
+from app.calc import estimate_power_bits
+from app.calc import exact_square_root
 
 
 def mocked_validation(*args, **kwargs):
@@ -148,6 +154,141 @@ class TestCalculate(unittest.TestCase):
         self.assertRaises(ValueError, self.calc.logarithm_base_10, -5)
         self.assertRaises(ValueError, self.calc.logarithm_base_10, -1)
 
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_permission_check_receives_lazy_operation(self, _validate_permissions):
+        self.calc.power(2, 3)
+        operation, user = _validate_permissions.call_args[0]
+        self.assertEqual("user1", user)
+        self.assertEqual("power", operation.name)
+        self.assertEqual("2 ** 3", str(operation))
+
+    def test_operation_renders_like_previous_messages(self):
+        self.assertEqual("2 + 3", str(Operation("add", "{} + {}", 2, 3)))
+        self.assertEqual("1.5 / -2", str(Operation("divide", "{} / {}", 1.5, -2)))
+        self.assertEqual("sqrt(16)", str(Operation("sqrt", "sqrt({})", 16)))
+
+    def test_operation_abbreviates_huge_integers(self):
+        operation = Operation("power", "{} ** {}", 2 ** 100000, 2)
+        self.assertEqual("<int of 100001 bits> ** 2", str(operation))
+
+    def test_estimate_power_bits(self):
+        self.assertEqual(1001, estimate_power_bits(2, 1000))
+        self.assertEqual(estimate_power_bits(10, 100), estimate_power_bits(-10, 100))
+        self.assertEqual(1, estimate_power_bits(1, 10 ** 400))
+        self.assertEqual(64, estimate_power_bits(2.5, 10 ** 6))
+        self.assertEqual(64, estimate_power_bits(2, -10 ** 6))
+        self.assertEqual(2 * 10 ** 400, estimate_power_bits(3, 10 ** 400))
+        self.assertEqual(1001, estimate_power_bits(Fraction(1, 2), Fraction(1000)))
+        self.assertEqual(1001, estimate_power_bits(Fraction(2), -1000))
+        self.assertEqual(64, estimate_power_bits(Fraction(2), Fraction(1, 2)))
+        self.assertEqual(64, estimate_power_bits(Decimal(2), Decimal(10 ** 6)))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_power_method_fails_above_cost_limit(self, _validate_permissions):
+        calc = Calculator(max_power_bits=1000)
+        self.assertEqual(2 ** 999, calc.power(2, 999))
+        self.assertRaises(ValueError, calc.power, 2, 1000)
+        self.assertRaises(ValueError, self.calc.power, 10, 100000000)
+        # El mensaje no escribe estimaciones de tamaño imprimible
+        self.assertRaisesRegex(ValueError, r"^Result of more than 2\*\*65537 bits", self.calc.power, 2, 2 ** 65536)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_power_mod_method_returns_correct_result(self, _validate_permissions):
+        self.assertEqual(pow(10, 100000000, 7), self.calc.power_mod(10, 100000000, 7))
+        self.assertEqual(1, self.calc.power_mod(3, 0, 5))
+        self.assertRaises(TypeError, self.calc.power_mod, 2.5, 2, 5)
+        self.assertRaises(ValueError, self.calc.power_mod, 2, 2, 0)
+        self.assertRaises(ValueError, self.calc.power_mod, 2, -2, 5)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_power_approx_method_returns_scientific_notation(self, _validate_permissions):
+        self.assertEqual(8, self.calc.power_approx(2, 3))
+        self.assertEqual("1e+100000000", str(self.calc.power_approx(10, 100000000)))
+        self.assertEqual("-1e+3000001", str(self.calc.power_approx(-10, 3000001)))
+        self.assertEqual("1e+3000000", str(self.calc.power_approx(-10, 3000000)))
+        self.assertTrue(str(self.calc.power_approx(2, 10000000)).startswith("9.04"))
+        # Potencias de float fuera del rango de float
+        self.assertEqual("1e+400", str(self.calc.power_approx(10, 400.0)))
+        self.assertEqual("-1e+401", str(self.calc.power_approx(-10.0, 401)))
+        self.assertTrue(str(self.calc.power_approx(2.5, 10 ** 6)).startswith("1.02"))
+        self.assertTrue(str(self.calc.power_approx(2.5, 10 ** 6)).endswith("e+397940"))
+        self.assertRaises(OverflowError, self.calc.power_approx, 1e10, 1e308)
+
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_decimal_operations_follow_context_precision(self, _validate_permissions):
+        self.assertEqual(Decimal("0.3"), self.calc.add(Decimal("0.1"), Decimal("0.2")))
+        with localcontext() as context:
+            context.prec = 50
+            self.assertEqual(Decimal("0." + "3" * 50), self.calc.divide(Decimal(1), Decimal(3)))
+            self.assertEqual(50, len(str(self.calc.square_root(Decimal(2)))) - 1)
+        self.assertEqual(Decimal(3), self.calc.logarithm_base_10(Decimal(1000)))
+        self.assertRaises(TypeError, self.calc.add, Decimal(1), 0.5)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_fraction_operations_are_exact(self, _validate_permissions):
+        self.assertEqual(Fraction(1, 3), self.calc.divide(Fraction(1), Fraction(3)))
+        self.assertEqual(Fraction(3, 10), self.calc.add(Fraction(1, 10), Fraction(2, 10)))
+        self.assertEqual(Fraction(1, 8), self.calc.power(Fraction(2), Fraction(-3)))
+        self.assertRaises(ValueError, self.calc.power, Fraction(2), Fraction(-10 ** 7))
+        self.assertAlmostEqual(1.5, self.calc.square_root(Fraction(9, 4)), delta=0.0000001)
+
+
+    def test_exact_square_root(self):
+        self.assertEqual(12, exact_square_root(144))
+        self.assertEqual(2 ** 52 + 1, exact_square_root((2 ** 52 + 1) ** 2))
+        self.assertEqual(10 ** 15 - 1, exact_square_root((10 ** 15 - 1) ** 2))
+        self.assertIsNone(exact_square_root((10 ** 15 - 1) ** 2 + 1))
+        self.assertIsNone(exact_square_root(2 ** 106))
+        self.assertIsNone(exact_square_root(16.0))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_logarithm_of_powers_of_ten_is_exact(self, _validate_permissions):
+        for exponent in (0, 1, 22, 23, 100, 308):
+            self.assertEqual(float(exponent), self.calc.logarithm_base_10(10 ** exponent))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_square_root_of_huge_integers(self, _validate_permissions):
+        # Antes math.sqrt lanzaba OverflowError por encima de 1.8e308.
+        self.assertEqual(10 ** 300, self.calc.square_root(10 ** 600))
+        self.assertEqual(7 ** 5000, self.calc.square_root(7 ** 10000))
+        self.assertEqual(1.414213562373095e+150, self.calc.square_root(2 * 10 ** 300))
+        self.assertEqual("1.4142135623731e+500", str(self.calc.square_root(2 * 10 ** 1000)))
+        self.assertEqual(2 ** 60 + 1, self.calc.square_root((2 ** 60 + 1) ** 2))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_logarithm_of_huge_integers(self, _validate_permissions):
+        self.assertEqual(5000.0, self.calc.logarithm_base_10(10 ** 5000))
+        self.assertEqual(30102.99956639812, self.calc.logarithm_base_10(2 ** 100000))
+        self.assertAlmostEqual(499.5228787452803, self.calc.logarithm_base_10(Fraction(10 ** 500, 3)), places=9)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_aggregate_methods_consume_an_iterator(self, _validate_permissions):
+        values = [4, 1.5, 2, -3]
+        self.assertEqual(4.5, self.calc.sum(iter(values)))
+        self.assertEqual(-36.0, self.calc.product(iter(values)))
+        self.assertAlmostEqual(-36.0, self.calc.product_approx(iter(values)), places=12)
+        self.assertEqual(-3, self.calc.minimum(iter(values)))
+        self.assertEqual(4, self.calc.maximum(iter(values)))
+        self.assertEqual(1.125, self.calc.mean(iter(values)))
+        self.assertEqual(6.546875, self.calc.variance(iter(values)))
+        self.assertAlmostEqual(8.7291666666666667, self.calc.sample_variance(iter(values)), places=12)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_aggregate_methods_check_types_and_limits(self, _validate_permissions):
+        self.assertRaises(TypeError, self.calc.sum, iter([1, "2"]))
+        self.assertRaises(TypeError, self.calc.mean, iter([None]))
+        self.assertRaises(TypeError, self.calc.sum, iter([1.5, Decimal("2")]))
+        self.assertRaises(TypeError, self.calc.mean, iter([1.5, Fraction(1, 2)]))
+        self.assertRaises(ValueError, Calculator(max_power_bits=64).product, iter([2 ** 40, 2 ** 40]))
+
+    @patch('app.util.validate_permissions', return_value=False, create=True)
+    def test_aggregate_methods_check_permissions_once(self, validate_permissions):
+        self.assertRaises(InvalidPermissions, self.calc.sum, iter(range(1000)))
+        operation = validate_permissions.call_args[0][0]
+        self.assertEqual(("sum", "sum(...)"), (operation.name, str(operation)))
+        self.assertEqual(1, validate_permissions.call_count)
+
 
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
@@ -0,0 +1,99 @@
+import json
+import struct
+import unittest
+import pytest
+
+from app import encoding
+
+
+def decode_record(data, offset):
+    """Decodificador de referencia del formato binario."""
+    tag = data[offset:offset + 1]
+    if tag == b"q":
+        return struct.unpack_from("<q", data, offset + 1)[0], offset + 9
+    if tag == b"d":
+        return struct.unpack_from("<d", data, offset + 1)[0], offset + 9
+    if tag == b"e":
+        status, length = struct.unpack_from("<HI", data, offset + 1)
+        start = offset + 7
+        return (status, data[start:start + length].decode("utf-8")), start + length
+    length = struct.unpack_from("<I", data, offset + 1)[0]
+    payload = data[offset + 5:offset + 5 + length]
+    if tag == b"i":
+        return int.from_bytes(payload, "little", signed=True), offset + 5 + length
+    return payload.decode("utf-8"), offset + 5 + length
+
+
+@pytest.mark.unit
+class TestEncoding(unittest.TestCase):
+    def test_text_and_json_encoders(self):
+        self.assertEqual(b"4", encoding.TEXT.encode(4))
+        self.assertEqual(b"2.5", encoding.TEXT.encode(2.5))
+        self.assertEqual({"result": 4}, json.loads(encoding.JSON.encode(4)))
+        self.assertEqual({"result": "1/3"}, json.loads(encoding.JSON.encode(__import__("fractions").Fraction(1, 3))))
+
+    def test_text_and_json_encode_integers_past_the_digit_limit(self):
+        self.assertEqual(("1" + "0" * 5000).encode("ascii"), encoding.TEXT.encode(10 ** 5000))
+        self.assertEqual('{{"result": -1{}}}'.format("0" * 5000).encode("ascii"), encoding.JSON.encode(-(10 ** 5000)))
+
+    def test_binary_round_trip(self):
+        for value in (0, -1, 2 ** 63 - 1, -2 ** 63, 2 ** 63, -2 ** 63 - 1, 7 ** 20000, -(10 ** 5000), 2.5, -0.0, "1e+9"):
+            data = encoding.BINARY.encode(value)
+            decoded, end = decode_record(data, 0)
+            self.assertEqual(value, decoded)
+            self.assertEqual(len(data), end)
+        self.assertEqual(9, len(encoding.BINARY.encode(12345)))
+
+    def test_json_writes_non_finite_floats_as_strings(self):
+        inf, nan = float("inf"), float("nan")
+        self.assertEqual({"result": "inf"}, json.loads(encoding.JSON.encode(inf)))
+        self.assertEqual({"result": "-inf"}, json.loads(encoding.JSON.encode(-inf)))
+        self.assertEqual({"result": "nan"}, json.loads(encoding.JSON.encode(nan)))
+        data = encoding.JSON.encode_items([{"result": inf}, {"result": 2.5}, {"result": nan}])
+        # Sin literales Infinity/NaN, que no son JSON válido.
+        self.assertEqual([{"result": "inf"}, {"result": 2.5}, {"result": "nan"}],
+                         json.loads(data, parse_constant=self.fail))
+        self.assertEqual(inf, decode_record(encoding.BINARY.encode(inf), 0)[0])
+
+    def test_json_batch_encodes_each_item(self):
+        items = [{"result": 3}, {"result": 10 ** 5000}, {"error": "Division by zero is not possible", "status": 400}]
+        data = encoding.JSON.encode_items(items)
+        self.assertEqual('[{{"result": 3}}, {{"result": 1{}}}, {}]'.format(
+            "0" * 5000, json.dumps(items[2])).encode("utf-8"), data)
+        self.assertEqual(json.dumps([items[0], items[2]]).encode("utf-8"),
+                         encoding.JSON.encode_items([items[0], items[2]]))
+
+    def test_binary_batch_with_errors(self):
+        items = [{"result": 3}, {"error": "Division by zero is not possible", "status": 400}, {"result": 0.5}]
+        data = encoding.BINARY.encode_items(items)
+        self.assertEqual(3, struct.unpack_from("<I", data)[0])
+        values, offset = [], 4
+        while offset < len(data):
+            value, offset = decode_record(data, offset)
+            values.append(value)
+        self.assertEqual([3, (400, "Division by zero is not possible"), 0.5], values)
+
+    def test_binary_buffer_is_reused_and_bounded(self):
+        encoding.BINARY.encode(1)
+        buffer = encoding.BINARY.local.buffer
+        encoding.BINARY.encode(2)
+        self.assertIs(buffer, encoding.BINARY.local.buffer)
+        self.assertEqual(0, len(buffer))
+        encoding.BINARY.encode(1 << (8 * encoding.MAX_RETAINED_BUFFER + 8))
+        self.assertIsNone(encoding.BINARY.local.buffer)
+
+    def test_negotiate(self):
+        self.assertIs(encoding.TEXT, encoding.negotiate(None))
+        self.assertIs(encoding.TEXT, encoding.negotiate("*/*"))
+        self.assertIs(encoding.TEXT, encoding.negotiate("image/png"))
+        self.assertIs(encoding.JSON, encoding.negotiate("application/json"))
+        self.assertIs(encoding.JSON, encoding.negotiate("application/json, text/plain"))
+        self.assertIs(encoding.BINARY, encoding.negotiate("application/octet-stream;q=0.9, */*;q=0.1"))
+        self.assertIs(encoding.TEXT, encoding.negotiate("application/json;q=0.5, text/*"))
+        self.assertIs(encoding.JSON, encoding.negotiate("application/*"))
+        self.assertIs(encoding.JSON, encoding.negotiate("text/plain;q=0, */*"))
+        self.assertIs(encoding.JSON, encoding.negotiate("text/plain", encoding.BATCH_ENCODERS))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,98 @@
+import decimal
+import http.client
+import unittest
+from unittest.mock import patch
+import pytest
+
+from app import api
+from app import etag
+from app import numeric
+from app.operations import OPERATIONS
+from app.util import convert_to_number
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+def tag_for(name, operands, backend=numeric.FLOAT, precision=28, media_type="text/plain"):
+    numbers = [convert_to_number(operand, backend) for operand in operands]
+    return etag.entity_tag(OPERATIONS[name], numbers, backend, precision, media_type)
+
+
+@pytest.mark.unit
+class TestEntityTag(unittest.TestCase):
+    def test_equivalent_spellings_share_a_tag(self):
+        tag = tag_for("add", ["5", "2"])
+        self.assertEqual(tag, tag_for("add", ["0005", "2"]))
+        self.assertEqual(tag, tag_for("add", ["+5", "2"]))
+        self.assertEqual(tag, tag_for("add", [" 5", "2 "]))
+        self.assertEqual(tag_for("sqrt", ["2.5"]), tag_for("sqrt", ["2.50"]))
+
+    def test_tag_is_strong_and_quoted(self):
+        tag = tag_for("add", ["5", "2"])
+        self.assertTrue(tag.startswith('"') and tag.endswith('"'))
+        self.assertFalse(tag.startswith("W/"))
+
+    def test_tag_depends_on_everything_that_changes_the_body(self):
+        tag = tag_for("add", ["5", "2"])
+        self.assertNotEqual(tag, tag_for("add", ["5.0", "2"]))
+        self.assertNotEqual(tag, tag_for("add", ["2", "5"]))
+        self.assertNotEqual(tag, tag_for("multiply", ["5", "2"]))
+        self.assertNotEqual(tag, tag_for("add", ["5", "2"], media_type="application/json"))
+        self.assertNotEqual(tag, tag_for("add", ["5", "2"], backend=numeric.FRACTION))
+        self.assertNotEqual(tag_for("divide", ["1", "3"], backend=numeric.DECIMAL),
+                            tag_for("divide", ["1", "3"], backend=numeric.DECIMAL, precision=40))
+        # Con Decimal, 5.0 y 5 dan resultados con distinta escala.
+        self.assertNotEqual(tag_for("add", ["5", "2"], backend=numeric.DECIMAL),
+                            tag_for("add", ["5.0", "2"], backend=numeric.DECIMAL))
+        self.assertIsInstance(convert_to_number("5", numeric.DECIMAL), decimal.Decimal)
+
+    def test_precision_only_matters_for_decimal(self):
+        self.assertEqual(tag_for("divide", ["1", "3"]), tag_for("divide", ["1", "3"], precision=40))
+
+    def test_huge_operands_hash_without_decimal_conversion(self):
+        tag = etag.entity_tag(OPERATIONS["sqrt"], [10 ** 20000], numeric.FLOAT, 28, "text/plain")
+        self.assertEqual(34, len(tag))
+
+    def test_if_none_match(self):
+        tag = tag_for("add", ["5", "2"])
+        self.assertTrue(etag.matches(tag, tag))
+        self.assertTrue(etag.matches('"otro", ' + tag, tag))
+        self.assertTrue(etag.matches("W/" + tag, tag))
+        self.assertFalse(etag.matches("*", tag))
+        self.assertFalse(etag.matches('"otro"', tag))
+        self.assertFalse(etag.matches("", tag))
+        self.assertFalse(etag.matches(None, tag))
+
+    def test_wildcard(self):
+        self.assertTrue(etag.matches_any("*"))
+        self.assertTrue(etag.matches_any('"otro", *'))
+        self.assertFalse(etag.matches_any('"otro"'))
+        self.assertFalse(etag.matches_any(None))
+
+
+@pytest.mark.unit
+@patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        self.client = api.create_app(preload_subsystems=False).test_client()
+
+    def test_wildcard_only_after_a_valid_result(self, _validate_permissions):
+        for path in ("/calc/sqrt/-1", "/calc/divide/1/0", "/calc/power/10/100000000"):
+            response = self.client.get(path, headers={"If-None-Match": "*"})
+            self.assertEqual(http.client.BAD_REQUEST, response.status_code, path)
+        response = self.client.get("/calc/add/5/2", headers={"If-None-Match": "*"})
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
+
+    def test_not_modified_checks_permissions(self, _validate_permissions):
+        tag = self.client.get("/calc/add/5/2").headers["ETag"]
+        self.assertEqual(http.client.NOT_MODIFIED,
+                         self.client.get("/calc/add/5/2", headers={"If-None-Match": tag}).status_code)
+        with patch('app.util.validate_permissions', return_value=False, create=True):
+            response = self.client.get("/calc/add/5/2", headers={"If-None-Match": tag})
+        self.assertEqual(http.client.FORBIDDEN, response.status_code)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
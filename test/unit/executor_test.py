@@ -0,0 +1,255 @@
+import multiprocessing
+import signal
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import pytest
+
+from app import executor
+from app import operations
+from app.cache import ResultCache
+from app.calc import Calculator
+from app.calc import InvalidPermissions
+from app.executor import ComputationTimeout
+from app.executor import ExecutionLayer
+from app.executor import SingleFlight
+from app.executor import operation_cost
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+@pytest.mark.unit
+@patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+class TestExecutionLayer(unittest.TestCase):
+    def setUp(self):
+        self.power = operations.OPERATIONS["power"]
+        self.add = operations.OPERATIONS["add"]
+        self.layer = ExecutionLayer(Calculator(result_cache=ResultCache()), cost_threshold_bits=1000, timeout=10)
+
+    def tearDown(self):
+        self.layer.shutdown()
+
+    def test_operation_cost(self, _validate_permissions):
+        self.assertEqual(1001, operation_cost(self.power, [2, 1000]))
+        self.assertEqual(2000, operation_cost(operations.OPERATIONS["multiply"], [2 ** 999, 2 ** 999]))
+        self.assertEqual(64, operation_cost(self.add, [2 ** 5000, 1]))
+        self.assertEqual(20001, operation_cost(operations.OPERATIONS["sqrt"], [2 ** 20000]))
+        self.assertEqual(64, operation_cost(operations.OPERATIONS["sqrt"], [2.0]))
+
+    def test_cheap_operations_run_inline(self, _validate_permissions):
+        self.assertEqual(5, self.layer.evaluate(self.add, [2, 3]))
+        self.assertEqual(1024, self.layer.evaluate(self.power, [2, 10]))
+        self.assertIsNone(self.layer.pool)
+
+    def test_costly_operations_run_in_process_pool(self, _validate_permissions):
+        self.assertEqual(3 ** 5000, self.layer.evaluate(self.power, [3, 5000]))
+        self.assertIsNotNone(self.layer.pool)
+
+    def test_offloaded_results_are_cached(self, _validate_permissions):
+        self.layer.evaluate(self.power, [3, 5000])
+        with patch.object(self.layer, "offload") as offload:
+            self.assertEqual(3 ** 5000, self.layer.evaluate(self.power, [3, 5000]))
+            offload.assert_not_called()
+
+    def test_cache_hits_are_served_without_recomputing(self, validate_permissions):
+        self.layer.evaluate(self.power, [3, 5000])
+        calls = validate_permissions.call_count
+        with patch.object(self.layer, "offload") as offload, \
+                patch.object(self.layer.calculator, "power") as power:
+            self.assertEqual(3 ** 5000, self.layer.evaluate(self.power, [3, 5000]))
+            offload.assert_not_called()
+            power.assert_not_called()
+        # El acierto de caché también pasa por la comprobación de permisos.
+        self.assertEqual(calls + 1, validate_permissions.call_count)
+        self.assertEqual("power", validate_permissions.call_args[0][0].name)
+
+    def test_cache_hits_check_permissions(self, _validate_permissions):
+        self.layer.evaluate(self.power, [3, 5000])
+        with patch('app.util.validate_permissions', return_value=False, create=True):
+            self.assertRaises(InvalidPermissions, self.layer.evaluate, self.power, [3, 5000])
+
+    def test_uncached_operations_are_always_offloaded(self, _validate_permissions):
+        multiply = operations.OPERATIONS["multiply"]
+        cache = self.layer.calculator.result_cache
+        for _ in range(2):
+            self.assertEqual(2 ** 3000, self.layer.evaluate(multiply, [2 ** 1500, 2 ** 1500]))
+        self.assertEqual(0, cache.stats()["entries"])
+        self.assertEqual(0, cache.stats()["hits"])
+
+    def test_domain_errors_are_answered_without_offloading(self, _validate_permissions):
+        """Prueba que el validador del registro rechaza el dominio antes de enviar la operación a un proceso"""
+        sqrt = operations.OPERATIONS["sqrt"]
+        self.assertRaises(ValueError, self.layer.evaluate, sqrt, [-(2 ** 5000)])
+        self.assertIsNone(self.layer.pool)
+        with patch('app.util.validate_permissions', return_value=False, create=True):
+            self.assertRaises(InvalidPermissions, self.layer.evaluate, sqrt, [-(2 ** 5000)])
+        self.assertIsNone(self.layer.pool)
+
+    def test_budgeted_values(self, _validate_permissions):
+        self.assertEqual([1, 2, 3], list(self.layer.budgeted(iter([1, 2, 3]))))
+        layer = ExecutionLayer(Calculator(), timeout=0.0)
+        self.assertRaises(ComputationTimeout, list, layer.budgeted(iter([1, 2, 3])))
+
+    def test_errors_from_workers_propagate(self, _validate_permissions):
+        self.assertRaises(TypeError, self.layer.evaluate, operations.OPERATIONS["multiply"], [2 ** 2000, "2"])
+
+    def test_time_budget_raises_and_stops_only_that_task(self, _validate_permissions):
+        layer = ExecutionLayer(Calculator(max_power_bits=1 << 30), cost_threshold_bits=1000, timeout=1.0)
+        results = []
+        try:
+            # La tarea vecina sigue en curso cuando se detiene la que agota el tiempo, y sobrevive.
+            neighbour = threading.Timer(0.6, lambda: results.append(layer.evaluate(self.power, [3, 2000000])))
+            neighbour.start()
+            self.assertRaises(ComputationTimeout, layer.evaluate, self.power, [3, 10 ** 8])
+            neighbour.join()
+            self.assertEqual([3 ** 2000000], results)
+            self.assertEqual(3 ** 5000, layer.evaluate(self.power, [3, 5000]))
+        finally:
+            layer.shutdown()
+
+    def test_time_budget_stops_workers_of_servers_that_handle_sigterm(self, _validate_permissions):
+        """Prueba que el proceso se detiene aunque el servidor instale su propio manejador de SIGTERM, como uvicorn"""
+        previous = signal.signal(signal.SIGTERM, lambda signum, frame: None)
+        layer = ExecutionLayer(Calculator(max_power_bits=1 << 30), cost_threshold_bits=1000, timeout=0.3)
+        try:
+            self.assertRaises(ComputationTimeout, layer.evaluate, self.power, [3, 10 ** 8])
+            self.assertEqual(3 ** 5000, layer.evaluate(self.power, [3, 5000]))
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            layer.shutdown()
+
+    def test_workers_exit_with_their_parent(self, _validate_permissions):
+        """Prueba que un proceso de trabajo termina si su padre muere sin cerrar el pool"""
+        connection, child = multiprocessing.Pipe()
+        with patch.object(executor, "PARENT_CHECK_INTERVAL", 0.01), \
+                patch.object(executor.signal, "signal"), \
+                patch.object(executor.os, "getppid", side_effect=[100, 100, 1]):
+            executor.serve_tasks(child)
+        connection.close()
+        child.close()
+
+    def test_workers_are_reused(self, _validate_permissions):
+        self.layer.evaluate(self.power, [3, 5000])
+        worker = self.layer.pool.idle[0]
+        self.layer.evaluate(self.power, [3, 5001])
+        self.assertEqual([worker], self.layer.pool.idle)
+        self.assertTrue(worker.process.is_alive())
+
+    def test_identical_costly_requests_are_computed_once(self, _validate_permissions):
+        release = threading.Event()
+
+        def slow_power(x, y):
+            release.wait(5)
+            return x ** y
+
+        results = []
+        with patch.object(self.layer, "dispatch", side_effect=lambda operation, numbers, cost: slow_power(*numbers)) \
+                as dispatch:
+            threads = [threading.Thread(target=lambda: results.append(self.layer.evaluate(self.power, [3, 5000])))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            while self.layer.flights.stats()["followers"] < 7:
+                time.sleep(0.001)
+            release.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual([3 ** 5000] * 8, results)
+        self.assertEqual(1, dispatch.call_count)
+        self.assertEqual(0, self.layer.flights.stats()["in_flight"])
+
+    def test_followers_check_their_own_permissions(self, _validate_permissions):
+        release = threading.Event()
+        results = []
+
+        def slow_power(operation, numbers, cost):
+            release.wait(5)
+            return 3 ** 5000
+
+        with patch.object(self.layer, "dispatch", side_effect=slow_power):
+            leader = threading.Thread(target=lambda: results.append(self.layer.evaluate(self.power, [3, 5000])))
+            leader.start()
+            while self.layer.flights.stats()["in_flight"] < 1:
+                time.sleep(0.001)
+            # Un seguidor sin permisos no recibe el resultado del líder.
+            with patch('app.util.validate_permissions', return_value=False, create=True):
+                self.assertRaises(InvalidPermissions, self.layer.evaluate, self.power, [3, 5000])
+            release.set()
+            leader.join()
+        self.assertEqual([3 ** 5000], results)
+
+    def test_cheap_operations_are_not_coalesced(self, _validate_permissions):
+        self.layer.evaluate(self.add, [2, 3])
+        self.assertEqual(0, self.layer.flights.stats()["leaders"])
+
+
+@pytest.mark.unit
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def lead_in_background(self, compute):
+        def blocked():
+            self.started.set()
+            self.release.wait(5)
+            return compute()
+
+        outcome = {}
+
+        def leader():
+            try:
+                outcome["result"] = self.flights.do("clave", blocked)
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=leader)
+        thread.start()
+        self.started.wait(5)
+        return thread, outcome
+
+    def test_followers_receive_the_leader_result(self):
+        thread, outcome = self.lead_in_background(lambda: 42)
+        threading.Timer(0.05, self.release.set).start()
+        self.assertEqual(42, self.flights.do("clave", lambda: self.fail("no debe recalcularse")))
+        thread.join()
+        self.assertEqual(42, outcome["result"])
+        self.assertEqual({"leaders": 1, "followers": 1, "timeouts": 0, "in_flight": 0}, self.flights.stats())
+
+    def test_followers_call_follow_before_waiting(self):
+        thread, outcome = self.lead_in_background(lambda: 42)
+
+        def denied():
+            raise PermissionError("sin permisos")
+
+        self.assertRaises(PermissionError, self.flights.do, "clave", lambda: 0, 5, denied)
+        self.release.set()
+        thread.join()
+        self.assertEqual(42, outcome["result"])
+
+    def test_errors_propagate_to_followers(self):
+        thread, outcome = self.lead_in_background(lambda: 1 / 0)
+        threading.Timer(0.05, self.release.set).start()
+        self.assertRaises(ZeroDivisionError, self.flights.do, "clave", lambda: 0)
+        thread.join()
+        self.assertIsInstance(outcome["error"], ZeroDivisionError)
+
+    def test_followers_time_out(self):
+        thread, _ = self.lead_in_background(lambda: 42)
+        self.assertRaises(ComputationTimeout, self.flights.do, "clave", lambda: 0, 0.01)
+        self.release.set()
+        thread.join()
+        self.assertEqual(1, self.flights.stats()["timeouts"])
+
+    def test_finished_flights_are_not_reused(self):
+        self.assertEqual(1, self.flights.do("clave", lambda: 1))
+        self.assertEqual(2, self.flights.do("clave", lambda: 2))
+        self.assertEqual(2, self.flights.stats()["leaders"])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
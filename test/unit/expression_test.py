@@ -0,0 +1,78 @@
+import functools
+import math
+import unittest
+from unittest.mock import patch
+import pytest
+
+from app import operations
+from app import util
+from app.calc import Calculator
+from app.expression import ExpressionError
+from app.expression import compile_expression
+from app.expression import evaluate_body
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+@pytest.mark.unit
+@patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+class TestExpression(unittest.TestCase):
+    def setUp(self):
+        self.evaluator = functools.partial(operations.evaluate, Calculator())
+
+    def evaluate(self, text, **bindings):
+        return compile_expression(text).evaluate(self.evaluator, bindings)
+
+    def test_precedence_and_associativity(self, _validate_permissions):
+        self.assertEqual(7, self.evaluate("1 + 2 * 3"))
+        self.assertEqual(9, self.evaluate("(1 + 2) * 3"))
+        self.assertEqual(2, self.evaluate("8 - 4 - 2"))
+        self.assertEqual(2 ** 9, self.evaluate("2 ** 3 ** 2"))
+        self.assertEqual(-4, self.evaluate("-2 ** 2"))
+        self.assertEqual(0.25, self.evaluate("2 ** -2"))
+        self.assertEqual(2.5, self.evaluate("5 / 2"))
+        self.assertEqual(1.5, self.evaluate("+1.5"))
+
+    def test_functions_and_variables(self, _validate_permissions):
+        self.assertEqual(5.0, self.evaluate("sqrt(a*b + c**2)", a=4, b=4, c=3))
+        self.assertEqual(3.0, self.evaluate("log10(x)", x=1000))
+        self.assertEqual(math.sqrt(2), self.evaluate("sqrt(.5 + 1.5)"))
+
+    def test_compiled_expressions_are_reused(self, _validate_permissions):
+        compiled = compile_expression("a * b + 1")
+        self.assertIs(compiled, compile_expression("a * b + 1"))
+        self.assertEqual(frozenset(["a", "b"]), compiled.variables)
+        self.assertEqual(7, compiled.evaluate(self.evaluator, {"a": 2, "b": 3}))
+        self.assertEqual(13, compiled.evaluate(self.evaluator, {"a": 3, "b": 4}))
+
+    def test_invalid_expressions(self, _validate_permissions):
+        for text in ["", "1 +", "(1 + 2", "1 2", "3.h", "1.2.3", "__import__('os')", "foo(2)",
+                     "1 ; 2", "-" * 100 + "1", "(" * 60 + "1" + ")" * 60, "1" * 1001]:
+            self.assertRaises(ExpressionError, compile_expression, text)
+        self.assertRaises(ExpressionError, self.evaluate, "a + b", a=1)
+
+    def test_long_flat_chains_do_not_recurse(self, _validate_permissions):
+        # 499 sumandos en 997 caracteres: antes cada operador anidaba una llamada y desbordaba la pila.
+        self.assertEqual(499, self.evaluate("+".join(["1"] * 499)))
+        self.assertEqual(2 ** 300, self.evaluate("*".join(["2"] * 300)))
+        self.assertEqual(-497, self.evaluate("1" + "-1" * 498))
+        self.assertEqual(1, self.evaluate("(" + "*".join(["1"] * 200) + ")" + "+0" * 200))
+
+    def test_domain_errors_come_from_calculator(self, _validate_permissions):
+        self.assertRaises(TypeError, self.evaluate, "1 / (2 - 2)")
+        self.assertRaises(ValueError, self.evaluate, "sqrt(0 - 4)")
+
+    def test_evaluate_body(self, _validate_permissions):
+        self.assertEqual(5.0, evaluate_body('{"expr": "sqrt(a*b + c**2)", "vars": {"a": 4, "b": "4", "c": 3}}',
+                                            None, self.evaluator))
+        for text in ("no es json", '{"expr": 1}', '{"expr": "a", "vars": []}', '[]'):
+            self.assertRaises(ValueError, evaluate_body, text, None, self.evaluator)
+        self.assertRaises(ExpressionError, evaluate_body, '{"expr": "a + 1"}', None, self.evaluator)
+        huge = '{"expr": "a", "vars": {"a": %s}}' % ("9" * (util.MAX_DECIMAL_DIGITS + 1))
+        self.assertRaises(util.OperandTooLarge, evaluate_body, huge, None, self.evaluator)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
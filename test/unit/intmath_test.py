@@ -0,0 +1,77 @@
+import random
+import unittest
+from decimal import Decimal, localcontext
+import pytest
+
+from app import intmath
+from app.calc import Approximation
+
+
+def reference_sqrt(n):
+    with localcontext() as context:
+        context.prec = 120
+        return Decimal(n).sqrt()
+
+
+def reference_log10(n):
+    with localcontext() as context:
+        context.prec = 60
+        return float(Decimal(n).log10())
+
+
+@pytest.mark.unit
+class TestIntegerSquareRoot(unittest.TestCase):
+    def test_newton_isqrt_matches_floor_of_root(self):
+        rng = random.Random(23)
+        numbers = list(range(300)) + [rng.getrandbits(rng.randint(1, 4000)) for _ in range(500)]
+        for n in numbers:
+            root = intmath.newton_isqrt(n)
+            self.assertTrue(root * root <= n < (root + 1) * (root + 1), n)
+        self.assertRaises(ValueError, intmath.newton_isqrt, -1)
+
+    def test_perfect_squares_are_exact_at_any_size(self):
+        for root in (3, 2 ** 52 + 1, 2 ** 53 + 1, 10 ** 200 + 7, 7 ** 20000):
+            result = intmath.square_root(root * root)
+            self.assertEqual(root, result)
+            self.assertIsInstance(result, float if root < 2 ** 53 else int)
+
+    def test_non_squares_are_correctly_rounded(self):
+        rng = random.Random(5)
+        numbers = [2, 3, 14619, 10 ** 30 + 7] + [rng.getrandbits(rng.randint(1, 2040)) for _ in range(1000)]
+        for n in numbers:
+            self.assertEqual(float(reference_sqrt(n)), intmath.square_root(n), n)
+
+    def test_roots_past_the_float_range_are_approximations(self):
+        result = intmath.square_root(3 * 10 ** 5001)
+        self.assertIsInstance(result, Approximation)
+        self.assertEqual(2500, result.exponent)
+        self.assertAlmostEqual(float(reference_sqrt(30)), result.mantissa, places=13)
+
+    def test_could_be_square_never_rejects_a_square(self):
+        rng = random.Random(7)
+        for _ in range(1000):
+            root = rng.getrandbits(rng.randint(1, 300))
+            self.assertTrue(intmath.could_be_square(root * root))
+        rejected = sum(not intmath.could_be_square(rng.getrandbits(200) | 1) for _ in range(1000))
+        self.assertGreater(rejected, 990)
+
+
+@pytest.mark.unit
+class TestIntegerLogarithm(unittest.TestCase):
+    def test_matches_a_high_precision_reference(self):
+        rng = random.Random(11)
+        for n in [rng.getrandbits(rng.randint(1, 6000)) | 1 for _ in range(300)]:
+            expected = reference_log10(n)
+            self.assertLessEqual(abs(intmath.log10(n) - expected), abs(expected) * 2 ** -52, n.bit_length())
+
+    def test_powers_of_ten_are_exact(self):
+        for exponent in (0, 5, 400, 5000):
+            self.assertEqual(float(exponent), intmath.log10(10 ** exponent))
+        self.assertGreater(intmath.log10(10 ** 400 + 10 ** 390), 400.0)
+
+    def test_huge_operands(self):
+        self.assertEqual(reference_log10(3) * 300000, intmath.log10(3 ** 300000))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
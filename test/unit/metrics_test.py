@@ -0,0 +1,66 @@
+import threading
+import unittest
+import pytest
+
+from app.metrics import Metrics
+
+
+@pytest.mark.unit
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics(buckets=(0.001, 0.01))
+
+    def test_counters_are_summed_across_threads(self):
+        def worker():
+            for _ in range(1000):
+                self.metrics.inc("calc_http_requests_total", (("endpoint", "add"),))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.metrics.inc("calc_http_requests_total", (("endpoint", "add"),))
+        counters, _ = self.metrics.collect()
+        self.assertEqual(4001, counters[("calc_http_requests_total", (("endpoint", "add"),))])
+
+    def test_finished_thread_shards_are_retired(self):
+        for _ in range(100):
+            thread = threading.Thread(target=self.metrics.inc, args=("requests", ()))
+            thread.start()
+            thread.join()
+        self.assertLessEqual(len(self.metrics.shards), 65)
+        counters, _ = self.metrics.collect()
+        self.assertEqual(100, counters[("requests", ())])
+
+    def test_histogram_renders_cumulative_buckets(self):
+        labels = (("operation", "add"), ("phase", "compute"))
+        for seconds in (0.0005, 0.005, 0.5):
+            self.metrics.observe("calc_operation_phase_seconds", labels, seconds)
+        text = self.metrics.render()
+        self.assertIn('# TYPE calc_operation_phase_seconds histogram', text)
+        self.assertIn('calc_operation_phase_seconds_bucket{operation="add",phase="compute",le="0.001"} 1', text)
+        self.assertIn('calc_operation_phase_seconds_bucket{operation="add",phase="compute",le="0.01"} 2', text)
+        self.assertIn('calc_operation_phase_seconds_bucket{operation="add",phase="compute",le="+Inf"} 3', text)
+        self.assertIn('calc_operation_phase_seconds_count{operation="add",phase="compute"} 3', text)
+
+    def test_phase_timer_separates_permission_time(self):
+        timer = self.metrics.timer("power")
+        self.metrics.add_permission_time(0.5)
+        timer.mark("parse")
+        timer.mark_compute()
+        timer.error(ValueError())
+        counters, histograms = self.metrics.collect()
+        permission = histograms[("calc_operation_phase_seconds", (("operation", "power"), ("phase", "permission")))]
+        self.assertEqual(0.5, permission[-1])
+        self.assertIn(("calc_operation_phase_seconds", (("operation", "power"), ("phase", "parse"))), histograms)
+        self.assertEqual(1, counters[("calc_operation_errors_total",
+                                      (("operation", "power"), ("exception", "ValueError")))])
+
+    def test_labels_are_escaped(self):
+        self.metrics.inc("errors", (("exception", 'a"b\\c'),))
+        self.assertIn('errors{exception="a\\"b\\\\c"} 1', self.metrics.render())
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
@@ -0,0 +1,56 @@
+import decimal
+import unittest
+from unittest.mock import patch
+import pytest
+
+from app import numeric
+from app import operations
+from app.calc import Calculator
+from app.expression import compile_expression
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+@pytest.mark.unit
+class TestNumeric(unittest.TestCase):
+    def test_select_defaults_and_overrides(self):
+        self.assertEqual((numeric.DEFAULT_BACKEND, numeric.DEFAULT_PRECISION), numeric.select({}))
+        self.assertEqual(("decimal", 60), numeric.select({"numeric": "decimal", "precision": "60"}))
+        self.assertEqual("fraction", numeric.select({"numeric": "fraction"})[0])
+
+    def test_select_rejects_invalid_options(self):
+        self.assertRaises(ValueError, numeric.select, {"numeric": "complex"})
+        self.assertRaises(ValueError, numeric.select, {"precision": "abc"})
+        self.assertRaises(ValueError, numeric.select, {"precision": "0"})
+        self.assertRaises(ValueError, numeric.select, {"precision": str(numeric.MAX_PRECISION + 1)})
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_evaluator_applies_decimal_precision(self, _validate_permissions):
+        evaluate = numeric.evaluator(lambda operation, numbers: Calculator().divide(*numbers), "decimal", 10)
+        self.assertEqual(decimal.Decimal("0.3333333333"), evaluate(None, [decimal.Decimal(1), decimal.Decimal(3)]))
+        self.assertEqual(decimal.DefaultContext.prec, decimal.getcontext().prec)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_evaluator_reports_decimal_signals_as_value_errors(self, _validate_permissions):
+        evaluate = numeric.evaluator(lambda operation, numbers: Calculator().power(*numbers), "decimal", 28)
+        self.assertRaises(ValueError, evaluate, None, [decimal.Decimal("1e999999999"), decimal.Decimal(2)])
+
+    def test_evaluator_is_unchanged_for_other_backends(self):
+        evaluate = operations.evaluate
+        self.assertIs(evaluate, numeric.evaluator(evaluate, "float", 28))
+        self.assertIs(evaluate, numeric.evaluator(evaluate, "fraction", 28))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_batch_items_and_expressions_use_backend(self, _validate_permissions):
+        evaluator = numeric.evaluator(lambda operation, numbers: operations.evaluate(Calculator(), operation, numbers),
+                                      "fraction", 28)
+        item = {"op": "add", "args": [0.1, "0.2"]}
+        self.assertEqual({"result": "3/10"}, operations.evaluate_item(evaluator, item, "fraction"))
+        compiled = compile_expression("1 / 3 + x", "fraction")
+        self.assertEqual("1/2", str(compiled.evaluate(evaluator, {"x": operations.item_operand(1, "fraction") / 6})))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
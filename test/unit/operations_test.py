@@ -0,0 +1,141 @@
+import functools
+import http.client
+import io
+import json
+import unittest
+from unittest.mock import patch
+import pytest
+
+from app import operations
+from app import util
+from app.calc import Calculator
+from app.calc import InvalidPermissions
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+@pytest.mark.unit
+class TestOperations(unittest.TestCase):
+    def setUp(self):
+        self.calc = Calculator()
+
+    def test_registry_routes_every_calculator_operation(self):
+        routed = sorted(name for name, spec in operations.OPERATIONS.items() if spec.routed)
+        self.assertEqual(["add", "divide", "log10", "multiply", "power", "sqrt", "substract"], routed)
+        for spec in operations.OPERATIONS.values():
+            self.assertTrue(callable(getattr(self.calc, spec.method)))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_parse_and_evaluate(self, _validate_permissions):
+        add = operations.OPERATIONS["add"]
+        self.assertEqual(5, operations.parse_and_evaluate(self.calc, add, ["2", "3"]))
+        self.assertEqual(4.0, operations.parse_and_evaluate(self.calc, operations.OPERATIONS["sqrt"], ["16"]))
+        self.assertRaises(TypeError, operations.parse_and_evaluate, self.calc, add, ["abc", "3"])
+
+    def test_select_variant(self):
+        power = operations.OPERATIONS["power"]
+        self.assertEqual((power, ["2", "3"]), operations.select_variant(power, ["2", "3"], {}))
+        variant, operands = operations.select_variant(power, ["2", "3"], {"mod": "5"})
+        self.assertEqual(("power_mod", ["2", "3", "5"]), (variant.name, operands))
+        variant, operands = operations.select_variant(power, ["2", "3"], {"approx": "true"})
+        self.assertEqual(("power_approx", ["2", "3"]), (variant.name, operands))
+        variant, _ = operations.select_variant(power, ["2", "3"], {"approx": "0"})
+        self.assertEqual("power", variant.name)
+
+    def test_domain_validators(self):
+        """Prueba los validadores de dominio del registro"""
+        registry = operations.OPERATIONS
+        self.assertRaises(TypeError, registry["divide"].validate, 1, 0)
+        self.assertRaises(ValueError, registry["sqrt"].validate, -1)
+        self.assertRaises(ValueError, registry["log10"].validate, 0)
+        self.assertRaises(ValueError, registry["power_mod"].validate, 2, 3, 0)
+        self.assertIsNone(registry["sqrt"].validate(4))
+        self.assertIsNone(registry["add"].validate)
+
+    def test_error_status(self):
+        self.assertEqual(http.client.BAD_REQUEST, operations.error_status(TypeError()))
+        self.assertEqual(http.client.BAD_REQUEST, operations.error_status(ValueError()))
+        self.assertEqual(http.client.BAD_REQUEST, operations.error_status(OverflowError()))
+        self.assertEqual(http.client.BAD_REQUEST, operations.error_status(ZeroDivisionError()))
+        self.assertEqual(http.client.REQUEST_ENTITY_TOO_LARGE, operations.error_status(util.OperandTooLarge("")))
+        self.assertEqual(http.client.FORBIDDEN, operations.error_status(InvalidPermissions()))
+        self.assertRaises(KeyError, operations.error_status, KeyError())
+
+    def test_aggregate_registry(self):
+        routed = sorted(name for name, spec in operations.AGGREGATES.items() if spec.routed)
+        self.assertEqual(["max", "mean", "min", "product", "sum", "variance"], routed)
+        for spec in operations.AGGREGATES.values():
+            self.assertTrue(callable(getattr(self.calc, spec.method)))
+        product = operations.AGGREGATES["product"]
+        variant, _ = operations.select_variant(product, (), {"approx": "1"}, operations.AGGREGATES)
+        self.assertEqual("product_approx", variant.name)
+        variant, _ = operations.select_variant(operations.AGGREGATES["variance"], (), {"sample": "true"},
+                                               operations.AGGREGATES)
+        self.assertEqual("sample_variance", variant.name)
+
+    def test_read_operands_parses_one_operand_per_line(self):
+        stream = io.BytesIO(b"1\n 2.5 \r\n\n0x10\n")
+        self.assertEqual([1, 2.5, 16], list(operations.read_operands(stream.readline)))
+        stream = io.BytesIO(b"1\n2\n")
+        self.assertEqual(["1", "2"], [str(n) for n in operations.read_operands(stream.readline, "fraction")])
+        stream = io.BytesIO(b"1\nabc\n")
+        self.assertRaises(TypeError, list, operations.read_operands(stream.readline))
+
+    def test_read_operands_rejects_overlong_lines(self):
+        stream = io.BytesIO(b"1\n" + b"1" * (util.MAX_OPERAND_LENGTH + 10) + b"\n2\n")
+        operands = operations.read_operands(stream.readline)
+        self.assertEqual(1, next(operands))
+        self.assertRaises(util.OperandTooLarge, next, operands)
+
+    def test_read_lines_skips_blank_and_flags_overlong_lines(self):
+        long_line = b"x" * (operations.MAX_LINE_BYTES * 2) + b"\n"
+        stream = io.BytesIO(b"a\n\n  \n" + long_line + b"b")
+        self.assertEqual([b"a\n", None, b"b"], list(operations.read_lines(stream.readline)))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_evaluate_stream_yields_one_result_per_line(self, _validate_permissions):
+        lines = [b'{"op": "add", "args": [1, 2]}\n', b"not json\n", None, b'{"op": "sqrt", "args": [-1]}']
+        evaluator = functools.partial(operations.evaluate, self.calc)
+        results = [json.loads(line) for line in operations.evaluate_stream(evaluator, iter(lines))]
+        self.assertEqual({"result": 3}, results[0])
+        self.assertEqual([http.client.BAD_REQUEST] * 3, [result["status"] for result in results[1:]])
+
+    def test_parse_batch_holds_number_literals_to_the_size_policy(self):
+        """Prueba que los literales numéricos del JSON pasan por la política de tamaño"""
+        items = operations.parse_batch('[{"op": "add", "args": [1, 2.5]}, {"op": "sqrt", "args": [1e2]}]', "")
+        self.assertEqual([1, 2.5], items[0]["args"])
+        self.assertEqual([100.0], items[1]["args"])
+        self.assertEqual(10 ** 5000, operations.parse_batch('{"args": [1%s]}\n' % ("0" * 5000), operations.NDJSON)[0]["args"][0])
+        huge = '[{"op": "add", "args": [%s, 1]}]' % ("9" * (util.MAX_DECIMAL_DIGITS + 1))
+        self.assertRaises(util.OperandTooLarge, operations.parse_batch, huge, "")
+        self.assertRaises(util.OperandTooLarge, operations.parse_batch, huge.replace(", 1]", ".5, 1]"), "")
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_stream_writes_results_past_the_digit_limit(self, _validate_permissions):
+        lines = [b'{"op": "power", "args": [10, 5000]}\n', b'{"op": "add", "args": [1, 2]}\n']
+        evaluator = functools.partial(operations.evaluate, self.calc)
+        results = list(operations.evaluate_stream(evaluator, iter(lines)))
+        self.assertEqual('{"result": 1' + "0" * 5000 + '}\n', results[0])
+        self.assertEqual({"result": 3}, json.loads(results[1]))
+
+    def test_item_json_maps_encoding_errors_to_the_item(self):
+        self.assertEqual('{"result": 3}', operations.item_json({"result": 3}))
+        self.assertEqual('{"result": "1/3"}', operations.item_json({"result": "1/3"}))
+        self.assertEqual('{"result": "-inf"}', operations.item_json({"result": float("-inf")}))
+        with patch.object(util, "integer_text", side_effect=ValueError("Exceeds the limit")):
+            self.assertEqual({"error": "Exceeds the limit", "status": http.client.BAD_REQUEST},
+                             json.loads(operations.item_json({"result": 10 ** 5000})))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_command_line(self, _validate_permissions):
+        with patch("builtins.print") as output:
+            self.assertEqual(0, operations.main(["app.operations", "power", "2", "10"]))
+            output.assert_called_with(1024)
+            self.assertEqual(1, operations.main(["app.operations", "sqrt", "-1"]))
+            self.assertEqual(2, operations.main(["app.operations", "sqrt", "1", "2"]))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
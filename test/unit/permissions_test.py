@@ -0,0 +1,86 @@
+import logging
+import unittest
+from unittest.mock import Mock
+import pytest
+
+from app.calc import Operation
+from app.permissions import AuditLog
+from app.permissions import CachedPermissionStore
+from app.permissions import PermissionChecker
+from app.permissions import StaticPermissionBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.unit
+class TestPermissions(unittest.TestCase):
+    def setUp(self):
+        self.backend = Mock(wraps=StaticPermissionBackend(["user1"]))
+        self.clock = FakeClock()
+        self.store = CachedPermissionStore(self.backend, ttl=10, max_entries=2, clock=self.clock)
+
+    def test_static_backend_allows_only_configured_users(self):
+        backend = StaticPermissionBackend(["user1", "admin"])
+        self.assertTrue(backend.is_allowed("user1", "add"))
+        self.assertTrue(backend.is_allowed("admin", "add"))
+        self.assertFalse(backend.is_allowed("user2", "add"))
+        self.assertFalse(backend.is_allowed(None, "add"))
+
+    def test_store_caches_decisions_until_ttl_expires(self):
+        self.assertTrue(self.store.is_allowed("user1", "add"))
+        self.assertTrue(self.store.is_allowed("user1", "add"))
+        self.assertEqual(1, self.backend.is_allowed.call_count)
+        self.clock.now = 11
+        self.assertTrue(self.store.is_allowed("user1", "add"))
+        self.assertEqual(2, self.backend.is_allowed.call_count)
+
+    def test_store_keys_descriptors_by_operation_name(self):
+        self.assertTrue(self.store.is_allowed("user1", Operation("add", "{} + {}", 1, 2)))
+        self.assertTrue(self.store.is_allowed("user1", Operation("add", "{} + {}", 3, 4)))
+        self.assertEqual(1, self.backend.is_allowed.call_count)
+        self.assertEqual([("user1", "add")], list(self.store.entries))
+
+    def test_store_evicts_oldest_entries(self):
+        self.store.is_allowed("user1", "add")
+        self.store.is_allowed("user2", "add")
+        self.store.is_allowed("user3", "add")
+        self.assertEqual([("user2", "add"), ("user3", "add")], list(self.store.entries))
+
+    def test_audit_log_skips_formatting_when_disabled(self):
+        logger = Mock()
+        logger.isEnabledFor.return_value = False
+        AuditLog(logger).record("user1", "2 + 3", True)
+        logger.info.assert_not_called()
+
+    def test_audit_log_samples_granted_checks(self):
+        logger = Mock()
+        logger.isEnabledFor.return_value = True
+        audit = AuditLog(logger, sample_rate=0.0)
+        audit.record("user1", "2 + 3", True)
+        logger.info.assert_not_called()
+        audit.record("user2", "2 + 3", False)
+        logger.warning.assert_called_once()
+
+    def test_checker_records_every_decision(self):
+        audit = Mock()
+        checker = PermissionChecker(self.store, audit)
+        self.assertTrue(checker.check("2 + 3", "user1"))
+        self.assertFalse(checker.check("2 + 3", "user2"))
+        audit.record.assert_any_call("user1", "2 + 3", True)
+        audit.record.assert_any_call("user2", "2 + 3", False)
+
+    def test_audit_log_writes_structured_records(self):
+        with self.assertLogs("app.audit", level=logging.INFO) as logs:
+            AuditLog().record("user1", "2 + 3", True)
+        self.assertEqual("user1", logs.records[0].user)
+        self.assertEqual("2 + 3", logs.records[0].operation)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
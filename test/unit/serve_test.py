@@ -0,0 +1,63 @@
+import http.client
+import sys
+import unittest
+from unittest.mock import patch
+import pytest
+
+from app import api
+from app import serve
+from app.calc import Calculator
+from app.executor import ExecutionLayer
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+@pytest.mark.unit
+@patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+class TestAppFactory(unittest.TestCase):
+    def test_create_app_registers_every_route(self, _validate_permissions):
+        client = api.create_app(preload_subsystems=False).test_client()
+        self.assertEqual(http.client.OK, client.get("/").status_code)
+        self.assertEqual(b"4", client.get("/calc/add/2/2").data)
+        self.assertEqual(b"3.0", client.get("/calc/sqrt/9").data)
+        response = client.post("/calc/eval", json={"expr": "a * 2", "vars": {"a": 21}})
+        self.assertEqual(b"42", response.data)
+
+    def test_aggregates_respect_the_time_budget(self, _validate_permissions):
+        application = api.create_app(preload_subsystems=False)
+        client = application.test_client()
+        self.assertEqual(b"6", client.post("/calc/aggregate/sum", data="1\n2\n3\n").data)
+        with patch.object(application.extensions["execution"], "timeout", 0.0):
+            response = client.post("/calc/aggregate/sum", data="1\n2\n3\n")
+        self.assertEqual(http.client.SERVICE_UNAVAILABLE, response.status_code)
+
+    def test_preload_builds_tables_and_imports_parser(self, _validate_permissions):
+        execution = api.create_execution()
+        with patch.object(execution.calculator.tables.sqrt, "load") as load_sqrt, \
+                patch.object(execution.calculator.tables.log10, "load") as load_log10:
+            api.create_app(preload_subsystems=True, execution=execution)
+        load_sqrt.assert_called_once()
+        load_log10.assert_called_once()
+        self.assertIn("app.expression", sys.modules)
+
+    def test_each_app_builds_its_own_subsystems(self, _validate_permissions):
+        """Prueba que importar la API no crea una aplicación y que cada una tiene sus subsistemas"""
+        self.assertFalse(hasattr(api, "api_application"))
+        first, second = api.create_app(preload_subsystems=False), api.create_app(preload_subsystems=False)
+        self.assertIsNot(first.extensions["execution"], second.extensions["execution"])
+        self.assertIsNot(first.extensions["execution"].calculator, second.extensions["execution"].calculator)
+        execution = ExecutionLayer(Calculator(max_power_bits=64))
+        client = api.create_app(preload_subsystems=False, execution=execution).test_client()
+        self.assertIs(execution, client.application.extensions["execution"])
+        self.assertEqual(http.client.BAD_REQUEST, client.get("/calc/power/2/100").status_code)
+
+    def test_serve_arguments(self, _validate_permissions):
+        with patch.object(serve, "serve") as serve_mock:
+            serve.main(["--port", "5001", "--workers", "3", "--preload"])
+        serve_mock.assert_called_once_with("127.0.0.1", 5001, 3, True)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
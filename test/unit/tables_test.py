@@ -0,0 +1,69 @@
+import math
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import pytest
+
+from app.calc import Calculator
+from app.tables import LookupTable
+from app.tables import create_tables
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+@pytest.mark.unit
+class TestLookupTable(unittest.TestCase):
+    def test_lookup_matches_math_module(self):
+        sqrt, log10 = LookupTable("sqrt", 1000), LookupTable("log10", 1000)
+        for n in (0, 1, 2, 10, 99, 999):
+            self.assertEqual(math.sqrt(n), sqrt.lookup(n))
+        for n in (1, 2, 10, 99, 999):
+            self.assertEqual(math.log10(n), log10.lookup(n))
+
+    def test_lookup_outside_domain_returns_none(self):
+        sqrt, log10 = LookupTable("sqrt", 100), LookupTable("log10", 100)
+        for value in (-1, 100, 10 ** 20, 4.0, True, "4"):
+            self.assertIsNone(sqrt.lookup(value))
+        self.assertIsNone(log10.lookup(0))
+
+    def test_table_is_built_lazily(self):
+        table = LookupTable("sqrt", 100)
+        self.assertIsNone(table.values)
+        self.assertIsNone(table.lookup(100))
+        self.assertIsNone(table.values)
+        self.assertEqual(3.0, table.lookup(9))
+        self.assertEqual(100, len(table.values))
+
+    def test_saved_table_is_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = LookupTable("log10", 500, directory)
+            self.assertEqual(2.0, first.lookup(100))
+            self.assertEqual(500 * 8, os.path.getsize(first.path))
+            second = LookupTable("log10", 500, directory)
+            with patch.object(LookupTable, "build", side_effect=AssertionError("no debe reconstruirse")):
+                self.assertEqual(math.log10(437), second.lookup(437))
+            self.assertIsInstance(second.values, memoryview)
+            second.values.release()
+            first.values.release()
+
+    def test_create_tables(self):
+        self.assertIsNone(create_tables(size=0))
+        tables = create_tables(size=10, directory=None, preload=True)
+        self.assertIsNotNone(tables.sqrt.values)
+        self.assertIsNotNone(tables.log10.values)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_calculator_uses_tables(self, _validate_permissions):
+        calc = Calculator(tables=create_tables(size=1000, directory=None))
+        self.assertEqual(math.sqrt(2), calc.square_root(2))
+        self.assertEqual(math.log10(7), calc.logarithm_base_10(7))
+        self.assertEqual(math.sqrt(5000), calc.square_root(5000))
+        self.assertRaises(ValueError, calc.logarithm_base_10, 0)
+        self.assertRaises(ValueError, calc.square_root, -4)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
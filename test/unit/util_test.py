@@ -1,4 +1,9 @@
+import random
 import unittest
+from array import array
+from decimal import Decimal
+from fractions import Fraction
+from unittest.mock import patch
 import pytest
 
 from app import util
@@ -34,6 +39,92 @@ class TestUtil(unittest.TestCase):
         self.assertRaises(TypeError, util.convert_to_number, True)
         self.assertRaises(TypeError, util.convert_to_number, False)
 
+    def test_convert_to_number_long_operands_skip_cache(self):
+        util.parse_cached_operand.cache_clear()
+        self.assertEqual(10 ** 40, util.convert_to_number("1" + "0" * 40))
+        self.assertEqual(0, util.parse_cached_operand.cache_info().currsize)
+        self.assertEqual(7, util.convert_to_number("7"))
+        self.assertEqual(7, util.convert_to_number("7"))
+        self.assertEqual(1, util.parse_cached_operand.cache_info().hits)
+
+    def test_convert_to_number_short_operands_go_straight_to_cache(self):
+        # Los operandos cortos no pasan por la política de tamaño
+        with patch.object(util, "check_operand_size", wraps=util.check_operand_size) as check:
+            self.assertEqual(2.5, util.convert_to_number("2.5"))
+            self.assertEqual(2.5, util.convert_to_number("2.5", "float"))
+            self.assertEqual(0, check.call_count)
+            self.assertEqual(10 ** 40, util.convert_to_number("1" + "0" * 40))
+            self.assertEqual(Decimal("2.5"), util.convert_to_number("2.5", "decimal"))
+            self.assertEqual(2, check.call_count)
+
+    def test_convert_to_number_long_integers(self):
+        rng = random.Random(24)
+        for length in (util.LONG_INTEGER_LENGTH, util.LONG_INTEGER_LENGTH + 1, 4 * util.DIGIT_CHUNK + 1, 5001, 12345):
+            digits = str(rng.randint(1, 9)) + "".join(rng.choice("0123456789") for _ in range(length - 1))
+            expected = 0
+            for start in range(0, length, 1000):
+                piece = digits[start:start + 1000]
+                expected = expected * 10 ** len(piece) + int(piece)
+            self.assertEqual(expected, util.convert_to_number(digits))
+            self.assertEqual(-expected, util.convert_to_number(" -" + digits + " "))
+        self.assertEqual(10 ** 5000, util.convert_to_number("1" + "0" * 5000))
+        self.assertRaises(TypeError, util.convert_to_number, "1" * 5000 + "a")
+
+    def test_integer_text(self):
+        # Más allá de 4300 dígitos, donde str() falla en Python 3.11+.
+        self.assertEqual("1" + "0" * 5000, util.integer_text(10 ** 5000))
+        self.assertEqual("-1" + "0" * 20000, util.integer_text(-(10 ** 20000)))
+        self.assertEqual("-42", util.integer_text(-42))
+        number = 7 ** 20000
+        self.assertEqual(number, util.convert_to_number(util.integer_text(number)))
+
+    def test_convert_to_number_hexadecimal(self):
+        self.assertEqual(31, util.convert_to_number("0x1F"))
+        self.assertEqual(-31, util.convert_to_number("-0x1f"))
+        self.assertEqual(16 ** 200000 - 1, util.convert_to_number("0x" + "f" * 200000))
+        self.assertRaises(TypeError, util.convert_to_number, "0xg")
+        self.assertRaises(TypeError, util.convert_to_number, "1x2")
+
+    def test_operand_size_policy(self):
+        with patch.object(util, "MAX_DECIMAL_DIGITS", 100), patch.object(util, "MAX_OPERAND_LENGTH", 200):
+            self.assertEqual(10 ** 99, util.convert_to_number("1" + "0" * 99))
+            self.assertRaises(util.OperandTooLarge, util.convert_to_number, "1" * 101)
+            self.assertRaises(util.OperandTooLarge, util.convert_to_number, "1" * 101, "decimal")
+            self.assertEqual(16 ** 150, util.convert_to_number("0x1" + "0" * 150))
+            self.assertRaises(util.OperandTooLarge, util.convert_to_number, "0x" + "1" * 199)
+        # Se rechaza por longitud, sin llegar a analizar el texto.
+        with patch.object(util, "parse_operand") as parse_operand:
+            self.assertRaises(util.OperandTooLarge, util.convert_to_number, "1" * (util.MAX_DECIMAL_DIGITS + 1))
+            parse_operand.assert_not_called()
+
+    def test_convert_to_number_keeps_types_of_equal_literals(self):
+        self.assertIsInstance(util.convert_to_number("5"), int)
+        self.assertIsInstance(util.convert_to_number("5."), float)
+        self.assertIsInstance(util.convert_to_number("5"), int)
+
+    def test_convert_to_number_decimal_backend(self):
+        self.assertEqual(Decimal("0.1"), util.convert_to_number("0.1", "decimal"))
+        self.assertIsInstance(util.convert_to_number("5", "decimal"), Decimal)
+        self.assertEqual(Decimal("1E+400"), util.convert_to_number("1e400", "decimal"))
+        self.assertRaises(TypeError, util.convert_to_number, "s", "decimal")
+        self.assertRaises(TypeError, util.convert_to_number, "NaN", "decimal")
+        self.assertRaises(TypeError, util.convert_to_number, "Infinity", "decimal")
+
+    def test_convert_to_number_fraction_backend(self):
+        self.assertEqual(Fraction(1, 10), util.convert_to_number("0.1", "fraction"))
+        self.assertEqual(Fraction(5), util.convert_to_number(" 5", "fraction"))
+        self.assertEqual(10 ** 20, util.convert_to_number("1e20", "fraction"))
+        self.assertRaises(TypeError, util.convert_to_number, "1e100000000", "fraction")
+        self.assertRaises(TypeError, util.convert_to_number, "1/3", "fraction")
+
+    def test_convert_many(self):
+        self.assertEqual([4, 2.5, -1], util.convert_many(["4", "2.5", "-1"]))
+        numbers = util.convert_many(["4", "2.5", " 3"], typecode="d")
+        self.assertEqual(array("d", [4.0, 2.5, 3.0]), numbers)
+        self.assertEqual([], util.convert_many([]))
+        self.assertRaises(TypeError, util.convert_many, ["4", "s"])
+        self.assertRaises(TypeError, util.convert_many, ["4", None])
+
     def test_validate_permissions_success(self):
         """Prueba que user1 tenga permisos para cualquier operación"""
         self.assertTrue(util.validate_permissions("2 + 3", "user1"))
@@ -0,0 +1,98 @@
+import math
+import unittest
+from array import array
+from unittest.mock import patch
+import pytest
+
+from app import vector
+from app.calc import InvalidPermissions
+from app.vector import VectorCalculator
+
+
+def mocked_validation(*args, **kwargs):
+    return True
+
+
+@pytest.mark.unit
+class TestVectorCalculate(unittest.TestCase):
+    def setUp(self):
+        self.calc = VectorCalculator()
+
+    def assertVector(self, expected, result):
+        self.assertEqual(len(expected), len(result.values))
+        for value, wanted in zip(result.values, expected):
+            if wanted is None:
+                self.assertTrue(math.isnan(value))
+            else:
+                self.assertAlmostEqual(wanted, value, delta=0.0000001)
+        self.assertEqual([wanted is None for wanted in expected], [bool(flag) for flag in result.invalid])
+
+    def run_both_engines(self, check):
+        check()
+        with patch.object(vector, "numpy", None):
+            check()
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_binary_operations_are_element_wise(self, _validate_permissions):
+        def check():
+            self.assertVector([4, 0, 3.5], self.calc.add([2, 2, 1.5], [2, -2, 2]))
+            self.assertVector([0, 4, -0.5], self.calc.substract([2, 2, 1.5], [2, -2, 2]))
+            self.assertVector([4, -4, 3], self.calc.multiply([2, 2, 1.5], [2, -2, 2]))
+            self.assertVector([8, 1, 0.25], self.calc.power([2, 5, 2], [3, 0, -2]))
+        self.run_both_engines(check)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_scalar_operand_is_broadcast(self, _validate_permissions):
+        self.run_both_engines(lambda: self.assertVector([3, 4, 5], self.calc.add([1, 2, 3], 2)))
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_accepts_python_buffers(self, _validate_permissions):
+        def check():
+            result = self.calc.multiply(array("d", [1.5, 2.0]), memoryview(array("i", [2, 3])))
+            self.assertVector([3, 6], result)
+        self.run_both_engines(check)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_domain_errors_are_masked_per_element(self, _validate_permissions):
+        def check():
+            self.assertVector([2, None, None], self.calc.divide([4, 1, 0], [2, 0, 0]))
+            self.assertVector([4, None, 0], self.calc.square_root([16, -4, 0]))
+            self.assertVector([2, None, None], self.calc.logarithm_base_10([100, 0, -5]))
+            self.assertVector([None, 2], self.calc.power([-8, 4], [0.5, 0.5]))
+        self.run_both_engines(check)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_overflow_and_non_finite_operands_are_not_domain_errors(self, _validate_permissions):
+        """Prueba que, como en Calculator, el desbordamiento da inf y no se marca como inválido"""
+        def check():
+            result = self.calc.power([10, -10, 0], [400, 401, -1])
+            self.assertEqual([math.inf, -math.inf], list(result.values[:2]))
+            self.assertEqual([False, False, True], [bool(flag) for flag in result.invalid])
+            result = self.calc.multiply([1e300, math.inf, math.nan], [1e300, 2, 2])
+            self.assertEqual([math.inf, math.inf], list(result.values[:2]))
+            self.assertTrue(math.isnan(result.values[2]))
+            self.assertEqual([False] * 3, [bool(flag) for flag in result.invalid])
+            self.assertEqual([False, False], [bool(flag) for flag in self.calc.square_root([math.inf, math.nan]).invalid])
+            self.assertVector([None, -8, 1], self.calc.power([-8, -2, -2], [1 / 3, 3, 0]))
+        self.run_both_engines(check)
+
+    @patch('app.util.validate_permissions', side_effect=mocked_validation, create=True)
+    def test_fails_with_nan_parameters(self, _validate_permissions):
+        def check():
+            self.assertRaises(TypeError, self.calc.add, ["2", "3"], [1, 2])
+            self.assertRaises(TypeError, self.calc.add, "23", [1, 2])
+            self.assertRaises(TypeError, self.calc.square_root, [None])
+            self.assertRaises(TypeError, self.calc.add, [1, 2, 3], [1, 2])
+        self.run_both_engines(check)
+
+    @patch('app.util.validate_permissions', return_value=False, create=True)
+    def test_fails_without_permissions(self, _validate_permissions):
+        self.assertRaises(InvalidPermissions, self.calc.add, [1], [2])
+        _validate_permissions.assert_called_once()
+        operation = _validate_permissions.call_args[0][0]
+        self.assertEqual("vector add", operation.name)
+        self.assertEqual("vector add([1], [2])", str(operation))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()